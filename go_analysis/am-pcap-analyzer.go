@@ -9,10 +9,13 @@
 package main
 
 import (
+	"bufio"
+	"encoding/binary"
 	"flag"
 	"fmt"
 	"net"
 	"strconv"
+	"strings"
 	"time"
 
 	"github.com/google/gopacket"
@@ -84,6 +87,11 @@ func checkIfQuicPacket(testPacket gopacket.Packet, sourceIP net.IP) preprocessPa
 
 				for !end_reached {
 
+					// Compact captures (and captures with a snaplen) may end before the next packet
+					if payload_offset >= len(payload) {
+						break
+					}
+
 					long_header := (payload[payload_offset]&128 == 128)
 					quic_bit := (payload[payload_offset]&64 == 64)
 
@@ -98,10 +106,19 @@ func checkIfQuicPacket(testPacket gopacket.Packet, sourceIP net.IP) preprocessPa
 
 							packet_type := int((payload[payload_offset] & 0x30) / 16)
 							payload_offset = payload_offset + 5
+							if payload_offset >= len(payload) {
+								break
+							}
 							dcil := payload[payload_offset] // Determine Destination Connection ID Length & Skip it
 							payload_offset = payload_offset + int(dcil) + 1
+							if payload_offset >= len(payload) {
+								break
+							}
 							scil := payload[payload_offset] // Determine Source Connection ID Length & Skip it
 							payload_offset = payload_offset + int(scil) + 1
+							if payload_offset >= len(payload) {
+								break
+							}
 
 							//Determine length of remaining packet
 							// Initial packet, a token length follows next
@@ -115,6 +132,10 @@ func checkIfQuicPacket(testPacket gopacket.Packet, sourceIP net.IP) preprocessPa
 								fmt.Println("There's a retry packet.")
 							}
 
+							if payload_offset+1 >= len(payload) {
+								break
+							}
+
 							// Length encoded using variable-length integer encoding (see QUIC RFC)
 
 							// First get length of variable length encoding
@@ -141,6 +162,10 @@ func checkIfQuicPacket(testPacket gopacket.Packet, sourceIP net.IP) preprocessPa
 							// We have a short header
 						} else {
 
+							if payload_offset+1 >= len(payload) {
+								break
+							}
+
 							if debug {
 								fmt.Println("We might have valid QUIC traffic with a short header. Use this packet")
 							}
@@ -789,6 +814,98 @@ func analyzeOneDirectionalPcap_R_Reflection_Square_Bit(pcap_name string, sourceI
 	return r_reflection_square_bit_flows_measurements
 }
 
+/*
+	Binary output (--outputFormat npy)
+
+	Instead of the CSV files, the measurements can be written as NumPy .npy files (format version 1.0) holding one packed little-endian record per measurement.
+	Timestamps are nanoseconds since the epoch of the wall clock time, i.e., the zone offset is added so that they equal the CSV timestamps read as UTC.
+	Flows are stored as their 4-tuple with the IPv4 addresses as big-endian integers (10.0.1.1 -> 0x0a000101).
+*/
+
+const npyFlowDescr = "('src_ip', '<u4'), ('dst_ip', '<u4'), ('src_port', '<u2'), ('dst_port', '<u2')"
+
+type npyFlow struct {
+	SrcIP   uint32
+	DstIP   uint32
+	SrcPort uint16
+	DstPort uint16
+}
+
+type lBitNpyRecord struct {
+	Flow        npyFlow
+	TimestampNs int64
+	LossEvent   uint8
+}
+
+const lBitNpyDescr = npyFlowDescr + ", ('timestamp_ns', '<i8'), ('loss_event', 'u1')"
+
+type tBitNpyRecord struct {
+	Flow       npyFlow
+	StartNs    int64
+	EndNs      int64
+	Generation int64
+	Reflection int64
+}
+
+const tBitNpyDescr = npyFlowDescr + ", ('start_ns', '<i8'), ('end_ns', '<i8'), ('generation', '<i8'), ('reflection', '<i8')"
+
+type squareBitNpyRecord struct {
+	Flow         npyFlow
+	StartNs      int64
+	EndNs        int64
+	Phase        int64
+	Count        int64
+	NominalCount int64
+	XValue       int64
+}
+
+const squareBitNpyDescr = npyFlowDescr + ", ('start_ns', '<i8'), ('end_ns', '<i8'), ('phase', '<i8'), ('count', '<i8'), ('nominal', '<i8'), ('x_value', '<i8')"
+
+// Flow identifiers have the format srcIP-dstIP-srcPort-dstPort
+func parseFlowIdentifier(flow_identifier string) npyFlow {
+	elements := strings.Split(flow_identifier, "-")
+	src_port, _ := strconv.Atoi(elements[2])
+	dst_port, _ := strconv.Atoi(elements[3])
+
+	return npyFlow{
+		SrcIP:   binary.BigEndian.Uint32(net.ParseIP(elements[0]).To4()),
+		DstIP:   binary.BigEndian.Uint32(net.ParseIP(elements[1]).To4()),
+		SrcPort: uint16(src_port),
+		DstPort: uint16(dst_port),
+	}
+}
+
+func wallClockNanoseconds(timestamp time.Time) int64 {
+	_, offset := timestamp.Zone()
+	return timestamp.UnixNano() + int64(offset)*int64(time.Second)
+}
+
+func writeNpy(fileName string, descr string, records []interface{}) error {
+	outputFile, err := os.Create(fileName)
+	if err != nil {
+		return err
+	}
+	defer outputFile.Close()
+
+	writer := bufio.NewWriter(outputFile)
+
+	// Magic string (6 bytes), version (2 bytes), header length (2 bytes) and the newline terminated header have to be a multiple of 64 bytes
+	header := fmt.Sprintf("{'descr': [%s], 'fortran_order': False, 'shape': (%d,), }", descr, len(records))
+	header += strings.Repeat(" ", (64-(10+len(header)+1)%64)%64) + "\n"
+
+	writer.WriteString("\x93NUMPY\x01\x00")
+	binary.Write(writer, binary.LittleEndian, uint16(len(header)))
+	writer.WriteString(header)
+
+	for _, record := range records {
+		if err := binary.Write(writer, binary.LittleEndian, record); err != nil {
+			return err
+		}
+	}
+
+	return writer.Flush()
+}
+
 func main() {
 
 	fmt.Println("Start analysis of .pcap files.")
@@ -797,11 +914,17 @@ func main() {
 	var s2_eth2_pcapFile string
 	var outputFileBaseName string
 	var measurement_techniques int
+	var outputFormat string
+	var clientIP string
+	var serverIP string
 
 	flag.StringVar(&s2_eth1_pcapFile, "s2_eth1_pcapFile", "None", "Name of first pcap file to be analyzed")
 	flag.StringVar(&s2_eth2_pcapFile, "s2_eth2_pcapFile", "None", "Name of second pcap file to be analyzed")
 	flag.StringVar(&outputFileBaseName, "outputFileBaseName", "None", "Basename of the output file to be analyzed")
 	flag.IntVar(&measurement_techniques, "measurement_techniques", 0, "Which measurement techniques should be analyzed? Use 42 for all.")
+	flag.StringVar(&outputFormat, "outputFormat", "csv", "Format of the output files: csv or npy")
+	flag.StringVar(&clientIP, "clientIP", "10.0.1.1", "Address of the client (h1) of the experiment slot")
+	flag.StringVar(&serverIP, "serverIP", "10.0.1.2", "Address of the server (h2) of the experiment slot")
 	flag.Parse()
 
 	/*
@@ -809,15 +932,34 @@ func main() {
 		measurement_techniques == 43: loss measurement techniques
 	*/
 
-	ip_1, _, _ := net.ParseCIDR("10.0.1.1/24")
-	ip_2, _, _ := net.ParseCIDR("10.0.1.2/24")
+	ip_1, _, _ := net.ParseCIDR(clientIP + "/24")
+	ip_2, _, _ := net.ParseCIDR(serverIP + "/24")
 
 	if measurement_techniques == 42 || measurement_techniques == 43 {
 		fmt.Println("Perform L Loss Event Bit Analysis")
 		l_loss_event_bit_flows_measurements_direction1 := analyzeOneDirectionalPcap_L_Loss_Event_Bit(s2_eth1_pcapFile, ip_1, ExtensionByteBit3Position)
 		l_loss_event_bit_flows_measurements_direction2 := analyzeOneDirectionalPcap_L_Loss_Event_Bit(s2_eth2_pcapFile, ip_2, ExtensionByteBit3Position)
 
-		if outputFile, err := os.Create(outputFileBaseName + "lbit.csv"); err == nil {
+		if outputFormat == "npy" {
+			var records []interface{}
+			for _, flows_measurements := range []map[string][]l_loss_event_bit_measurement{l_loss_event_bit_flows_measurements_direction1, l_loss_event_bit_flows_measurements_direction2} {
+				for flow_id, measurements := range flows_measurements {
+					flow := parseFlowIdentifier(flow_id)
+					for _, measurement := range measurements {
+						var loss_event uint8
+						if measurement.loss_event_bit {
+							loss_event = 1
+						}
+						records = append(records, lBitNpyRecord{Flow: flow, TimestampNs: wallClockNanoseconds(measurement.timestamp), LossEvent: loss_event})
+					}
+				}
+			}
+
+			if err := writeNpy(outputFileBaseName+"lbit.npy", lBitNpyDescr, records); err != nil {
+				fmt.Println(err)
+			}
+
+		} else if outputFile, err := os.Create(outputFileBaseName + "lbit.csv"); err == nil {
 
 			for flow_id, measurements := range l_loss_event_bit_flows_measurements_direction1 {
 				for _, measurement := range measurements {
@@ -844,7 +986,23 @@ func main() {
 		t_round_trip_loss_bit_flows_measurements_direction1 := analyzeOneDirectionalPcap_T_Round_Trip_Loss_Bit(s2_eth1_pcapFile, ip_1, SpinBitPosition, ExtensionByteBit4Position)
 		t_round_trip_loss_bit_flows_measurements_direction2 := analyzeOneDirectionalPcap_T_Round_Trip_Loss_Bit(s2_eth2_pcapFile, ip_2, SpinBitPosition, ExtensionByteBit4Position)
 
-		if outputFile, err := os.Create(outputFileBaseName + "tbit.csv"); err == nil {
+		if outputFormat == "npy" {
+			var records []interface{}
+			for _, flows_measurements := range []map[string][]t_round_trip_loss_bit_measurement{t_round_trip_loss_bit_flows_measurements_direction1, t_round_trip_loss_bit_flows_measurements_direction2} {
+				for flow_id, measurements := range flows_measurements {
+					flow := parseFlowIdentifier(flow_id)
+					for _, measurement := range measurements {
+						records = append(records, tBitNpyRecord{Flow: flow, StartNs: wallClockNanoseconds(measurement.startTime), EndNs: wallClockNanoseconds(measurement.endTime),
+							Generation: int64(measurement.phase_counts[PhaseGeneration]), Reflection: int64(measurement.phase_counts[PhaseReflection])})
+					}
+				}
+			}
+
+			if err := writeNpy(outputFileBaseName+"tbit.npy", tBitNpyDescr, records); err != nil {
+				fmt.Println(err)
+			}
+
+		} else if outputFile, err := os.Create(outputFileBaseName + "tbit.csv"); err == nil {
 
 			for flow_id, measurements := range t_round_trip_loss_bit_flows_measurements_direction1 {
 				for _, measurement := range measurements {
@@ -874,7 +1032,23 @@ func main() {
 		q_square_bit_flows_measurements_direction1 := analyzeOneDirectionalPcap_Q_Square_Bit(s2_eth1_pcapFile, ip_1, ExtensionByteBit1Position)
 		q_square_bit_flows_measurements_direction2 := analyzeOneDirectionalPcap_Q_Square_Bit(s2_eth2_pcapFile, ip_2, ExtensionByteBit1Position)
 
-		if outputFile, err := os.Create(outputFileBaseName + "qbit.csv"); err == nil {
+		if outputFormat == "npy" {
+			var records []interface{}
+			for _, flows_measurements := range []map[string][]q_square_bit_measurement{q_square_bit_flows_measurements_direction1, q_square_bit_flows_measurements_direction2} {
+				for flow_id, measurements := range flows_measurements {
+					flow := parseFlowIdentifier(flow_id)
+					for _, measurement := range measurements {
+						records = append(records, squareBitNpyRecord{Flow: flow, StartNs: wallClockNanoseconds(measurement.startTime), EndNs: wallClockNanoseconds(measurement.endTime),
+							Phase: int64(measurement.phase_value), Count: int64(measurement.phase_count), NominalCount: int64(measurement.nominal_period_length), XValue: int64(measurement.nominal_x_value)})
+					}
+				}
+			}
+
+			if err := writeNpy(outputFileBaseName+"qbit.npy", squareBitNpyDescr, records); err != nil {
+				fmt.Println(err)
+			}
+
+		} else if outputFile, err := os.Create(outputFileBaseName + "qbit.csv"); err == nil {
 
 			for flow_id, measurements := range q_square_bit_flows_measurements_direction1 {
 
@@ -906,7 +1080,23 @@ func main() {
 		r_reflection_square_bit_flows_measurements_direction1 := analyzeOneDirectionalPcap_R_Reflection_Square_Bit(s2_eth1_pcapFile, ip_1, ExtensionByteBit2Position, ExtensionByteBit1Position)
 		r_reflection_square_bit_flows_measurements_direction2 := analyzeOneDirectionalPcap_R_Reflection_Square_Bit(s2_eth2_pcapFile, ip_2, ExtensionByteBit2Position, ExtensionByteBit1Position)
 
-		if outputFile, err := os.Create(outputFileBaseName + "rbit.csv"); err == nil {
+		if outputFormat == "npy" {
+			var records []interface{}
+			for _, flows_measurements := range []map[string][]r_reflection_square_bit_measurement{r_reflection_square_bit_flows_measurements_direction1, r_reflection_square_bit_flows_measurements_direction2} {
+				for flow_id, measurements := range flows_measurements {
+					flow := parseFlowIdentifier(flow_id)
+					for _, measurement := range measurements {
+						records = append(records, squareBitNpyRecord{Flow: flow, StartNs: wallClockNanoseconds(measurement.startTime), EndNs: wallClockNanoseconds(measurement.endTime),
+							Phase: int64(measurement.phase_value), Count: int64(measurement.phase_count), NominalCount: int64(measurement.nominal_period_length), XValue: int64(measurement.nominal_x_value)})
+					}
+				}
+			}
+
+			if err := writeNpy(outputFileBaseName+"rbit.npy", squareBitNpyDescr, records); err != nil {
+				fmt.Println(err)
+			}
+
+		} else if outputFile, err := os.Create(outputFileBaseName + "rbit.csv"); err == nil {
 
 			for flow_id, measurements := range r_reflection_square_bit_flows_measurements_direction1 {
 
@@ -11,6 +11,7 @@ package main
 
 import (
 	"bufio"
+	"encoding/binary"
 	"flag"
 	"fmt"
 	"os"
@@ -140,6 +141,65 @@ type QueueingCalled struct {
 	loss_value int
 }
 
+/*
+	Binary output (--outputFormat npy)
+
+	Instead of the CSV files, the groundtruth can be written as NumPy .npy files (format version 1.0) holding one packed little-endian record per line of the CSV file.
+	Timestamps are nanoseconds since the epoch of the wall clock time, i.e., the zone offset is added so that they equal the CSV timestamps read as UTC.
+*/
+
+type groundtruthLossNpyRecord struct {
+	TimestampNs int64
+	Loss        int64
+}
+
+const groundtruthLossNpyDescr = "('timestamp_ns', '<i8'), ('loss', '<i8')"
+
+// Kind of the records in the groundtruth_overall_packets_and_loss_count file
+const (
+	NpyKindLossCount    uint8 = 0
+	NpyKindOverallCount uint8 = 1
+)
+
+type groundtruthOverallNpyRecord struct {
+	Kind        uint8
+	TimestampNs int64
+	Value       int64
+}
+
+const groundtruthOverallNpyDescr = "('kind', 'u1'), ('timestamp_ns', '<i8'), ('value', '<i8')"
+
+func wallClockNanoseconds(timestamp time.Time) int64 {
+	_, offset := timestamp.Zone()
+	return timestamp.UnixNano() + int64(offset)*int64(time.Second)
+}
+
+func writeNpy(fileName string, descr string, records []interface{}) error {
+	outputFile, err := os.Create(fileName)
+	if err != nil {
+		return err
+	}
+	defer outputFile.Close()
+
+	writer := bufio.NewWriter(outputFile)
+
+	// Magic string (6 bytes), version (2 bytes), header length (2 bytes) and the newline terminated header have to be a multiple of 64 bytes
+	header := fmt.Sprintf("{'descr': [%s], 'fortran_order': False, 'shape': (%d,), }", descr, len(records))
+	header += strings.Repeat(" ", (64-(10+len(header)+1)%64)%64) + "\n"
+
+	writer.WriteString("\x93NUMPY\x01\x00")
+	binary.Write(writer, binary.LittleEndian, uint16(len(header)))
+	writer.WriteString(header)
+
+	for _, record := range records {
+		if err := binary.Write(writer, binary.LittleEndian, record); err != nil {
+			return err
+		}
+	}
+
+	return writer.Flush()
+}
+
 /* Network Scenario:
 
 				 Switch s3
@@ -157,14 +217,20 @@ func main() {
 	var queueMonitorFileName string
 	var outputFileBaseName string
 	var s3_eth2_pcapFile string
+	var outputFormat string
+	var clientIP string
+	var serverIP string
 
 	flag.StringVar(&queueMonitorFileName, "queueMonitorFileName", "None", "Name of the queue monitor file")
 	flag.StringVar(&outputFileBaseName, "outputFileBaseName", "None", "Outputfile Name")
 	flag.StringVar(&s3_eth2_pcapFile, "s3_eth2_pcapFile", "None", "Name the pcap file for s3_eth2")
+	flag.StringVar(&outputFormat, "outputFormat", "csv", "Format of the output files: csv or npy")
+	flag.StringVar(&clientIP, "clientIP", "10.0.1.1", "Address of the client (h1) of the experiment slot")
+	flag.StringVar(&serverIP, "serverIP", "10.0.1.2", "Address of the server (h2) of the experiment slot")
 	flag.Parse()
 
-	client_ip, _, _ := net.ParseCIDR("10.0.1.1/24")
-	server_ip, _, _ := net.ParseCIDR("10.0.1.2/24")
+	client_ip, _, _ := net.ParseCIDR(clientIP + "/24")
+	server_ip, _, _ := net.ParseCIDR(serverIP + "/24")
 
 	/*
 		##### OUTPUT format of the queueMonitor file
@@ -233,42 +299,58 @@ func main() {
 	}
 
 	// Write observed number of packet drops to file for each interface
-	if outputFile, err := os.Create(outputFileBaseName + "groundtruth_loss_clientswitch.csv"); err == nil {
-		for _, measurement := range measurements_clientswitch {
-			outputFile.WriteString(fmt.Sprintf("%-s,%-d\n", measurement.timestamp, measurement.loss_value))
-		}
-	} else {
-		fmt.Println(err)
-	}
+	if outputFormat == "npy" {
+		for interface_name, measurements := range map[string][]QueueingCalled{"clientswitch": measurements_clientswitch, "switchclient": measurements_switchclient,
+			"switchserver": measurements_switchserver, "serverswitch": measurements_serverswitch} {
 
-	if outputFile, err := os.Create(outputFileBaseName + "groundtruth_loss_switchclient.csv"); err == nil {
+			var records []interface{}
+			for _, measurement := range measurements {
+				records = append(records, groundtruthLossNpyRecord{TimestampNs: wallClockNanoseconds(measurement.timestamp), Loss: int64(measurement.loss_value)})
+			}
 
-		for _, measurement := range measurements_switchclient {
-			outputFile.WriteString(fmt.Sprintf("%-s,%-d\n", measurement.timestamp, measurement.loss_value))
+			if err := writeNpy(outputFileBaseName+"groundtruth_loss_"+interface_name+".npy", groundtruthLossNpyDescr, records); err != nil {
+				fmt.Println(err)
+			}
 		}
 
 	} else {
-		fmt.Println(err)
-	}
+		if outputFile, err := os.Create(outputFileBaseName + "groundtruth_loss_clientswitch.csv"); err == nil {
+			for _, measurement := range measurements_clientswitch {
+				outputFile.WriteString(fmt.Sprintf("%-s,%-d\n", measurement.timestamp, measurement.loss_value))
+			}
+		} else {
+			fmt.Println(err)
+		}
 
-	if outputFile, err := os.Create(outputFileBaseName + "groundtruth_loss_switchserver.csv"); err == nil {
+		if outputFile, err := os.Create(outputFileBaseName + "groundtruth_loss_switchclient.csv"); err == nil {
 
-		for _, measurement := range measurements_switchserver {
-			outputFile.WriteString(fmt.Sprintf("%-s,%-d\n", measurement.timestamp, measurement.loss_value))
+			for _, measurement := range measurements_switchclient {
+				outputFile.WriteString(fmt.Sprintf("%-s,%-d\n", measurement.timestamp, measurement.loss_value))
+			}
+
+		} else {
+			fmt.Println(err)
 		}
 
-	} else {
-		fmt.Println(err)
-	}
+		if outputFile, err := os.Create(outputFileBaseName + "groundtruth_loss_switchserver.csv"); err == nil {
 
-	if outputFile, err := os.Create(outputFileBaseName + "groundtruth_loss_serverswitch.csv"); err == nil {
+			for _, measurement := range measurements_switchserver {
+				outputFile.WriteString(fmt.Sprintf("%-s,%-d\n", measurement.timestamp, measurement.loss_value))
+			}
 
-		for _, measurement := range measurements_serverswitch {
-			outputFile.WriteString(fmt.Sprintf("%-s,%-d\n", measurement.timestamp, measurement.loss_value))
+		} else {
+			fmt.Println(err)
 		}
 
-	} else {
-		fmt.Println(err)
+		if outputFile, err := os.Create(outputFileBaseName + "groundtruth_loss_serverswitch.csv"); err == nil {
+
+			for _, measurement := range measurements_serverswitch {
+				outputFile.WriteString(fmt.Sprintf("%-s,%-d\n", measurement.timestamp, measurement.loss_value))
+			}
+
+		} else {
+			fmt.Println(err)
+		}
 	}
 
 	/* For our paper, we focussed on packet drops on particular outbound interface.
@@ -278,7 +360,21 @@ func main() {
 
 	packetCounts := derivePacketCounts(s3_eth2_pcapFile, client_ip, server_ip)
 
-	if outputFile, err := os.Create(outputFileBaseName + "groundtruth_overall_packets_and_loss_count.csv"); err == nil {
+	if outputFormat == "npy" {
+		var records []interface{}
+		for _, measurement := range measurements_switchserver {
+			records = append(records, groundtruthOverallNpyRecord{Kind: NpyKindLossCount, TimestampNs: wallClockNanoseconds(measurement.timestamp), Value: int64(measurement.loss_value)})
+		}
+
+		for _, measurement := range packetCounts {
+			records = append(records, groundtruthOverallNpyRecord{Kind: NpyKindOverallCount, TimestampNs: wallClockNanoseconds(measurement.timestamp), Value: int64(measurement.currentCount)})
+		}
+
+		if err := writeNpy(outputFileBaseName+"groundtruth_overall_packets_and_loss_count.npy", groundtruthOverallNpyDescr, records); err != nil {
+			fmt.Println(err)
+		}
+
+	} else if outputFile, err := os.Create(outputFileBaseName + "groundtruth_overall_packets_and_loss_count.csv"); err == nil {
 
 		for _, measurement := range measurements_switchserver {
 			outputFile.WriteString(fmt.Sprintf("losscount,%-s,%-d\n", measurement.timestamp, measurement.loss_value))
@@ -0,0 +1,129 @@
+"""
+    EFM Evaluation Framework
+    Copyright (c) 2021 
+
+	Author: Ike Kunze
+	E-mail: kunze@comsys.rwth-aachen.de
+"""
+
+"""
+This file provides a content-addressed manifest that allows perform_analysis.py to skip measurements whose inputs have not changed.
+The manifest is stored as analysis_manifest.json in the results folder and records the size, mtime and hash of every raw input and preprocessed output.
+"""
+import hashlib
+import json
+import os
+
+
+MANIFEST_NAME = "analysis_manifest.json"
+MANIFEST_VERSION = 1
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    """
+    Compute the sha256 hash of a file without loading it into memory at once.
+    """
+
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as inputFile:
+        for chunk in iter(lambda: inputFile.read(HASH_CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+class AnalysisManifest:
+    """
+    Bookkeeping of which raw files and preprocessed files have been analyzed with which result.
+
+    results_path: the folder containing raw/ and preprocessed/; file paths are stored relative to it
+    force: ignore everything recorded so far (the manifest is rebuilt from scratch)
+    """
+
+    def __init__(self, results_path, force=False):
+
+        self.results_path = results_path
+        self.manifest_path = os.path.join(results_path, MANIFEST_NAME)
+        self.manifest = {"version": MANIFEST_VERSION, "files": {}, "stages": {}}
+
+        if not force and os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as manifestFile:
+                stored_manifest = json.load(manifestFile)
+            if stored_manifest.get("version") == MANIFEST_VERSION:
+                self.manifest = stored_manifest
+            else:
+                print("Ignore manifest {} with unknown version.".format(self.manifest_path))
+
+    def _key(self, path):
+
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(self.results_path))
+
+    def fingerprint(self, path):
+        """
+        Return the hash of the file at path or None if it does not exist.
+        The file is only re-hashed if its size or mtime differ from the recorded ones.
+        """
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        key = self._key(path)
+        recorded = self.manifest["files"].get(key)
+        if recorded is not None and recorded["size"] == stat.st_size and recorded["mtime_ns"] == stat.st_mtime_ns:
+            return recorded["sha256"]
+
+        file_hash = hash_file(path)
+        self.manifest["files"][key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_hash}
+        return file_hash
+
+    def _fingerprints(self, paths):
+
+        return {self._key(path): self.fingerprint(path) for path in paths}
+
+    def is_up_to_date(self, stage, prefix, input_paths, output_paths=()):
+        """
+        Check whether the given stage has already processed exactly these inputs for the prefix and whether its outputs are still untouched.
+        """
+
+        recorded = self.manifest["stages"].get(stage, {}).get(prefix)
+        if recorded is None:
+            return False
+
+        if recorded["inputs"] != self._fingerprints(input_paths):
+            return False
+
+        current_outputs = self._fingerprints(output_paths)
+        return None not in current_outputs.values() and recorded["outputs"] == current_outputs
+
+    def record(self, stage, prefix, input_paths, output_paths=(), results=None):
+        """
+        Remember that the stage has processed the inputs of the prefix, producing the given output files and/or results.
+        """
+
+        self.manifest["stages"].setdefault(stage, {})[prefix] = {"inputs": self._fingerprints(input_paths),
+                                                                 "outputs": self._fingerprints(output_paths),
+                                                                 "results": results}
+
+    def cached_results(self, stage, prefix, input_paths):
+        """
+        Return the results recorded for the prefix if the stage has already processed exactly these inputs, otherwise None.
+        """
+
+        if not self.is_up_to_date(stage, prefix, input_paths):
+            return None
+
+        return self.manifest["stages"][stage][prefix]["results"]
+
+    def save(self):
+        """
+        Atomically write the manifest to the results folder.
+        """
+
+        temporary_path = self.manifest_path + ".tmp"
+        with open(temporary_path, "w") as manifestFile:
+            json.dump(self.manifest, manifestFile, indent=1, sort_keys=True)
+        os.replace(temporary_path, self.manifest_path)
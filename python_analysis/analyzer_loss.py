@@ -8,11 +8,20 @@
 
 """
 This file provides functionality to analyze the output of the go-based preprocessing and subsequently prepare plottable data.
+All time series are keyed by timestamps in integer epoch nanoseconds (see decode_go_timestamp_ns).
 """
 import os
+import array
+import calendar
+import concurrent.futures
 import datetime
+import functools
 import time
 
+import numpy as np
+
+import prefix_index
+
 
 def parseDateTime_withErrorHandling(timestamp):
 
@@ -52,6 +61,44 @@ def parseDateTime_withErrorHandling(timestamp):
 
 
 
+### Epoch seconds of already decoded "YYYY-MM-DD HH:MM:SS" prefixes. Consecutive lines of one file mostly share the same second.
+_second_prefix_cache = {}
+_SECOND_PREFIX_CACHE_LIMIT = 65536
+
+### Multiplier that turns a fractional second with the given number of digits into nanoseconds (Go trims trailing zeros).
+_FRACTION_TO_NANOSECONDS = [10 ** (9 - digits) for digits in range(10)]
+
+
+def decode_go_timestamp_ns(timestamp):
+    """
+    Decode a timestamp written by Go's time.Time.String() into integer epoch nanoseconds.
+
+    Layout: 2021-03-16 16:37:55.983976 +0000 UTC
+    The fractional part may be missing or shortened (Go drops trailing zeros).
+    Just like parseDateTime_withErrorHandling, the zone suffix (e.g., +0200 CEST) is ignored and the wall clock is interpreted as UTC.
+    """
+
+    second_prefix = timestamp[:19]
+    try:
+        epoch_seconds = _second_prefix_cache[second_prefix]
+    except KeyError:
+        epoch_seconds = calendar.timegm((int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+                                         int(timestamp[11:13]), int(timestamp[14:16]), int(timestamp[17:19]), 0, 0, 0))
+        if len(_second_prefix_cache) >= _SECOND_PREFIX_CACHE_LIMIT:
+            _second_prefix_cache.clear()
+        _second_prefix_cache[second_prefix] = epoch_seconds
+
+    if timestamp[19:20] != ".":
+        return epoch_seconds * 1000000000
+
+    fraction_end = timestamp.find(" ", 20)
+    if fraction_end == -1:
+        fraction_end = len(timestamp)
+
+    return epoch_seconds * 1000000000 + int(timestamp[20:fraction_end]) * _FRACTION_TO_NANOSECONDS[fraction_end - 20]
+
+
+
 def compute_loss_ref_gen(generation, reflection):
     """
     Compute loss percentage based on a generation count and a reflection count.
@@ -91,405 +138,629 @@ def compute_loss_packet_count(overall_packets, lost_packets):
     return loss if loss >=0 else 0    
 
 
-def analyze_tbit(tbit_filename, output=False):
+def compute_loss_ref_gen_array(generation, reflection):
+    """
+    Vectorized version of compute_loss_ref_gen for NumPy arrays.
     """
-    This function takes pre-processed input from the go-based observers and creates plottable results for the T-Bit. 
 
-    Source format:
-    10.0.1.1-10.0.1.2-10000-1234,2021-03-16 16:37:55.983976 +0000 UTC,2021-03-16 16:37:56.370092 +0000 UTC,Generation: 12,Reflection: 13
+    generation = np.asarray(generation, dtype=np.float64)
+    reflection = np.asarray(reflection, dtype=np.float64)
+    loss = (1.0 - reflection / np.where(generation != 0, generation, generation + 0.1))*100
+
+    return np.maximum(loss, 0.0)
+
+
+def compute_loss_nominal_count_array(nominal, count):
+    """
+    Vectorized version of compute_loss_nominal_count for NumPy arrays.
     """
-    if output:
-        print("analyze_tbit")
 
-    with open(tbit_filename) as inputFile:
+    nominal = np.asarray(nominal, dtype=np.float64)
+    count = np.asarray(count, dtype=np.float64)
+    loss = (1.0 - count / np.where(nominal != 0, nominal, nominal + 0.1))*100
 
-        measurements = {}
-        for line in inputFile:
+    return np.maximum(loss, 0.0)
 
-            content = line.split(",")
 
-            src = str(content[0].split("-")[0])
-
-            start_timestamp = content[1]
-            end_timestamp = content[2]
-            start_timestamp = parseDateTime_withErrorHandling(start_timestamp)
-            end_timestamp = parseDateTime_withErrorHandling(end_timestamp)
-            
-            generation_count = int(content[3].split(":")[1].strip(" "))
-            reflection_count = int(content[4].split(":")[1].strip("\n").strip(" "))
-
-            measurements[end_timestamp] = {"direction" : "client_server" if src == "10.0.1.1" else "server_client",
-                                            "generation_#": generation_count,
-                                            "reflection_#": reflection_count}
-
-        clientserver_last_generation = None
-        clientserver_last_reflection = None
-        serverclient_last_generation = None
-        serverclient_last_reflection = None
-
-        overall_cumulative_generation = 0
-        overall_cumulative_reflection = 0
-        clientserver_cumulative_generation = 0
-        clientserver_cumulative_reflection = 0
-        serverclient_cumulative_generation = 0
-        serverclient_cumulative_reflection = 0
-
-        clientserver_halfloss_cumulative_generation = 0
-        clientserver_halfloss_cumulative_reflection = 0
-
-        serverclient_halfloss_cumulative_generation_phase1 = 0
-        serverclient_halfloss_cumulative_reflection_phase1 = 0
-        serverclient_halfloss_cumulative_generation_phase2 = 0
-        serverclient_halfloss_cumulative_reflection_phase2 = 0
-
-        ## Prepare the return dictionary
-        return_dictionary = {   "2dir_observer" : {}, 
-                                "cs_observer" : {},
-                                "sc_observer" : {},
-                                "from_serverclient-observer_to_clientserver-observer" : {},
-                                "from_clientserver-observer_to_serverclient-observer" : {}}
-
-        for timestamp in sorted(measurements.keys()):
-
-            generation = measurements[timestamp]["generation_#"]
-            overall_cumulative_generation += generation
-            reflection = measurements[timestamp]["reflection_#"] 
-            overall_cumulative_reflection += reflection
-
-            return_dictionary["2dir_observer"][timestamp] = {
-                "loss_percentage": compute_loss_ref_gen(generation, reflection), 
-                "generation_#": generation, 
-                "reflection_#": reflection, 
-                "cum_loss_percentage": compute_loss_ref_gen(overall_cumulative_generation, overall_cumulative_reflection), 
-                "cum_generation_#": overall_cumulative_generation, 
-                "cum_reflection_#": overall_cumulative_reflection}
-
-            if measurements[timestamp]["direction"] == "client_server":
-
-                clientserver_cumulative_generation += generation
-                clientserver_cumulative_reflection += reflection
-
-                return_dictionary["cs_observer"][timestamp] = {
-                    "loss_percentage": compute_loss_ref_gen(generation, reflection), 
-                    "generation_#": generation, 
-                    "reflection_#": reflection,
-                    "cum_loss_percentage": compute_loss_ref_gen(clientserver_cumulative_generation, clientserver_cumulative_reflection), 
-                    "cum_generation_#": clientserver_cumulative_generation, 
-                    "cum_reflection_#": clientserver_cumulative_reflection}
-
-                if serverclient_last_generation is not None and serverclient_last_reflection is not None and clientserver_last_generation is not None and clientserver_last_reflection is not None:
-                    # With this information, we can compute the loss between the observer on the reverse path and the observer on the forward path
-                    
-                    clientserver_halfloss_cumulative_generation += serverclient_last_generation
-                    clientserver_halfloss_cumulative_reflection += clientserver_last_reflection
-
-                    return_dictionary["from_serverclient-observer_to_clientserver-observer"][timestamp] = {
-                        "loss_percentage": compute_loss_ref_gen(serverclient_last_generation, clientserver_last_reflection), 
-                        "generation_#": serverclient_last_generation, 
-                        "reflection_#": clientserver_last_reflection,
-                        "cum_loss_percentage": compute_loss_ref_gen(clientserver_halfloss_cumulative_generation, clientserver_halfloss_cumulative_reflection), 
-                        "cum_generation_#": clientserver_halfloss_cumulative_generation, 
-                        "cum_reflection_#": clientserver_halfloss_cumulative_reflection}
-
-                clientserver_last_generation = generation
-                clientserver_last_reflection = reflection
-
-
-            elif measurements[timestamp]["direction"] == "server_client":
-
-                serverclient_cumulative_generation += generation
-                serverclient_cumulative_reflection += reflection
-
-                return_dictionary["sc_observer"][timestamp] = {
-                    "loss_percentage": compute_loss_ref_gen(generation, reflection), 
-                    "generation_#": generation, 
-                    "reflection_#": reflection,
-                    "cum_loss_percentage": compute_loss_ref_gen(serverclient_cumulative_generation, serverclient_cumulative_reflection), 
-                    "cum_generation_#": serverclient_cumulative_generation, 
-                    "cum_reflection_#": serverclient_cumulative_reflection}
-                if clientserver_last_generation is not None and clientserver_last_reflection is not None:
-                    # With this information, we can compute the loss between the observer on the forward path and the observer on the reverse path
-
-                    serverclient_halfloss_cumulative_generation_phase1 += generation
-                    serverclient_halfloss_cumulative_generation_phase2 += reflection
-                    serverclient_halfloss_cumulative_reflection_phase1 += clientserver_last_generation
-                    serverclient_halfloss_cumulative_reflection_phase2 +=  clientserver_last_reflection
-                    
-                    return_dictionary["from_clientserver-observer_to_serverclient-observer"][timestamp] = {
-                        "phase1_loss_percentage": compute_loss_ref_gen(generation, clientserver_last_generation), 
-                        "phase1_generation_#": generation,
-                        "phase1_reflection_#": clientserver_last_generation,
-                        "phase2_loss_percentage": compute_loss_ref_gen(reflection, clientserver_last_reflection),
-                        "phase2_generation_#": reflection,
-                        "phase2_reflection_#": clientserver_last_reflection,
-                        "cum_phase1_loss_percentage": compute_loss_ref_gen(serverclient_halfloss_cumulative_generation_phase1, serverclient_halfloss_cumulative_reflection_phase1), 
-                        "cum_phase1_generation_#": serverclient_halfloss_cumulative_generation_phase1,
-                        "cum_phase1_reflection_#": serverclient_halfloss_cumulative_reflection_phase1,
-                        "cum_phase2_loss_percentage": compute_loss_ref_gen(serverclient_halfloss_cumulative_generation_phase2, serverclient_halfloss_cumulative_reflection_phase2),
-                        "cum_phase2_generation_#": serverclient_halfloss_cumulative_generation_phase2,
-                        "cum_phase2_reflection_#": serverclient_halfloss_cumulative_reflection_phase2}
-
-                serverclient_last_generation = generation
-                serverclient_last_reflection = reflection
+def compute_loss_packet_count_array(overall_packets, lost_packets):
+    """
+    Vectorized version of compute_loss_packet_count for NumPy arrays.
+    """
 
-    return return_dictionary
+    overall_packets = np.asarray(overall_packets, dtype=np.float64)
+    lost_packets = np.asarray(lost_packets, dtype=np.float64)
+    loss = (lost_packets / np.where(overall_packets != 0, overall_packets, 1.0))*100
 
+    return np.where(overall_packets != 0, np.maximum(loss, 0.0), 100.0)
 
 
-def analyze_lbit(lbit_filename, output=False):
 
+"""
+Columnar loading of the go-based observer output.
+Each observer file is turned into a dictionary of typed NumPy arrays (one entry per line) that the vectorized loss engine below works on.
+
+The observers either write CSV files or, with --outputFormat npy, .npy files of packed records (see the Binary output section of the go files).
+The .npy files are memory-mapped so that their columns are used without parsing or copying; the CSV files remain supported as a fallback.
+"""
+
+### Host part of the client address. The client of every experiment slot is 10.0.<slot+1>.1 (see custom_mininet_topo.py).
+### Flows starting at the client are in client-server direction.
+CLIENT_HOST_ADDRESS = 1
+
+DIRECTION_CLIENT_SERVER = 0
+DIRECTION_SERVER_CLIENT = 1
+
+
+### Kinds of the records in groundtruth_overall_packets_and_loss_count
+GROUNDTRUTH_KIND_LOSSCOUNT = 0
+GROUNDTRUTH_KIND_OVERALLCOUNT = 1
+
+
+def _direction_of_flow(flow_identifier):
+
+    return DIRECTION_CLIENT_SERVER if int(flow_identifier.split("-")[0].rsplit(".", 1)[1]) == CLIENT_HOST_ADDRESS else DIRECTION_SERVER_CLIENT
+
+
+def _is_binary(filename):
+
+    return filename.endswith(".npy")
+
+
+def _load_records(filename):
+    """
+    Memory-map a .npy file written by the go-based observers.
     """
-    This function takes pre-processed input from the go-based observers and creates plottable results for the L-Bit.  
 
-    Source format:
-    10.0.1.1-10.0.1.2-10000-1234,2021-03-17 16:59:46.722122 +0000 UTC,false
+    return np.load(filename, mmap_mode="r")
+
+
+def _direction_of_records(records):
+
+    return np.where((records["src_ip"] & 0xff) == CLIENT_HOST_ADDRESS, DIRECTION_CLIENT_SERVER, DIRECTION_SERVER_CLIENT).astype(np.int8)
+
+
+def preprocessed_artifact(preprocessed_folder, prefix, artifact):
+    """
+    Path of an artifact (e.g. tbit or groundtruth_loss_clientswitch) of one measurement (prefix).
+    If both formats are present (the output format was switched between runs), the more recently written file is used.
     """
 
-    if output:
-        print("analyze_lbit")
+    binary_filename = os.path.join(preprocessed_folder, prefix + "+-+" + artifact + ".npy")
+    csv_filename = os.path.join(preprocessed_folder, prefix + "+-+" + artifact + ".csv")
 
+    if not os.path.exists(binary_filename):
+        return csv_filename
+    if os.path.exists(csv_filename) and os.stat(csv_filename).st_mtime_ns > os.stat(binary_filename).st_mtime_ns:
+        return csv_filename
 
-    ## Prepare the return dictionary
-    return_dictionary = {   "2dir_observer" : {}, 
-                            "cs_observer" : {},
-                            "sc_observer" : {}}
-    
-    with open(lbit_filename) as inputFile:
+    return binary_filename
 
-        clientserver_loss = 0
-        clientserver_packets = 0
-        serverclient_loss = 0
-        serverclient_packets = 0
 
+def load_tbit_columns(tbit_filename):
+    """
+    Load the T-Bit observer output into the columns epoch_ns, direction, generation, reflection.
+    epoch_ns is the end timestamp of the measurement.
+    """
+
+    if _is_binary(tbit_filename):
+        records = _load_records(tbit_filename)
+        return {"epoch_ns": records["end_ns"],
+                "direction": _direction_of_records(records),
+                "generation": records["generation"],
+                "reflection": records["reflection"]}
+
+    epoch_ns = array.array("q")
+    direction = array.array("b")
+    generation = array.array("q")
+    reflection = array.array("q")
+
+    with open(tbit_filename) as inputFile:
         for line in inputFile:
 
             content = line.split(",")
 
-            src = str(content[0].split("-")[0])
+            direction.append(_direction_of_flow(content[0]))
+            epoch_ns.append(decode_go_timestamp_ns(content[2]))
+            generation.append(int(content[3].split(":")[1]))
+            reflection.append(int(content[4].split(":")[1]))
 
-            timestamp = content[1]
-            timestamp = parseDateTime_withErrorHandling(timestamp)
+    return {"epoch_ns": np.frombuffer(epoch_ns, dtype=np.int64),
+            "direction": np.frombuffer(direction, dtype=np.int8),
+            "generation": np.frombuffer(generation, dtype=np.int64),
+            "reflection": np.frombuffer(reflection, dtype=np.int64)}
 
-            if "false" in content[2]:
-                drop = False
-            elif "true" in content[2]:
-                drop = True
-            direction = "client_server" if src == "10.0.1.1" else "server_client"
 
-            if direction == "client_server":
+def load_square_bit_columns(square_bit_filename):
+    """
+    Load the Q-Bit or R-Bit observer output into the columns epoch_ns, direction, phase, count, nominal.
+    epoch_ns is the end timestamp of the measurement.
+    """
 
-                if drop:
-                    clientserver_loss += 1
-                clientserver_packets += 1
+    if _is_binary(square_bit_filename):
+        records = _load_records(square_bit_filename)
+        return {"epoch_ns": records["end_ns"],
+                "direction": _direction_of_records(records),
+                "phase": records["phase"],
+                "count": records["count"],
+                "nominal": records["nominal"]}
+
+    epoch_ns = array.array("q")
+    direction = array.array("b")
+    phase = array.array("b")
+    count = array.array("q")
+    nominal = array.array("q")
+
+    with open(square_bit_filename) as inputFile:
+        for line in inputFile:
 
-                return_dictionary["cs_observer"][timestamp] = {   "loss_percentage": compute_loss_packet_count(clientserver_packets, clientserver_loss),
-                                                                            "lost_packets_#": clientserver_loss,
-                                                                            "overall_packets_#": clientserver_packets}
+            content = line.split(",")
 
-            elif direction == "server_client":
+            direction.append(_direction_of_flow(content[0]))
+            epoch_ns.append(decode_go_timestamp_ns(content[2]))
+            phase.append(int(content[3].split(":")[1]))
+            count.append(int(content[4].split(":")[1]))
+            nominal.append(int(content[5].split(":")[1]))
 
-                if drop:
-                    serverclient_loss += 1
-                serverclient_packets += 1
+    return {"epoch_ns": np.frombuffer(epoch_ns, dtype=np.int64),
+            "direction": np.frombuffer(direction, dtype=np.int8),
+            "phase": np.frombuffer(phase, dtype=np.int8),
+            "count": np.frombuffer(count, dtype=np.int64),
+            "nominal": np.frombuffer(nominal, dtype=np.int64)}
 
-                return_dictionary["sc_observer"][timestamp] = {   "loss_percentage": compute_loss_packet_count(serverclient_packets, serverclient_loss),
-                                                                            "lost_packets_#": serverclient_loss,
-                                                                            "overall_packets_#": serverclient_packets}
 
-            return_dictionary["2dir_observer"][timestamp] = {    
-                "loss_percentage": compute_loss_packet_count(serverclient_packets + clientserver_packets, serverclient_loss + clientserver_loss),
-                "lost_packets_#": serverclient_loss + clientserver_loss,
-                "overall_packets_#": serverclient_packets + clientserver_packets}
-    
-    return return_dictionary
+def load_lbit_columns(lbit_filename):
+    """
+    Load the L-Bit observer output into the columns epoch_ns, direction, drop.
+    The rows keep the order of the file.
+    """
 
+    if _is_binary(lbit_filename):
+        records = _load_records(lbit_filename)
+        return {"epoch_ns": records["timestamp_ns"],
+                "direction": _direction_of_records(records),
+                "drop": records["loss_event"] != 0}
 
+    epoch_ns = array.array("q")
+    direction = array.array("b")
+    drop = array.array("b")
 
-def analyze_qbit(qbit_filename, output=False):
+    with open(lbit_filename) as inputFile:
+        for line in inputFile:
+
+            content = line.split(",")
 
+            direction.append(_direction_of_flow(content[0]))
+            epoch_ns.append(decode_go_timestamp_ns(content[1]))
+            drop.append("true" in content[2])
+
+    return {"epoch_ns": np.frombuffer(epoch_ns, dtype=np.int64),
+            "direction": np.frombuffer(direction, dtype=np.int8),
+            "drop": np.frombuffer(drop, dtype=np.int8).astype(bool)}
+
+
+def load_groundtruth_loss_columns(groundtruth_loss_filename):
+    """
+    Load one of the groundtruth_loss_* files into the columns epoch_ns, loss (number of packets dropped so far).
+    The rows keep the order of the file.
     """
-    This function takes pre-processed input from the go-based observers and creates plottable results for the Q-Bit.  
 
-    Source format:
-    10.0.1.1-10.0.1.2-10000-1234,2021-03-17 09:50:38.669383 +0000 UTC,2021-03-17 09:50:38.880627 +0000 UTC,Phase: 0,Count: 59,Nominal Length:64,X Value:0
+    if _is_binary(groundtruth_loss_filename):
+        records = _load_records(groundtruth_loss_filename)
+        return {"epoch_ns": records["timestamp_ns"],
+                "loss": records["loss"]}
+
+    epoch_ns = array.array("q")
+    loss = array.array("q")
+
+    with open(groundtruth_loss_filename) as inputFile:
+        for line in inputFile:
+
+            content = line.split(",")
+
+            epoch_ns.append(decode_go_timestamp_ns(content[0]))
+            loss.append(int(content[1]))
+
+    return {"epoch_ns": np.frombuffer(epoch_ns, dtype=np.int64),
+            "loss": np.frombuffer(loss, dtype=np.int64)}
+
+
+def load_groundtruth_overall_columns(paper_eval_file):
+    """
+    Load the groundtruth_overall_packets_and_loss_count file into the columns kind (GROUNDTRUTH_KIND_*), epoch_ns, value.
+    The rows keep the order of the file.
     """
 
-    if output:
-        print("analyze_qbit")
-    
-    with open(qbit_filename) as inputFile:
+    if _is_binary(paper_eval_file):
+        records = _load_records(paper_eval_file)
+        return {"kind": records["kind"],
+                "epoch_ns": records["timestamp_ns"],
+                "value": records["value"]}
+
+    kind = array.array("b")
+    epoch_ns = array.array("q")
+    value = array.array("q")
 
-        measurements = {}
+    with open(paper_eval_file) as inputFile:
         for line in inputFile:
 
             content = line.split(",")
 
-            src = str(content[0].split("-")[0])
+            if content[0] == "losscount":
+                kind.append(GROUNDTRUTH_KIND_LOSSCOUNT)
+            elif content[0] == "overallcount":
+                kind.append(GROUNDTRUTH_KIND_OVERALLCOUNT)
+            else:
+                continue
+
+            epoch_ns.append(decode_go_timestamp_ns(content[1]))
+            value.append(int(content[2]))
+
+    return {"kind": np.frombuffer(kind, dtype=np.int8),
+            "epoch_ns": np.frombuffer(epoch_ns, dtype=np.int64),
+            "value": np.frombuffer(value, dtype=np.int64)}
+
+
+def sort_and_deduplicate_columns(columns):
+    """
+    Sort all columns by epoch_ns. Of several rows with the same timestamp, only the last one of the file is kept.
+    This mirrors the former behavior of collecting measurements in a dictionary keyed by timestamp.
+    """
+
+    order = np.argsort(columns["epoch_ns"], kind="stable")
+    sorted_timestamps = columns["epoch_ns"][order]
+
+    keep = np.ones(len(order), dtype=bool)
+    keep[:-1] = sorted_timestamps[1:] != sorted_timestamps[:-1]
+    order = order[keep]
+
+    return {name: values[order] for name, values in columns.items()}
+
+
+def _previous_row_of_direction(direction, wanted_direction):
+    """
+    For every row, return the index of the closest preceding row with the wanted direction (-1 if there is none).
+    """
+
+    if len(direction) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    indices = np.arange(len(direction))
+    latest = np.maximum.accumulate(np.where(direction == wanted_direction, indices, -1))
+    return np.concatenate(([-1], latest[:-1]))
+
+
+def compute_tbit_series(columns):
+    """
+    Vectorized cumulative loss computation for the T-Bit.
+    Expects sorted and deduplicated columns (see sort_and_deduplicate_columns) and returns one dictionary of arrays per observer.
+    """
+
+    epoch_ns = columns["epoch_ns"]
+    direction = columns["direction"]
+    generation = columns["generation"]
+    reflection = columns["reflection"]
+
+    def observer_series(rows, generation, reflection):
+
+        cumulative_generation = np.cumsum(generation)
+        cumulative_reflection = np.cumsum(reflection)
+
+        return {"epoch_ns": epoch_ns[rows],
+                "loss_percentage": compute_loss_ref_gen_array(generation, reflection),
+                "generation_#": generation,
+                "reflection_#": reflection,
+                "cum_loss_percentage": compute_loss_ref_gen_array(cumulative_generation, cumulative_reflection),
+                "cum_generation_#": cumulative_generation,
+                "cum_reflection_#": cumulative_reflection}
+
+    all_rows = np.arange(len(epoch_ns))
+    clientserver_rows = np.flatnonzero(direction == DIRECTION_CLIENT_SERVER)
+    serverclient_rows = np.flatnonzero(direction == DIRECTION_SERVER_CLIENT)
+
+    previous_clientserver = _previous_row_of_direction(direction, DIRECTION_CLIENT_SERVER)
+    previous_serverclient = _previous_row_of_direction(direction, DIRECTION_SERVER_CLIENT)
+
+    ### Loss between the observer on the reverse path and the observer on the forward path
+    halfloss_clientserver_rows = clientserver_rows[(previous_serverclient[clientserver_rows] >= 0) & (previous_clientserver[clientserver_rows] >= 0)]
+
+    ### Loss between the observer on the forward path and the observer on the reverse path
+    halfloss_serverclient_rows = serverclient_rows[previous_clientserver[serverclient_rows] >= 0]
+    phase1_generation = generation[halfloss_serverclient_rows]
+    phase1_reflection = generation[previous_clientserver[halfloss_serverclient_rows]]
+    phase2_generation = reflection[halfloss_serverclient_rows]
+    phase2_reflection = reflection[previous_clientserver[halfloss_serverclient_rows]]
+    cumulative_phase1_generation = np.cumsum(phase1_generation)
+    cumulative_phase1_reflection = np.cumsum(phase1_reflection)
+    cumulative_phase2_generation = np.cumsum(phase2_generation)
+    cumulative_phase2_reflection = np.cumsum(phase2_reflection)
+
+    return {"2dir_observer": observer_series(all_rows, generation, reflection),
+            "cs_observer": observer_series(clientserver_rows, generation[clientserver_rows], reflection[clientserver_rows]),
+            "sc_observer": observer_series(serverclient_rows, generation[serverclient_rows], reflection[serverclient_rows]),
+            "from_serverclient-observer_to_clientserver-observer": observer_series(halfloss_clientserver_rows,
+                                                                                   generation[previous_serverclient[halfloss_clientserver_rows]],
+                                                                                   reflection[previous_clientserver[halfloss_clientserver_rows]]),
+            "from_clientserver-observer_to_serverclient-observer": {
+                "epoch_ns": epoch_ns[halfloss_serverclient_rows],
+                "phase1_loss_percentage": compute_loss_ref_gen_array(phase1_generation, phase1_reflection),
+                "phase1_generation_#": phase1_generation,
+                "phase1_reflection_#": phase1_reflection,
+                "phase2_loss_percentage": compute_loss_ref_gen_array(phase2_generation, phase2_reflection),
+                "phase2_generation_#": phase2_generation,
+                "phase2_reflection_#": phase2_reflection,
+                "cum_phase1_loss_percentage": compute_loss_ref_gen_array(cumulative_phase1_generation, cumulative_phase1_reflection),
+                "cum_phase1_generation_#": cumulative_phase1_generation,
+                "cum_phase1_reflection_#": cumulative_phase1_reflection,
+                "cum_phase2_loss_percentage": compute_loss_ref_gen_array(cumulative_phase2_generation, cumulative_phase2_reflection),
+                "cum_phase2_generation_#": cumulative_phase2_generation,
+                "cum_phase2_reflection_#": cumulative_phase2_reflection}}
+
+
+def compute_square_bit_series(columns, counter_name):
+    """
+    Vectorized cumulative loss computation for the Q-Bit and the R-Bit.
+    Expects sorted and deduplicated columns (see sort_and_deduplicate_columns) and returns one dictionary of arrays per observer.
+    counter_name: prefix of the count fields in the output (qbit/rbit)
+    """
+
+    epoch_ns = columns["epoch_ns"]
+    direction = columns["direction"]
+
+    def observer_series(rows):
+
+        nominal = columns["nominal"][rows]
+        count = columns["count"][rows]
+        cumulative_nominal = np.cumsum(nominal)
+        cumulative_count = np.cumsum(count)
+
+        return {"epoch_ns": epoch_ns[rows],
+                "loss_percentage": compute_loss_nominal_count_array(nominal, count),
+                "nominal_#": nominal,
+                counter_name + "_#": count,
+                "cum_loss_percentage": compute_loss_nominal_count_array(cumulative_nominal, cumulative_count),
+                "cum_nominal_#": cumulative_nominal,
+                "cum_" + counter_name + "_#": cumulative_count}
+
+    return {"2dir_observer": observer_series(np.arange(len(epoch_ns))),
+            "cs_observer": observer_series(np.flatnonzero(direction == DIRECTION_CLIENT_SERVER)),
+            "sc_observer": observer_series(np.flatnonzero(direction == DIRECTION_SERVER_CLIENT))}
+
+
+def compute_lbit_series(columns):
+    """
+    Vectorized loss computation for the L-Bit.
+    Works on the rows in file order and returns one dictionary of arrays per observer.
+    """
+
+    epoch_ns = columns["epoch_ns"]
+    direction = columns["direction"]
+    drop = columns["drop"]
+
+    def observer_series(rows):
+
+        lost_packets = np.cumsum(drop[rows], dtype=np.int64)
+        overall_packets = np.arange(1, len(rows) + 1, dtype=np.int64)
+
+        return {"epoch_ns": epoch_ns[rows],
+                "loss_percentage": compute_loss_packet_count_array(overall_packets, lost_packets),
+                "lost_packets_#": lost_packets,
+                "overall_packets_#": overall_packets}
+
+    return {"2dir_observer": observer_series(np.arange(len(epoch_ns))),
+            "cs_observer": observer_series(np.flatnonzero(direction == DIRECTION_CLIENT_SERVER)),
+            "sc_observer": observer_series(np.flatnonzero(direction == DIRECTION_SERVER_CLIENT))}
+
+
+def _as_of(event_ns, event_values, query_ns, default=0):
+    """
+    As-of join: for every query timestamp, take the value of the latest event at or before it.
+    event_ns has to be sorted; of several events with the same timestamp, the last one is taken. Returns the values (default where there is no such event) and a mask of the queries that have one.
+    """
+
+    rows = np.searchsorted(event_ns, query_ns, side="right") - 1
+    found = rows >= 0
+
+    if len(event_values) == 0:
+        return np.full(len(query_ns), default, dtype=np.int64), found
+
+    return np.where(found, event_values[np.maximum(rows, 0)], default), found
+
+
+def _merge_timestamps(*sorted_epoch_ns):
+    """
+    Merge sorted and duplicate-free timestamp arrays into one sorted array without duplicates.
+    The stable sort merges the already sorted runs in linear time.
+    """
+
+    merged = np.sort(np.concatenate(sorted_epoch_ns), kind="stable")
+    if len(merged) == 0:
+        return merged
+
+    keep = np.ones(len(merged), dtype=bool)
+    keep[1:] = merged[1:] != merged[:-1]
+    return merged[keep]
+
+
+def _contained_in(epoch_ns, sorted_epoch_ns):
+    """
+    Mask of the timestamps that also occur in the sorted array sorted_epoch_ns.
+    """
+
+    if len(sorted_epoch_ns) == 0:
+        return np.zeros(len(epoch_ns), dtype=bool)
+
+    rows = np.minimum(np.searchsorted(sorted_epoch_ns, epoch_ns), len(sorted_epoch_ns) - 1)
+    return sorted_epoch_ns[rows] == epoch_ns
+
+
+def _groundtruth_counter_stream(columns):
+    """
+    Turn the rows of a groundtruth_loss_* file into a stream sorted by epoch_ns with the columns count (number of rows so far) and loss.
+    """
+
+    return sort_and_deduplicate_columns({"epoch_ns": columns["epoch_ns"],
+                                         "count": np.arange(1, len(columns["epoch_ns"]) + 1, dtype=np.int64),
+                                         "loss": columns["loss"]})
 
-            start_timestamp = content[1]
-            end_timestamp = content[2]
-            start_timestamp = parseDateTime_withErrorHandling(start_timestamp)
-            end_timestamp = parseDateTime_withErrorHandling(end_timestamp)
 
-            phase = int(content[3].split(":")[1].strip(" "))
+def _paper_eval_stream(columns):
+    """
+    Merge the losscount and overallcount rows of groundtruth_overall_packets_and_loss_count into one stream sorted by epoch_ns.
+    At every timestamp of either kind, both counters carry their latest value forward (0 before their first row).
+    """
 
-            count = int(content[4].split(":")[1].strip(" "))
+    losscount = columns["kind"] == GROUNDTRUTH_KIND_LOSSCOUNT
+    overallcount = columns["kind"] == GROUNDTRUTH_KIND_OVERALLCOUNT
 
-            nominal_count = int(content[5].split(":")[1].strip(" "))
+    loss = sort_and_deduplicate_columns({"epoch_ns": columns["epoch_ns"][losscount], "value": columns["value"][losscount]})
+    packets = sort_and_deduplicate_columns({"epoch_ns": columns["epoch_ns"][overallcount], "value": columns["value"][overallcount]})
 
-            measurements[end_timestamp] = {"direction" : "client_server" if src == "10.0.1.1" else "server_client",
-                                            "#": count,
-                                            "nominal_#": nominal_count,
-                                            "phase": phase}
+    epoch_ns = _merge_timestamps(loss["epoch_ns"], packets["epoch_ns"])
 
+    return {"epoch_ns": epoch_ns,
+            "count": _as_of(packets["epoch_ns"], packets["value"], epoch_ns)[0],
+            "loss": _as_of(loss["epoch_ns"], loss["value"], epoch_ns)[0]}
 
-        return_dictionary = {   "2dir_observer" : {}, 
-                                "cs_observer" : {},
-                                "sc_observer" : {}}
 
-        bidirectional_cumulative_nominal = 0
-        bidirectional_cumulative_count = 0
-        clientserver_cumulative_nominal = 0
-        clientserver_cumulative_count = 0
-        serverclient_cumulative_nominal = 0
-        serverclient_cumulative_count = 0
+def _override_stream(stream, overriding_stream):
+    """
+    Merge two sorted streams. At timestamps present in both, the row of overriding_stream is used.
+    """
 
-        for timestamp in sorted(measurements.keys()):
+    keep = ~_contained_in(stream["epoch_ns"], overriding_stream["epoch_ns"])
+    merged = {name: np.concatenate((stream[name][keep], overriding_stream[name])) for name in stream.keys()}
+    order = np.argsort(merged["epoch_ns"], kind="stable")
+
+    return {name: values[order] for name, values in merged.items()}
+
+
+def _combine_segments(first_segment, second_segment):
+    """
+    Loss along two consecutive segments: at every timestamp of either stream (once both have started), the packets counted on the first segment and the losses of both segments.
+    """
 
-            nominal = measurements[timestamp]["nominal_#"]
-            bidirectional_cumulative_nominal += nominal
-            count = measurements[timestamp]["#"] 
-            bidirectional_cumulative_count += count
+    epoch_ns = _merge_timestamps(first_segment["epoch_ns"], second_segment["epoch_ns"])
 
-            return_dictionary["2dir_observer"][timestamp] = {
-                "loss_percentage": compute_loss_nominal_count(nominal, count), 
-                "nominal_#": nominal, 
-                "qbit_#": count,
-                "cum_loss_percentage": compute_loss_nominal_count(bidirectional_cumulative_nominal, bidirectional_cumulative_count), 
-                "cum_nominal_#": bidirectional_cumulative_nominal, 
-                "cum_qbit_#": bidirectional_cumulative_count}
+    first_count, first_found = _as_of(first_segment["epoch_ns"], first_segment["count"], epoch_ns)
+    first_loss = _as_of(first_segment["epoch_ns"], first_segment["loss"], epoch_ns)[0]
+    second_loss, second_found = _as_of(second_segment["epoch_ns"], second_segment["loss"], epoch_ns)
 
+    rows = first_found & second_found
 
-            if measurements[timestamp]["direction"] == "client_server":
+    return {"epoch_ns": epoch_ns[rows], "count": first_count[rows], "loss": first_loss[rows] + second_loss[rows]}
 
-                clientserver_cumulative_nominal += nominal
-                clientserver_cumulative_count += count
 
-                return_dictionary["cs_observer"][timestamp] = {
-                    "loss_percentage": compute_loss_nominal_count(nominal, count), 
-                    "nominal_#": nominal, 
-                    "qbit_#": count,
-                    "cum_loss_percentage": compute_loss_nominal_count(clientserver_cumulative_nominal, clientserver_cumulative_count), 
-                    "cum_nominal_#": clientserver_cumulative_nominal, 
-                    "cum_qbit_#": clientserver_cumulative_count}
+def compute_groundtruth_series(clientswitch_columns, serverswitch_columns, switchclient_columns, switchserver_columns, paper_eval_columns):
+    """
+    Vectorized groundtruth computation as a sorted merge of the groundtruth streams.
+    Expects the columns of load_groundtruth_loss_columns/load_groundtruth_overall_columns and returns one dictionary of arrays per segment (clientswitch, switchserver, cs, serverswitch, switchclient, sc).
+
+    For switchserver, the rows of the paper_eval file (the link under study) take precedence over the rows of the groundtruth_loss_switchserver file.
+    """
+
+    clientswitch = _groundtruth_counter_stream(clientswitch_columns)
+    serverswitch = _groundtruth_counter_stream(serverswitch_columns)
+    switchclient = _groundtruth_counter_stream(switchclient_columns)
+    switchserver = _override_stream(_groundtruth_counter_stream(switchserver_columns), _paper_eval_stream(paper_eval_columns))
+
+    def segment_series(stream):
+
+        return {"epoch_ns": stream["epoch_ns"],
+                "count_overall_packets": stream["count"],
+                "count_loss": stream["loss"],
+                "loss_percentage": compute_loss_packet_count_array(stream["count"], stream["loss"])}
+
+    return {"clientswitch": segment_series(clientswitch),
+            "switchserver": segment_series(switchserver),
+            "cs": segment_series(_combine_segments(clientswitch, switchserver)),
+            "serverswitch": segment_series(serverswitch),
+            "switchclient": segment_series(switchclient),
+            "sc": segment_series(_combine_segments(serverswitch, switchclient))}
+
+
+def series_to_dictionary(series):
+    """
+    Convert the per-observer arrays of a compute_*_series function into the nested {observer: {timestamp: {field: value}}} dictionaries used for plotting.
+    """
 
-            elif measurements[timestamp]["direction"] == "server_client":
+    return_dictionary = {}
+    for observer, observer_series in series.items():
 
-                serverclient_cumulative_nominal += nominal
-                serverclient_cumulative_count += count 
+        fields = [name for name in observer_series.keys() if name != "epoch_ns"]
+        columns = [observer_series[name].tolist() for name in fields]
 
-                return_dictionary["sc_observer"][timestamp] = {
-                    "loss_percentage": compute_loss_nominal_count(nominal, count), 
-                    "nominal_#": nominal, 
-                    "qbit_#": count,
-                    "cum_loss_percentage": compute_loss_nominal_count(serverclient_cumulative_nominal, serverclient_cumulative_count), 
-                    "cum_nominal_#": serverclient_cumulative_nominal, 
-                    "cum_qbit_#": serverclient_cumulative_count}
+        return_dictionary[observer] = {timestamp: dict(zip(fields, values)) for timestamp, *values in zip(observer_series["epoch_ns"].tolist(), *columns)}
 
     return return_dictionary
 
 
-def analyze_rbit(rbit_filename,output=False):
 
+def analyze_tbit(tbit_filename, output=False):
     """
-    This function takes pre-processed input from the go-based observers and creates plottable results for the R-Bit.  
+    This function takes pre-processed input from the go-based observers and creates plottable results for the T-Bit. 
 
     Source format:
-    10.0.1.1-10.0.1.2-10000-1234,2021-03-17 10:08:15.616337 +0000 UTC,2021-03-17 10:08:15.795899 +0000 UTC,Phase: 1,Count: 60,Nominal Length:64,X Value:0
-    
-    Note that the output of the rbit alone is the 3/4 loss. More specifically, the loss of the opposite direction + the loss from the sender to the observer.
+    10.0.1.1-10.0.1.2-10000-1234,2021-03-16 16:37:55.983976 +0000 UTC,2021-03-16 16:37:56.370092 +0000 UTC,Generation: 12,Reflection: 13
     """
     if output:
-        print("analyze_rbit")
-    
-    with open(rbit_filename) as inputFile:
+        print("analyze_tbit")
 
-        measurements = {}
-        for line in inputFile:
+    columns = sort_and_deduplicate_columns(load_tbit_columns(tbit_filename))
 
-            content = line.split(",")
+    return series_to_dictionary(compute_tbit_series(columns))
 
-            src = str(content[0].split("-")[0])
 
-            start_timestamp = content[1]
-            end_timestamp = content[2]
-            start_timestamp = parseDateTime_withErrorHandling(start_timestamp)
-            end_timestamp = parseDateTime_withErrorHandling(end_timestamp)
 
-            phase = int(content[3].split(":")[1].strip(" "))
+def analyze_lbit(lbit_filename, output=False):
 
-            count = int(content[4].split(":")[1].strip(" "))
+    """
+    This function takes pre-processed input from the go-based observers and creates plottable results for the L-Bit.  
 
-            nominal_count = int(content[5].split(":")[1].strip(" "))
+    Source format:
+    10.0.1.1-10.0.1.2-10000-1234,2021-03-17 16:59:46.722122 +0000 UTC,false
+    """
 
-            measurements[end_timestamp] = {"direction" : "client_server" if src == "10.0.1.1" else "server_client",
-                                            "#": count,
-                                            "nominal_#": nominal_count,
-                                            "phase": phase}  
+    if output:
+        print("analyze_lbit")
 
-        return_dictionary = {   "2dir_observer" : {}, 
-                                "cs_observer" : {},
-                                "sc_observer" : {}}
+    return series_to_dictionary(compute_lbit_series(load_lbit_columns(lbit_filename)))
 
-        bidirectional_cumulative_nominal = 0
-        bidirectional_cumulative_count = 0
-        clientserver_cumulative_nominal = 0
-        clientserver_cumulative_count = 0
-        serverclient_cumulative_nominal = 0
-        serverclient_cumulative_count = 0
-        for timestamp in sorted(measurements.keys()):
 
-            nominal = measurements[timestamp]["nominal_#"]
-            bidirectional_cumulative_nominal += nominal
-            count = measurements[timestamp]["#"] 
-            bidirectional_cumulative_count += count
 
-            return_dictionary["2dir_observer"][timestamp] = {
-                "loss_percentage": compute_loss_nominal_count(nominal, count), 
-                "nominal_#": nominal, 
-                "rbit_#": count,
-                "cum_loss_percentage": compute_loss_nominal_count(bidirectional_cumulative_nominal, bidirectional_cumulative_count), 
-                "cum_nominal_#": bidirectional_cumulative_nominal, 
-                "cum_rbit_#": bidirectional_cumulative_count}
+def analyze_qbit(qbit_filename, output=False):
 
+    """
+    This function takes pre-processed input from the go-based observers and creates plottable results for the Q-Bit.  
 
-            if measurements[timestamp]["direction"] == "client_server":
+    Source format:
+    10.0.1.1-10.0.1.2-10000-1234,2021-03-17 09:50:38.669383 +0000 UTC,2021-03-17 09:50:38.880627 +0000 UTC,Phase: 0,Count: 59,Nominal Length:64,X Value:0
+    """
 
-                clientserver_cumulative_nominal += nominal
-                clientserver_cumulative_count += count
+    if output:
+        print("analyze_qbit")
 
-                return_dictionary["cs_observer"][timestamp] = {
-                    "loss_percentage": compute_loss_nominal_count(nominal, count), 
-                    "nominal_#": nominal, 
-                    "rbit_#": count,
-                    "cum_loss_percentage": compute_loss_nominal_count(clientserver_cumulative_nominal, clientserver_cumulative_count), 
-                    "cum_nominal_#": clientserver_cumulative_nominal, 
-                    "cum_rbit_#": clientserver_cumulative_count}
+    columns = sort_and_deduplicate_columns(load_square_bit_columns(qbit_filename))
 
-            elif measurements[timestamp]["direction"] == "server_client":
+    return series_to_dictionary(compute_square_bit_series(columns, "qbit"))
 
-                serverclient_cumulative_nominal += nominal
-                serverclient_cumulative_count += count 
 
-                return_dictionary["sc_observer"][timestamp] = {
-                    "loss_percentage": compute_loss_nominal_count(nominal, count), 
-                    "nominal_#": nominal, 
-                    "rbit_#": count,
-                    "cum_loss_percentage": compute_loss_nominal_count(serverclient_cumulative_nominal, serverclient_cumulative_count), 
-                    "cum_nominal_#": serverclient_cumulative_nominal, 
-                    "cum_rbit_#": serverclient_cumulative_count}
+def analyze_rbit(rbit_filename,output=False):
+
+    """
+    This function takes pre-processed input from the go-based observers and creates plottable results for the R-Bit.  
+
+    Source format:
+    10.0.1.1-10.0.1.2-10000-1234,2021-03-17 10:08:15.616337 +0000 UTC,2021-03-17 10:08:15.795899 +0000 UTC,Phase: 1,Count: 60,Nominal Length:64,X Value:0
+    
+    Note that the output of the rbit alone is the 3/4 loss. More specifically, the loss of the opposite direction + the loss from the sender to the observer.
+    """
+    if output:
+        print("analyze_rbit")
+
+    columns = sort_and_deduplicate_columns(load_square_bit_columns(rbit_filename))
+
+    return series_to_dictionary(compute_square_bit_series(columns, "rbit"))
 
-    return return_dictionary
 
 
 
@@ -506,365 +777,567 @@ def determine_groundtruth_Loss(filename_groundtruth_loss_clientswitch, filename_
     if output:
         print("determine Loss groundtruth")
 
-    return_dictionary = {   "clientswitch" : {},
-                            "switchserver" : {},
-                            "cs" : {},
-                            "serverswitch" : {},
-                            "switchclient" : {},
-                            "sc" : {}}
+    series = compute_groundtruth_series(clientswitch_columns=load_groundtruth_loss_columns(filename_groundtruth_loss_clientswitch),
+                                        serverswitch_columns=load_groundtruth_loss_columns(filename_groundtruth_loss_serverswitch),
+                                        switchclient_columns=load_groundtruth_loss_columns(filename_groundtruth_loss_switchclient),
+                                        switchserver_columns=load_groundtruth_loss_columns(filename_groundtruth_loss_switchserver),
+                                        paper_eval_columns=load_groundtruth_overall_columns(paper_eval_file))
 
-    loss_clientserver_preprocess = {}
-    loss_serverclient_preprocess = {}
-    
-    ### Client-Server Direction
-    with open(filename_groundtruth_loss_clientswitch) as inputFile:
+    return series_to_dictionary(series)
 
-        counter = 0
-        for line in inputFile:
-            counter += 1
 
-            content = line.split(",")
 
-            timestamp = parseDateTime_withErrorHandling(content[0])
-            overall_loss = int(content[1])
-            return_dictionary["clientswitch"][timestamp] = {"count_overall_packets": counter, "count_loss": overall_loss, "loss_percentage": compute_loss_packet_count(counter, overall_loss)}
+def analyze_prefix_timeseries(preprocessed_folder, prefix):
+    """
+    Determine the final loss values of one measurement (prefix) by computing the full time series of all observers and the groundtruth.
+    """
+
+    results = {}
+
+    tbit_filename = preprocessed_artifact(preprocessed_folder, prefix, "tbit")
+    tbit_series = compute_tbit_series(sort_and_deduplicate_columns(load_tbit_columns(tbit_filename)))["sc_observer"]
+
+    if len(tbit_series["epoch_ns"]) > 0:
+        results["tbit"] = compute_loss_ref_gen(int(tbit_series["cum_generation_#"][-1]), int(tbit_series["cum_reflection_#"][-1]))
+    else:
+        results["tbit"] = -42
+
+    lbit_filename = preprocessed_artifact(preprocessed_folder, prefix, "lbit")         
+    lbit_series = compute_lbit_series(load_lbit_columns(lbit_filename))["sc_observer"]
+
+    if len(lbit_series["epoch_ns"]) > 0:
+        ### L-Bit rows are in file order: use the last row carrying the latest timestamp
+        last_row = _last_row_of_latest_timestamp(lbit_series["epoch_ns"])
+        results["lbit"] = compute_loss_packet_count(int(lbit_series["overall_packets_#"][last_row]), int(lbit_series["lost_packets_#"][last_row]))
+    else:
+        results["lbit"] = -42
+
+    qbit_filename = preprocessed_artifact(preprocessed_folder, prefix, "qbit")
+    qbit_series = compute_square_bit_series(sort_and_deduplicate_columns(load_square_bit_columns(qbit_filename)), "qbit")["sc_observer"]
+
+    if len(qbit_series["epoch_ns"]) > 0:
+        results["qbit"] = compute_loss_nominal_count(int(qbit_series["cum_nominal_#"][-1]), int(qbit_series["cum_qbit_#"][-1]))
+    else:
+        results["qbit"] = -42
+
+    rbit_filename = preprocessed_artifact(preprocessed_folder, prefix, "rbit")
+    rbit_series = compute_square_bit_series(sort_and_deduplicate_columns(load_square_bit_columns(rbit_filename)), "rbit")["sc_observer"]
+
+    if len(rbit_series["epoch_ns"]) > 0:
+        results["rbit"] = compute_loss_nominal_count(int(rbit_series["cum_nominal_#"][-1]), int(rbit_series["cum_rbit_#"][-1]))
+    else:
+        results["rbit"] = -42
+
+    ### Determine Groundtruth
+    groundtruth_series = compute_groundtruth_series(
+        clientswitch_columns=load_groundtruth_loss_columns(preprocessed_artifact(preprocessed_folder, prefix, "groundtruth_loss_clientswitch")),
+        serverswitch_columns=load_groundtruth_loss_columns(preprocessed_artifact(preprocessed_folder, prefix, "groundtruth_loss_serverswitch")),
+        switchclient_columns=load_groundtruth_loss_columns(preprocessed_artifact(preprocessed_folder, prefix, "groundtruth_loss_switchclient")),
+        switchserver_columns=load_groundtruth_loss_columns(preprocessed_artifact(preprocessed_folder, prefix, "groundtruth_loss_switchserver")),
+        paper_eval_columns=load_groundtruth_overall_columns(preprocessed_artifact(preprocessed_folder, prefix, "groundtruth_overall_packets_and_loss_count"))
+    )["switchserver"]
+
+    if len(groundtruth_series["epoch_ns"]) > 0:
+        results["groundtruth"] = compute_loss_packet_count(int(groundtruth_series["count_overall_packets"][-1]), int(groundtruth_series["count_loss"][-1]))
+    else:
+        results["groundtruth"] = -42
+
+    return results
+
+
+
+def _last_row_of_latest_timestamp(epoch_ns):
+    """
+    Index of the last row carrying the latest timestamp (None if there are no rows). Matches the ">=" updates of the streaming summaries.
+    """
+
+    if len(epoch_ns) == 0:
+        return None
+
+    return len(epoch_ns) - 1 - int(np.argmax(epoch_ns[::-1]))
+
+
+def summarize_tbit(tbit_filename):
+    """
+    Compute only the final cumulative loss of the server-client T-Bit observer, without its time series.
+    Returns None if there is no server-client measurement.
+
+    As in analyze_tbit, of several rows with the same end timestamp only the last one counts (see sort_and_deduplicate_columns).
+    """
+
+    columns = sort_and_deduplicate_columns(load_tbit_columns(tbit_filename))
+    serverclient = columns["direction"] == DIRECTION_SERVER_CLIENT
+    if not serverclient.any():
+        return None
+
+    return compute_loss_ref_gen(int(columns["generation"][serverclient].sum()), int(columns["reflection"][serverclient].sum()))
+
+
+def summarize_square_bit(square_bit_filename):
+    """
+    Compute only the final cumulative loss of the server-client Q-Bit or R-Bit observer, without its time series.
+    Returns None if there is no server-client measurement.
+
+    As in analyze_qbit/analyze_rbit, of several rows with the same end timestamp only the last one counts (see sort_and_deduplicate_columns).
+    """
+
+    columns = sort_and_deduplicate_columns(load_square_bit_columns(square_bit_filename))
+    serverclient = columns["direction"] == DIRECTION_SERVER_CLIENT
+    if not serverclient.any():
+        return None
+
+    return compute_loss_nominal_count(int(columns["nominal"][serverclient].sum()), int(columns["count"][serverclient].sum()))
 
-            loss_clientserver_preprocess[timestamp] = {"overall_hits_clientswitch": counter, "overall_loss_clientswitch": overall_loss}
 
+def summarize_lbit(lbit_filename):
+    """
+    Stream the L-Bit observer output and return the loss percentage of the server-client observer at its latest timestamp.
+    Returns None if there is no server-client packet.
+    """
+
+    if _is_binary(lbit_filename):
+        columns = load_lbit_columns(lbit_filename)
+        serverclient = columns["direction"] == DIRECTION_SERVER_CLIENT
+        latest_row = _last_row_of_latest_timestamp(columns["epoch_ns"][serverclient])
+        if latest_row is None:
+            return None
+        return compute_loss_packet_count(latest_row + 1, int(np.count_nonzero(columns["drop"][serverclient][:latest_row + 1])))
 
-    with open(filename_groundtruth_loss_switchserver) as inputFile:
+    serverclient_loss = 0
+    serverclient_packets = 0
 
-        counter = 0
+    latest_timestamp = None
+    latest_loss = 0
+    latest_packets = 0
+
+    with open(lbit_filename) as inputFile:
         for line in inputFile:
-            counter += 1
 
             content = line.split(",")
 
-            timestamp = parseDateTime_withErrorHandling(content[0])
-            overall_loss = int(content[1])
+            if _direction_of_flow(content[0]) == DIRECTION_SERVER_CLIENT:
 
-            return_dictionary["switchserver"][timestamp] = {"count_overall_packets": counter, "count_loss": overall_loss, "loss_percentage": compute_loss_packet_count(counter, overall_loss)}
-            if timestamp in loss_clientserver_preprocess.keys():
+                if "true" in content[2]:
+                    serverclient_loss += 1
+                serverclient_packets += 1
 
-                loss_clientserver_preprocess[timestamp]["overall_hits_switchserver"] = counter
-                loss_clientserver_preprocess[timestamp]["overall_loss_switchserver"] = overall_loss
-            else:
-                loss_clientserver_preprocess[timestamp] = {"overall_hits_switchserver": counter, "overall_loss_switchserver": overall_loss}
+                timestamp = decode_go_timestamp_ns(content[1])
+                if latest_timestamp is None or timestamp >= latest_timestamp:
+                    latest_timestamp = timestamp
+                    latest_loss = serverclient_loss
+                    latest_packets = serverclient_packets
 
+    if latest_timestamp is None:
+        return None
+
+    return compute_loss_packet_count(latest_packets, latest_loss)
 
-    with open(paper_eval_file) as inputFile:
 
-        losscounter = 0
-        packetCounter = 0
+def summarize_groundtruth_loss(paper_eval_file):
+    """
+    Stream the paper_eval_file and return the groundtruth loss percentage of the link under study at the latest timestamp.
+    Returns None if the file is empty.
+
+    The losscount rows repeat the content of groundtruth_loss_switchserver.csv, so that file does not need to be read.
+    """
 
-        tempDict = {}
+    if _is_binary(paper_eval_file):
+        columns = load_groundtruth_overall_columns(paper_eval_file)
+        losscount = columns["kind"] == GROUNDTRUTH_KIND_LOSSCOUNT
+        overallcount = columns["kind"] == GROUNDTRUTH_KIND_OVERALLCOUNT
+        latest_loss_row = _last_row_of_latest_timestamp(columns["epoch_ns"][losscount])
+        latest_packets_row = _last_row_of_latest_timestamp(columns["epoch_ns"][overallcount])
+        if latest_loss_row is None and latest_packets_row is None:
+            return None
+        latest_loss = 0 if latest_loss_row is None else int(columns["value"][losscount][latest_loss_row])
+        latest_packets = 0 if latest_packets_row is None else int(columns["value"][overallcount][latest_packets_row])
+        return compute_loss_packet_count(latest_packets, latest_loss)
+
+    latest_loss_timestamp = None
+    latest_loss = 0
+    latest_packets_timestamp = None
+    latest_packets = 0
 
+    with open(paper_eval_file) as inputFile:
         for line in inputFile:
- 
+
             content = line.split(",")
 
             if content[0] == "losscount":
 
+                timestamp = decode_go_timestamp_ns(content[1])
+                if latest_loss_timestamp is None or timestamp >= latest_loss_timestamp:
+                    latest_loss_timestamp = timestamp
+                    latest_loss = int(content[2])
 
-                timestamp = parseDateTime_withErrorHandling(content[1])
-                overall_loss = int(content[2])
+            elif content[0] == "overallcount":
 
-                if timestamp not in tempDict.keys():
-                    tempDict[timestamp] = {}
-                tempDict[timestamp]["overall_loss"] = overall_loss
+                timestamp = decode_go_timestamp_ns(content[1])
+                if latest_packets_timestamp is None or timestamp >= latest_packets_timestamp:
+                    latest_packets_timestamp = timestamp
+                    latest_packets = int(content[2])
 
+    if latest_loss_timestamp is None and latest_packets_timestamp is None:
+        return None
 
-            elif content[0] == "overallcount":
+    return compute_loss_packet_count(latest_packets, latest_loss)
 
-                timestamp = parseDateTime_withErrorHandling(content[1])
-                overall_packets = int(content[2])
-            
-                if timestamp not in tempDict.keys():
-                    tempDict[timestamp] = {}
-                tempDict[timestamp]["overall_packets"] = overall_packets
 
+def summarize_prefix(preprocessed_folder, prefix):
+    """
+    Determine the final loss values of one measurement (prefix) without building the time series.
+    The results are the same as the last values of the time series of analyze_prefix_timeseries.
+    """
 
-        losscounter = 0
-        packetCounter = 0
+    summaries = {"tbit": summarize_tbit(preprocessed_artifact(preprocessed_folder, prefix, "tbit")),
+                 "lbit": summarize_lbit(preprocessed_artifact(preprocessed_folder, prefix, "lbit")),
+                 "qbit": summarize_square_bit(preprocessed_artifact(preprocessed_folder, prefix, "qbit")),
+                 "rbit": summarize_square_bit(preprocessed_artifact(preprocessed_folder, prefix, "rbit")),
+                 "groundtruth": summarize_groundtruth_loss(preprocessed_artifact(preprocessed_folder, prefix, "groundtruth_overall_packets_and_loss_count"))}
 
+    return {name: -42 if value is None else value for name, value in summaries.items()}
 
-        for timestamp in sorted(tempDict.keys()):
 
-            if "overall_packets" in tempDict[timestamp].keys():
 
-                packetCounter = tempDict[timestamp]["overall_packets"]
+def prefix_input_files(preprocessed_folder, prefix):
+    """
+    All preprocessed files the analysis of one measurement (prefix) depends on.
+    """
 
-            if "overall_loss" in tempDict[timestamp].keys():
-                losscounter = tempDict[timestamp]["overall_loss"]
+    artifacts = ["tbit", "lbit", "qbit", "rbit",
+                 "groundtruth_loss_clientswitch", "groundtruth_loss_serverswitch", "groundtruth_loss_switchclient", "groundtruth_loss_switchserver",
+                 "groundtruth_overall_packets_and_loss_count"]
 
+    return [preprocessed_artifact(preprocessed_folder, prefix, artifact) for artifact in artifacts]
 
-            return_dictionary["switchserver"][timestamp] = {"count_overall_packets": packetCounter, "count_loss": losscounter, "loss_percentage": compute_loss_packet_count(packetCounter, losscounter)}
-            if timestamp in loss_clientserver_preprocess.keys():
 
-                loss_clientserver_preprocess[timestamp]["overall_hits_switchserver"] = packetCounter
-                loss_clientserver_preprocess[timestamp]["overall_loss_switchserver"] = losscounter
-            else:
-                loss_clientserver_preprocess[timestamp] = {"overall_hits_switchserver": packetCounter, "overall_loss_switchserver": losscounter}
+def analyze_prefix_timed(preprocessed_folder, prefix, summary_only):
+    """
+    Analyze one measurement (prefix) and report how long it took and in which process. Used as the unit of work of the worker processes.
+    """
 
+    timer = time.perf_counter()
 
+    if summary_only:
+        results = summarize_prefix(preprocessed_folder, prefix)
+    else:
+        results = analyze_prefix_timeseries(preprocessed_folder, prefix)
 
+    return results, time.perf_counter() - timer, os.getpid()
 
-    ### Server-Client Direction
-    with open(filename_groundtruth_loss_serverswitch) as inputFile:
 
-        counter = 0
-        for line in inputFile:
-            counter += 1
+def analyze_loss_scenarios(preprocessed_folder, pickles_folder, summary_only=True, jobs=1, cache=None):
+ 
+    """
+    Wrapper function which performs the analysis of all loss techniques.
 
-            content = line.split(",")
+    summary_only: only stream the final loss values (see summarize_prefix) instead of computing the full time series of every observer
+    jobs: number of worker processes among which the measurements (prefixes) are spread. The output does not depend on this value.
+    cache: optional analysis_cache.AnalysisManifest. Measurements whose preprocessed files are unchanged reuse the recorded results.
+    """
+
+    ### All measurements of loss scenarios (e.g. lossrandom, 50k!lossrandom, lossgemodel) grouped by network setting and configuration value
+    groups = prefix_index.PrefixIndex(preprocessed_folder).groups(scenario_filter=lambda scenario: scenario.startswith("loss"))
+    prefixes = [measurement.prefix for measurements in groups.values() for measurement in measurements]
+
+    print(prefixes)
+
+    ### summaries recorded before the end timestamps were deduplicated are not reused
+    cache_stage = "summary-dedup" if summary_only else "timeseries"
+    cached_results = {}
+    if cache is not None:
+        for prefix in prefixes:
+            results = cache.cached_results(cache_stage, prefix, prefix_input_files(preprocessed_folder, prefix))
+            if results is not None:
+                cached_results[prefix] = results
+        print("Reuse cached results for {} measurements.".format(len(cached_results)))
+
+    ### All measurements are independent of each other: hand them to the worker processes right away and collect the results in a fixed order below
+    executor = None
+    pending_results = {}
+    if jobs > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+        for prefix in prefixes:
+            if prefix not in cached_results:
+                pending_results[prefix] = executor.submit(analyze_prefix_timed, preprocessed_folder, prefix, summary_only)
+
+    try:
+        _write_loss_scenario_results(preprocessed_folder, pickles_folder, summary_only, groups, pending_results, cached_results, cache, cache_stage)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def _write_loss_scenario_results(preprocessed_folder, pickles_folder, summary_only, groups, pending_results, cached_results, cache, cache_stage):
+    """
+    Collect the results of all measurements grouped by network setting and configuration value and write one results file per group.
+    Measurements that are neither in pending_results nor in cached_results are analyzed in this process.
+    """
 
-            timestamp = parseDateTime_withErrorHandling(content[0])
-            overall_loss = int(content[1])
-            return_dictionary["serverswitch"][timestamp] = {"count_overall_packets": counter, "count_loss": overall_loss, "loss_percentage": compute_loss_packet_count(counter, overall_loss)}
-            loss_serverclient_preprocess[timestamp] = {"overall_hits_serverswitch": counter, "overall_loss_serverswitch": overall_loss}
+    for (network_error, config_value), measurements in groups.items():
 
+        print("Process measurement results for Network Setting: {}".format(network_error))
+        print("Analyze Config Value: ", config_value)
+        results_dictionary = {}
 
-    with open(filename_groundtruth_loss_switchclient) as inputFile:
+        timer = time.perf_counter()
 
-        counter = 0
-        for line in inputFile:
-            counter += 1
+        for measurement in measurements:
 
-            content = line.split(",")
+            prefix = measurement.prefix
+            iteration = measurement.iteration
+            print("Configuration: {}, Iteration: {}".format(config_value, iteration))
 
-            timestamp = parseDateTime_withErrorHandling(content[0])
-            overall_loss = int(content[1])
 
-            return_dictionary["switchclient"][timestamp] = {"count_overall_packets": counter, "count_loss": overall_loss, "loss_percentage": compute_loss_packet_count(counter, overall_loss)}
-            if timestamp in loss_serverclient_preprocess.keys():
+            if iteration in results_dictionary.keys():
+                raise Exception("Possible duplicate iterations. Please double check.")
 
-                loss_serverclient_preprocess[timestamp]["overall_hits_switchclient"] = counter
-                loss_serverclient_preprocess[timestamp]["overall_loss_switchclient"] = overall_loss
+            if prefix in cached_results:
+                results = cached_results[prefix]
+                print("Iteration {} is unchanged, use cached results.".format(iteration))
             else:
-                loss_serverclient_preprocess[timestamp] = {"overall_hits_switchclient": counter, "overall_loss_switchclient": overall_loss}
+                if prefix in pending_results:
+                    results, elapsed, worker = pending_results.pop(prefix).result()
+                else:
+                    results, elapsed, worker = analyze_prefix_timed(preprocessed_folder, prefix, summary_only)
+                print("Iteration {} took {:.3f} seconds in worker {}.".format(iteration, elapsed, worker))
+
+                if cache is not None:
+                    cache.record(cache_stage, prefix, prefix_input_files(preprocessed_folder, prefix), results=results)
+
+            results_dictionary[iteration] = results
+
+
+        print("Computing took ", time.perf_counter()-timer, " seconds.")
+        timer = time.perf_counter()
+        print("Store everything in file!")
+
+        groundtruth = []
+        lbit = []
+        rbit = []
+        qbit = []
+        tbit = []
+
+        for iteration in results_dictionary.keys():
+
+            groundtruth.append(results_dictionary[iteration]["groundtruth"])
+            lbit.append(results_dictionary[iteration]["lbit"])
+            tbit.append(results_dictionary[iteration]["tbit"])
+            qbit.append(results_dictionary[iteration]["qbit"])
+            rbit.append(results_dictionary[iteration]["rbit"])
+
+        with open(os.path.join(pickles_folder, "results_" + network_error + "_" + config_value + "_plot.csv"), "w") as out:
+            out.write("Groundtruth")
+            for percentage in groundtruth:
+                out.write("," + str(percentage))
+            out.write("\n")
+            out.write("Lbit")
+            for percentage in lbit:
+                out.write("," + str(percentage))
+            out.write("\n")
+            out.write("Rbit")
+            for percentage in rbit:
+                out.write("," + str(percentage))
+            out.write("\n")
+            out.write("Qbit")
+            for percentage in qbit:
+                out.write("," + str(percentage))
+            out.write("\n")
+            out.write("Tbit")
+            for percentage in tbit:
+                out.write("," + str(percentage))
+            out.write("\n")
 
 
-    latest_clientswitch_count = None
-    latest_clientswitch_loss = None
-    latest_switchserver_count = None
-    latest_switchserver_loss = None
 
-    for sorted_timestamp in sorted(loss_clientserver_preprocess.keys()):
+"""
+Windowed loss estimates.
+To study how fast the observers converge, the loss of every server-client observer (T, Q, R, L) and of the groundtruth of the link under study is also computed per window.
+Windows either span a fixed time (e.g. 1s) or a fixed number of packets counted by the groundtruth at the link under study (e.g. 64p).
+The windows of one measurement are written to a compressed .npz file in the plot_preprocessed folder.
+"""
 
-        if "overall_hits_clientswitch" in loss_clientserver_preprocess[sorted_timestamp].keys():
+WINDOW_TIME = "time"
+WINDOW_PACKETS = "packets"
 
-            latest_clientswitch_count = loss_clientserver_preprocess[sorted_timestamp]["overall_hits_clientswitch"]
-            latest_clientswitch_loss = loss_clientserver_preprocess[sorted_timestamp]["overall_loss_clientswitch"]
 
-        if "overall_hits_switchserver" in loss_clientserver_preprocess[sorted_timestamp].keys():
-            latest_switchserver_count = loss_clientserver_preprocess[sorted_timestamp]["overall_hits_switchserver"]
-            latest_switchserver_loss = loss_clientserver_preprocess[sorted_timestamp]["overall_loss_switchserver"]
+def parse_window(window):
+    """
+    Parse a window specification: "<seconds>s" (e.g. 1s or 0.5s) for time windows or "<packets>p" (e.g. 64p) for packet windows.
+    Returns (kind, size) with the size in nanoseconds or packets.
+    """
 
-        if latest_clientswitch_count is not None and latest_clientswitch_loss is not None and latest_switchserver_count is not None and latest_switchserver_loss is not None:
+    if window.endswith("s"):
+        kind, size = WINDOW_TIME, int(round(float(window[:-1]) * 10**9))
+    elif window.endswith("p"):
+        kind, size = WINDOW_PACKETS, int(window[:-1])
+    else:
+        raise ValueError("Unknown window specification {}. Use e.g. 1s or 64p.".format(window))
 
-            return_dictionary["cs"][sorted_timestamp] = { "loss_percentage": compute_loss_packet_count(latest_clientswitch_count, latest_clientswitch_loss + latest_switchserver_loss), 
-                                                                    "count_overall_packets": latest_clientswitch_count,
-                                                                    "count_loss": latest_clientswitch_loss + latest_switchserver_loss}
+    if size <= 0:
+        raise ValueError("Window {} has to be larger than zero.".format(window))
 
-    latest_serverswitch_count = None
-    latest_serverswitch_loss = None
-    latest_switchclient_count = None
-    latest_switchclient_loss = None
-    for sorted_timestamp in sorted(loss_serverclient_preprocess.keys()):
+    return kind, size
 
-        if "overall_hits_serverswitch" in loss_serverclient_preprocess[sorted_timestamp].keys():
 
-            latest_serverswitch_count = loss_serverclient_preprocess[sorted_timestamp]["overall_hits_serverswitch"]
-            latest_serverswitch_loss = loss_serverclient_preprocess[sorted_timestamp]["overall_loss_serverswitch"]
+def windowed_loss_filename(plot_preprocessed_folder, prefix, kind, size):
 
-        if "overall_hits_switchclient" in loss_serverclient_preprocess[sorted_timestamp].keys():
-            latest_switchclient_count = loss_serverclient_preprocess[sorted_timestamp]["overall_hits_switchclient"]
-            latest_switchclient_loss = loss_serverclient_preprocess[sorted_timestamp]["overall_loss_switchclient"]
+    return os.path.join(plot_preprocessed_folder, prefix + "+-+windowed_{}_{}.npz".format(kind, size))
 
-        if latest_serverswitch_count is not None and latest_serverswitch_loss is not None and latest_switchclient_count is not None and latest_switchclient_loss is not None:
 
-            return_dictionary["sc"][sorted_timestamp] = { "loss_percentage": compute_loss_packet_count(latest_serverswitch_count, latest_serverswitch_loss + latest_switchclient_loss), 
-                                                                    "count_overall_packets": latest_serverswitch_count,
-                                                                    "count_loss": latest_serverswitch_loss + latest_switchclient_loss}
+def _observer_windows(window_index, window_count, first_counter, second_counter, compute_loss):
+    """
+    Sum the two counters of an observer per window and compute the loss of every window and the cumulative loss at the end of every window.
+    Windows without a measurement get NaN as loss.
+    """
 
+    samples = np.bincount(window_index, minlength=window_count)
+    first_sum = np.bincount(window_index, weights=first_counter, minlength=window_count).astype(np.int64)
+    second_sum = np.bincount(window_index, weights=second_counter, minlength=window_count).astype(np.int64)
 
-    return return_dictionary
+    cumulative_samples = np.cumsum(samples)
 
+    return {"samples": samples,
+            "first_#": first_sum,
+            "second_#": second_sum,
+            "loss_percentage": np.where(samples > 0, compute_loss(first_sum, second_sum), np.nan),
+            "cum_loss_percentage": np.where(cumulative_samples > 0, compute_loss(np.cumsum(first_sum), np.cumsum(second_sum)), np.nan)}
 
 
-def analyze_loss_scenarios(preprocessed_folder, pickles_folder):
- 
+def compute_windowed_loss(tbit_columns, qbit_columns, rbit_columns, lbit_columns, groundtruth_series, kind, size):
     """
-    Wrapper function which performs the analysis of all loss techniques.
+    Vectorized per-window loss of the server-client observers and of the groundtruth.
+
+    tbit_columns, qbit_columns, rbit_columns: sorted and deduplicated columns (see sort_and_deduplicate_columns)
+    lbit_columns: columns of load_lbit_columns
+    groundtruth_series: the switchserver series of compute_groundtruth_series
+    kind, size: see parse_window
+
+    Returns a dictionary of arrays with one entry per window. The counters of each observer are stored as <observer>_<counter>_#
+    (tbit: generation/reflection, qbit/rbit: nominal/count, lbit and groundtruth: packets/lost).
+    """
+
+    serverclient = {name: columns["direction"] == DIRECTION_SERVER_CLIENT for name, columns in [("tbit", tbit_columns), ("qbit", qbit_columns), ("rbit", rbit_columns), ("lbit", lbit_columns)]}
+    observer_epoch_ns = {"tbit": tbit_columns["epoch_ns"][serverclient["tbit"]],
+                         "qbit": qbit_columns["epoch_ns"][serverclient["qbit"]],
+                         "rbit": rbit_columns["epoch_ns"][serverclient["rbit"]],
+                         "lbit": lbit_columns["epoch_ns"][serverclient["lbit"]],
+                         "groundtruth": groundtruth_series["epoch_ns"]}
+
+    ### Position of every measurement on the window axis: time since the first measurement or the number of packets the groundtruth has counted so far
+    if kind == WINDOW_TIME:
+        ### With several connections, the rows of an observer are only ordered per flow, so the first row is not necessarily the earliest
+        origin = min([int(epoch_ns.min()) for epoch_ns in observer_epoch_ns.values() if len(epoch_ns) > 0], default=0)
+        window_index = {name: (epoch_ns - origin) // size for name, epoch_ns in observer_epoch_ns.items()}
+    else:
+        origin = 0
+        window_index = {name: _as_of(groundtruth_series["epoch_ns"], groundtruth_series["count_overall_packets"], epoch_ns)[0] // size
+                        for name, epoch_ns in observer_epoch_ns.items()}
+
+    window_count = max([int(index.max()) + 1 for index in window_index.values() if len(index) > 0], default=0)
+
+    windows = {"window_kind": np.array(kind),
+               "window_size": np.int64(size),
+               "window_start": origin + np.arange(window_count, dtype=np.int64) * size}
+
+    for name, columns, first_counter, second_counter, compute_loss in [("tbit", tbit_columns, "generation", "reflection", compute_loss_ref_gen_array),
+                                                                       ("qbit", qbit_columns, "nominal", "count", compute_loss_nominal_count_array),
+                                                                       ("rbit", rbit_columns, "nominal", "count", compute_loss_nominal_count_array)]:
+
+        observer = _observer_windows(window_index[name], window_count,
+                                     columns[first_counter][serverclient[name]], columns[second_counter][serverclient[name]], compute_loss)
+        windows[name + "_samples"] = observer["samples"]
+        windows[name + "_" + first_counter + "_#"] = observer["first_#"]
+        windows[name + "_" + second_counter + "_#"] = observer["second_#"]
+        windows[name + "_loss_percentage"] = observer["loss_percentage"]
+        windows[name + "_cum_loss_percentage"] = observer["cum_loss_percentage"]
+
+    ### Every L-Bit row is one packet
+    lbit_drop = lbit_columns["drop"][serverclient["lbit"]]
+    observer = _observer_windows(window_index["lbit"], window_count, np.ones(len(lbit_drop)), lbit_drop, compute_loss_packet_count_array)
+    windows["lbit_packets_#"] = observer["first_#"]
+    windows["lbit_lost_#"] = observer["second_#"]
+    windows["lbit_loss_percentage"] = observer["loss_percentage"]
+    windows["lbit_cum_loss_percentage"] = observer["cum_loss_percentage"]
+
+    ### The groundtruth counters are cumulative: take their latest value at the end of every window and difference them
+    groundtruth_window = np.maximum.accumulate(window_index["groundtruth"]) if len(window_index["groundtruth"]) > 0 else window_index["groundtruth"]
+    cumulative_packets = _as_of(groundtruth_window, groundtruth_series["count_overall_packets"], np.arange(window_count))[0]
+    cumulative_lost = _as_of(groundtruth_window, groundtruth_series["count_loss"], np.arange(window_count))[0]
+    packets = np.diff(cumulative_packets, prepend=0)
+    lost = np.diff(cumulative_lost, prepend=0)
+    windows["groundtruth_packets_#"] = packets
+    windows["groundtruth_lost_#"] = lost
+    windows["groundtruth_loss_percentage"] = np.where(packets > 0, compute_loss_packet_count_array(packets, lost), np.nan)
+    windows["groundtruth_cum_loss_percentage"] = np.where(cumulative_packets > 0, compute_loss_packet_count_array(cumulative_packets, cumulative_lost), np.nan)
+
+    return windows
+
+
+def write_windowed_loss(preprocessed_folder, plot_preprocessed_folder, prefix, windows):
+    """
+    Load the preprocessed files of one measurement (prefix) once and write one windowed loss file per (kind, size) in windows.
+    Returns how long it took and in which process. Used as the unit of work of the worker processes.
     """
 
-    types = ["lossrandom", "lossgemodel"]
-    types += ["50k!lossrandom", "500k!lossrandom", "2M!lossrandom", "10M!lossrandom", "200k!lossrandom", "100k!lossrandom", "300k!lossrandom", "20M!lossrandom", "50M!lossrandom", "1M!lossrandom"]
-    typeSet = set()
+    timer = time.perf_counter()
 
-    prefixSet = set()
-    for filename in os.listdir(preprocessed_folder):
+    tbit_columns = sort_and_deduplicate_columns(load_tbit_columns(preprocessed_artifact(preprocessed_folder, prefix, "tbit")))
+    qbit_columns = sort_and_deduplicate_columns(load_square_bit_columns(preprocessed_artifact(preprocessed_folder, prefix, "qbit")))
+    rbit_columns = sort_and_deduplicate_columns(load_square_bit_columns(preprocessed_artifact(preprocessed_folder, prefix, "rbit")))
+    lbit_columns = load_lbit_columns(preprocessed_artifact(preprocessed_folder, prefix, "lbit"))
+    groundtruth_series = compute_groundtruth_series(
+        clientswitch_columns=load_groundtruth_loss_columns(preprocessed_artifact(preprocessed_folder, prefix, "groundtruth_loss_clientswitch")),
+        serverswitch_columns=load_groundtruth_loss_columns(preprocessed_artifact(preprocessed_folder, prefix, "groundtruth_loss_serverswitch")),
+        switchclient_columns=load_groundtruth_loss_columns(preprocessed_artifact(preprocessed_folder, prefix, "groundtruth_loss_switchclient")),
+        switchserver_columns=load_groundtruth_loss_columns(preprocessed_artifact(preprocessed_folder, prefix, "groundtruth_loss_switchserver")),
+        paper_eval_columns=load_groundtruth_overall_columns(preprocessed_artifact(preprocessed_folder, prefix, "groundtruth_overall_packets_and_loss_count"))
+    )["switchserver"]
 
-        if filename.count('+-+') == 2:
+    for kind, size in windows:
+        np.savez_compressed(windowed_loss_filename(plot_preprocessed_folder, prefix, kind, size),
+                            **compute_windowed_loss(tbit_columns, qbit_columns, rbit_columns, lbit_columns, groundtruth_series, kind, size))
 
-            prefix = "+-+".join(filename.split('+-+')[:2])
-            prefixSet.add(prefix)
+    return time.perf_counter() - timer, os.getpid()
 
-            for possible_type in types:
 
-                if prefix.split("-")[0] == possible_type:
-                    typeSet.add(possible_type)
+def analyze_windowed_loss(preprocessed_folder, plot_preprocessed_folder, windows, jobs=1, cache=None):
+    """
+    Write the windowed loss files (see compute_windowed_loss) of all measurements.
 
-    print(prefixSet)
-    for network_error in typeSet:
+    windows: list of (kind, size) as returned by parse_window
+    jobs: number of worker processes among which the measurements (prefixes) are spread
+    cache: optional analysis_cache.AnalysisManifest. Measurements whose preprocessed files and windowed loss files are unchanged are skipped.
+    """
 
-        print("Process measurement results for Network Setting: {}".format(network_error))
-        ### Determine all the different configurations so that they are performed in a bunch
-        config_values = set()
-        for prefix in prefixSet:
+    pending_prefixes = []
+    for prefix in prefix_index.PrefixIndex(preprocessed_folder).prefixes():
 
-            if network_error == prefix.split("-")[0]:
+        input_files = prefix_input_files(preprocessed_folder, prefix)
+        output_files = [windowed_loss_filename(plot_preprocessed_folder, prefix, kind, size) for kind, size in windows]
 
-                prefix_tmp = prefix.split("+-+")[0]
-                network_error = prefix_tmp.split("-")[0]
-                config_value = prefix_tmp.split("-")[1]
-                iteration = prefix_tmp.split("-")[2]
+        if not all(os.path.exists(input_file) for input_file in input_files):
+            print("{} is incomplete, skip windowed loss.".format(prefix))
+        elif cache is not None and cache.is_up_to_date("windowed", prefix, input_files, output_files):
+            print("{} is unchanged, skip windowed loss.".format(prefix))
+        else:
+            pending_prefixes.append(prefix)
 
-                config_values.add(config_value)
+    executor = None
+    if jobs > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+        timings = executor.map(functools.partial(write_windowed_loss, preprocessed_folder, plot_preprocessed_folder, windows=windows), pending_prefixes)
+    else:
+        timings = (write_windowed_loss(preprocessed_folder, plot_preprocessed_folder, prefix, windows) for prefix in pending_prefixes)
 
+    try:
+        for prefix, (elapsed, worker) in zip(pending_prefixes, timings):
 
+            print("Windowed loss of {} took {:.3f} seconds in worker {}.".format(prefix, elapsed, worker))
 
-        print("Analyze the following config values: ", config_values)
-        for config_value in config_values:
-        
-            print("Analyze Config Value: ", config_value)
-            results_dictionary = {}
-
-            timer = time.perf_counter()
-
-            for prefix in prefixSet:
-
-                if network_error == prefix.split("-")[0] and config_value == prefix.split("+-+")[0].split("-")[1]:
-                    iteration = prefix.split("+-+")[0].split("-")[2]
-                    print("Configuration: {}, Iteration: {}".format(config_value, iteration))
-
-
-                    if iteration in results_dictionary.keys():
-                        raise Exception("Possible duplicate iterations. Please double check.")
-                    results_dictionary[iteration] = {}
-
-
-                    tbit_filename = os.path.join(preprocessed_folder, prefix + "+-+tbit.csv")
-                    tbit_dictionary = analyze_tbit(tbit_filename=tbit_filename)
-
-                    if len(tbit_dictionary["sc_observer"].keys()) > 0:
-                        last_timestamp = sorted(tbit_dictionary["sc_observer"].keys())[-1]
-                        results_dictionary[iteration]["tbit"] = tbit_dictionary["sc_observer"][last_timestamp]["cum_loss_percentage"]
-                    else:
-                        results_dictionary[iteration]["tbit"] = -42
-                    
-                    del tbit_dictionary
-                    tbit_dictionary = None
-
-
-                    lbit_filename = os.path.join(preprocessed_folder, prefix + "+-+lbit.csv")         
-                    lbit_dictionary = analyze_lbit(lbit_filename=lbit_filename)
-
-                    if len(lbit_dictionary["sc_observer"].keys()) > 0:
-                        last_timestamp = sorted(lbit_dictionary["sc_observer"].keys())[-1]
-                        results_dictionary[iteration]["lbit"] = lbit_dictionary["sc_observer"][last_timestamp]["loss_percentage"]
-                    else:
-                        results_dictionary[iteration]["lbit"] = -42
-                    
-                    del lbit_dictionary
-                    lbit_dictionary = None
-
-
-                    qbit_filename = os.path.join(preprocessed_folder, prefix + "+-+qbit.csv")
-                    qbit_dictionary = analyze_qbit(qbit_filename=qbit_filename)
-
-                    if len(qbit_dictionary["sc_observer"].keys()) > 0:
-                        last_timestamp = sorted(qbit_dictionary["sc_observer"].keys())[-1]
-                        results_dictionary[iteration]["qbit"] = qbit_dictionary["sc_observer"][last_timestamp]["cum_loss_percentage"]
-                    else:
-                        results_dictionary[iteration]["qbit"] = -42
-                    
-                    del qbit_dictionary
-                    qbit_dictionary = None
-
-
-                    rbit_filename = os.path.join(preprocessed_folder, prefix + "+-+rbit.csv")
-                    rbit_dictionary = analyze_rbit(rbit_filename=rbit_filename)
-
-                    if len(rbit_dictionary["sc_observer"].keys()) > 0:
-                        last_timestamp = sorted(rbit_dictionary["sc_observer"].keys())[-1]
-                        results_dictionary[iteration]["rbit"] = rbit_dictionary["sc_observer"][last_timestamp]["cum_loss_percentage"]
-                    else:
-                        results_dictionary[iteration]["rbit"] = -42
-                    
-                    del rbit_dictionary
-                    rbit_dictionary = None
-
-                    ### Determine Groundtruth
-                    filename_groundtruth_loss_clientswitch = os.path.join(preprocessed_folder, prefix + "+-+groundtruth_loss_clientswitch.csv")
-                    filename_groundtruth_loss_serverswitch = os.path.join(preprocessed_folder, prefix + "+-+groundtruth_loss_serverswitch.csv")
-                    filename_groundtruth_loss_switchclient = os.path.join(preprocessed_folder, prefix + "+-+groundtruth_loss_switchclient.csv")
-                    filename_groundtruth_loss_switchserver = os.path.join(preprocessed_folder, prefix + "+-+groundtruth_loss_switchserver.csv")
-                    filename_paper_eval = os.path.join(preprocessed_folder, prefix + "+-+groundtruth_overall_packets_and_loss_count.csv")
-                    groundtruth_dictionary = determine_groundtruth_Loss(
-                        filename_groundtruth_loss_clientswitch=filename_groundtruth_loss_clientswitch,
-                        filename_groundtruth_loss_serverswitch=filename_groundtruth_loss_serverswitch,
-                        filename_groundtruth_loss_switchclient=filename_groundtruth_loss_switchclient,
-                        filename_groundtruth_loss_switchserver=filename_groundtruth_loss_switchserver,
-                        paper_eval_file=filename_paper_eval
-                    )
-
-                    if len(groundtruth_dictionary["switchserver"].keys()) > 0:
-                        last_timestamp = sorted(groundtruth_dictionary["switchserver"].keys())[-1]
-                        results_dictionary[iteration]["groundtruth"] = groundtruth_dictionary["switchserver"][last_timestamp]["loss_percentage"]
-                    else:
-                        results_dictionary[iteration]["groundtruth"] = -42
-                    
-                    del groundtruth_dictionary
-                    groundtruth_dictionary = None
-
-
-            print("Computing took ", time.perf_counter()-timer, " seconds.")
-            timer = time.perf_counter()
-            print("Store everything in file!")
-
-            groundtruth = []
-            lbit = []
-            rbit = []
-            qbit = []
-            tbit = []
-
-            for iteration in results_dictionary.keys():
-
-                groundtruth.append(results_dictionary[iteration]["groundtruth"])
-                lbit.append(results_dictionary[iteration]["lbit"])
-                tbit.append(results_dictionary[iteration]["tbit"])
-                qbit.append(results_dictionary[iteration]["qbit"])
-                rbit.append(results_dictionary[iteration]["rbit"])
-
-            with open(os.path.join(pickles_folder, "results_" + network_error + "_" + config_value + "_plot.csv"), "w") as out:
-                out.write("Groundtruth")
-                for percentage in groundtruth:
-                    out.write("," + str(percentage))
-                out.write("\n")
-                out.write("Lbit")
-                for percentage in lbit:
-                    out.write("," + str(percentage))
-                out.write("\n")
-                out.write("Rbit")
-                for percentage in rbit:
-                    out.write("," + str(percentage))
-                out.write("\n")
-                out.write("Qbit")
-                for percentage in qbit:
-                    out.write("," + str(percentage))
-                out.write("\n")
-                out.write("Tbit")
-                for percentage in tbit:
-                    out.write("," + str(percentage))
-                out.write("\n")
+            if cache is not None:
+                cache.record("windowed", prefix, prefix_input_files(preprocessed_folder, prefix),
+                             [windowed_loss_filename(plot_preprocessed_folder, prefix, kind, size) for kind, size in windows])
+    finally:
+        if executor is not None:
+            executor.shutdown()
@@ -8,6 +8,8 @@
 
 import os
 import subprocess
+
+import prefix_index
 from argparse import ArgumentParser
 
 parser = ArgumentParser(description="Analysis Tool")
@@ -24,26 +26,15 @@ def trigger_go_analysis(raw_files_path, preprocessed_folder):
     """ Check with which measurements the things were performed and then do the analysis """
 
     print("Start go-utility-based analysis")
-    all_result_files = os.listdir(raw_files_path)
-
-    prefixSet = set()
-    for filename in all_result_files:
-
-        if filename.count('+-+') == 2:
-
-            prefix = "+-+".join(filename.split('+-+')[:2])
-            prefixSet.add(prefix)
-
-
-    for prefix in prefixSet:
+    index = prefix_index.PrefixIndex(raw_files_path)
 
-        queue_monitor = os.path.join(raw_files_path,prefix + "+-+queue_monitor.txt")
+    for prefix in index.prefixes():
 
-        prefix += "+-+"
+        queue_monitor = index.path(prefix, "queue_monitor.txt")
         
-        if queue_monitor.split("/")[-1] in all_result_files:
+        if index.has_artifact(prefix, "queue_monitor.txt"):
 
-            command= "../go_analysis/queueMonitor_burstsize_calculator --queueMonitorFileName {queuemonitorfile} --outputFileBaseName {result_file}".format(queuemonitorfile=os.path.abspath(queue_monitor), result_file=os.path.join(preprocessed_folder,prefix))
+            command= "../go_analysis/queueMonitor_burstsize_calculator --queueMonitorFileName {queuemonitorfile} --outputFileBaseName {result_file}".format(queuemonitorfile=os.path.abspath(queue_monitor), result_file=os.path.join(preprocessed_folder,prefix + prefix_index.SEPARATOR))
 
             subprocess.run(command, shell=True)
         
@@ -0,0 +1,81 @@
+"""
+    EFM Evaluation Framework
+    Copyright (c) 2021 
+	
+	Author: Ike Kunze
+	E-mail: kunze@comsys.rwth-aachen.de
+"""
+
+"""
+Micro-benchmark comparing the strptime-based parseDateTime_withErrorHandling with the fixed-offset decode_go_timestamp_ns.
+The generated timestamps mimic the output of am-pcap-analyzer / analyse_queueMonitor (one packet every 1.2ms).
+"""
+
+import analyzer_loss
+import datetime
+import time
+from argparse import ArgumentParser
+
+parser = ArgumentParser(description="Timestamp Decoder Benchmark")
+parser.add_argument('--count', '-n',
+                    dest="count",
+                    action="store",
+                    type=int,
+                    help="How many timestamps should be decoded per round",
+                    default=550000)
+parser.add_argument('--rounds', '-r',
+                    dest="rounds",
+                    action="store",
+                    type=int,
+                    help="How often should the measurement be repeated",
+                    default=3)
+args = parser.parse_args()
+
+
+def generate_timestamps(count):
+    """ Create Go-style timestamps including the CEST and missing-fraction variants. """
+
+    start = datetime.datetime(2021, 3, 16, 16, 37, 55)
+    timestamps = []
+    for index in range(count):
+        current = start + datetime.timedelta(microseconds=1200 * index)
+        if current.microsecond == 0:
+            formatted = current.strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            formatted = current.strftime("%Y-%m-%d %H:%M:%S.%f").rstrip("0")
+        if index % 2 == 0:
+            timestamps.append(formatted + " +0000 UTC")
+        else:
+            timestamps.append(formatted + " +0200 CEST")
+    return timestamps
+
+
+def run_benchmark(name, decoder, timestamps, rounds):
+
+    best = None
+    for _ in range(rounds):
+        timer = time.perf_counter()
+        for timestamp in timestamps:
+            decoder(timestamp)
+        elapsed = time.perf_counter() - timer
+        best = elapsed if best is None else min(best, elapsed)
+
+    print("{:<35} {:>8.3f} s ({:>6.0f} ns per timestamp)".format(name, best, best / len(timestamps) * 1e9))
+    return best
+
+
+timestamps = generate_timestamps(args.count)
+
+### Both decoders have to agree before timing them
+for timestamp in timestamps[:1000]:
+    reference = analyzer_loss.parseDateTime_withErrorHandling(timestamp).replace(tzinfo=datetime.timezone.utc)
+    reference_ns = int(reference.timestamp()) * 1000000000 + reference.microsecond * 1000
+    if analyzer_loss.decode_go_timestamp_ns(timestamp) != reference_ns:
+        raise Exception("Decoders disagree on {}".format(timestamp))
+
+print("Decode {} timestamps, best of {} rounds".format(len(timestamps), args.rounds))
+### parseDateTime_withErrorHandling prints a warning for every timestamp without fraction, so only feed it well-formed ones
+well_formed = [timestamp for timestamp in timestamps if timestamp[19] == "."]
+legacy = run_benchmark("parseDateTime_withErrorHandling", analyzer_loss.parseDateTime_withErrorHandling, well_formed, args.rounds)
+fast = run_benchmark("decode_go_timestamp_ns", analyzer_loss.decode_go_timestamp_ns, well_formed, args.rounds)
+print("Speedup: {:.1f}x".format(legacy / fast))
@@ -0,0 +1,257 @@
+"""
+    EFM Evaluation Framework
+    Copyright (c) 2021 
+
+	Author: Ike Kunze
+	E-mail: kunze@comsys.rwth-aachen.de
+"""
+
+"""
+This file provides the compact capture mode of simulator.py (--captureMode compact), a replacement for the full-size tcpdump captures.
+
+The observers only need the timestamp, the addresses and ports and the first two bytes of the first short header QUIC packet of each UDP datagram.
+The recorder reads every frame of an interface from an AF_PACKET socket and writes a regular .pcap file in which each datagram is cut down to
+    Ethernet/IPv4/UDP header + the first two bytes of its first short header packet (or only the first QUIC byte if there is no short header packet).
+Coalesced long header packets in front of the short header packet are dropped, so the observers find the short header right at the start of the payload.
+The original length of each frame is kept in the pcap record header. The Go tools read these files like any truncated capture.
+
+read_compact_capture loads such a file into NumPy columns for Python-based analyses.
+"""
+import signal
+import socket
+import struct
+import sys
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+
+
+ETH_P_ALL = 0x0003
+ETH_P_IP = 0x0800
+IPPROTO_UDP = 17
+
+### Linux value of SO_TIMESTAMPNS / SCM_TIMESTAMPNS (not exported by the socket module)
+SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35)
+
+ETHERNET_HEADER_LENGTH = 14
+UDP_HEADER_LENGTH = 8
+LINKTYPE_ETHERNET = 1
+
+### Microsecond resolution, as written by tcpdump
+PCAP_MAGIC = 0xa1b2c3d4
+PCAP_GLOBAL_HEADER = struct.Struct("<IHHiIII")
+PCAP_RECORD_HEADER = struct.Struct("<IIII")
+
+MAX_FRAME_LENGTH = 65535
+RECEIVE_BUFFER_SIZE = 64 * 1024 * 1024
+
+
+def _varint(payload, offset):
+    """
+    Decode a QUIC variable-length integer. Returns (value, length of the encoding).
+    """
+
+    length = 1 << (payload[offset] >> 6)
+    value = payload[offset] & 0x3f
+    for position in range(offset + 1, offset + length):
+        value = (value << 8) + payload[position]
+
+    return value, length
+
+
+def first_short_header(payload):
+    """
+    Find the first two bytes of the first short header packet in a UDP payload with (possibly coalesced) QUIC packets, following the parsing of the observers.
+    Returns None if the payload has no short header packet.
+    """
+
+    offset = 0
+    try:
+        while offset < len(payload):
+
+            ### QUIC bit not set
+            if not payload[offset] & 0x40:
+                return None
+
+            if not payload[offset] & 0x80:
+                return bytes(payload[offset:offset + 2]) if offset + 2 <= len(payload) else None
+
+            ### Long header: skip version, connection IDs and (for Initial packets) the token, then the packet itself
+            packet_type = (payload[offset] & 0x30) >> 4
+            offset += 5
+            offset += payload[offset] + 1
+            offset += payload[offset] + 1
+            if packet_type == 0:
+                token_length, encoding_length = _varint(payload, offset)
+                offset += encoding_length + token_length
+            length, encoding_length = _varint(payload, offset)
+            offset += encoding_length + length
+
+    except IndexError:
+        pass
+
+    return None
+
+
+def compact_frame(frame, src_ip, dst_ip):
+    """
+    Cut a captured Ethernet frame down to its headers and the QUIC bytes the observers need.
+    Returns None if the frame is not a UDP datagram from src_ip to dst_ip (both packed 4-byte addresses).
+    """
+
+    if len(frame) < ETHERNET_HEADER_LENGTH + 20 or int.from_bytes(frame[12:14], "big") != ETH_P_IP:
+        return None
+
+    ip_header_length = (frame[ETHERNET_HEADER_LENGTH] & 0x0f) * 4
+    if frame[ETHERNET_HEADER_LENGTH + 9] != IPPROTO_UDP:
+        return None
+    if frame[ETHERNET_HEADER_LENGTH + 12:ETHERNET_HEADER_LENGTH + 16] != src_ip or frame[ETHERNET_HEADER_LENGTH + 16:ETHERNET_HEADER_LENGTH + 20] != dst_ip:
+        return None
+
+    payload_offset = ETHERNET_HEADER_LENGTH + ip_header_length + UDP_HEADER_LENGTH
+    if len(frame) <= payload_offset:
+        return None
+
+    short_header = first_short_header(memoryview(frame)[payload_offset:])
+    if short_header is None:
+        short_header = bytes(frame[payload_offset:payload_offset + 1])
+
+    return bytes(frame[:payload_offset]) + short_header
+
+
+def write_pcap_header(outputFile):
+
+    outputFile.write(PCAP_GLOBAL_HEADER.pack(PCAP_MAGIC, 2, 4, 0, 0, MAX_FRAME_LENGTH, LINKTYPE_ETHERNET))
+
+
+def write_pcap_record(outputFile, timestamp_ns, frame, frame_length):
+    """
+    Append one frame to a .pcap file. frame_length: original length of the frame (frame may be truncated)
+    """
+
+    outputFile.write(PCAP_RECORD_HEADER.pack(timestamp_ns // 1000000000, (timestamp_ns % 1000000000) // 1000, len(frame), frame_length))
+    outputFile.write(frame)
+
+
+def record(interface, output_file_path, src_ip, dst_ip):
+    """
+    Capture the datagrams from src_ip to dst_ip on the interface until SIGTERM/SIGINT and write them to output_file_path as compact .pcap.
+    """
+
+    src_ip = socket.inet_aton(src_ip)
+    dst_ip = socket.inet_aton(dst_ip)
+
+    capture_socket = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+    capture_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_SIZE)
+    capture_socket.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+    capture_socket.bind((interface, ETH_P_ALL))
+
+    ### Leave the capture loop (and close the file) when simulator.py stops the recorder
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    frame_buffer = bytearray(MAX_FRAME_LENGTH)
+    ancillary_size = socket.CMSG_SPACE(16)
+
+    with open(output_file_path, "wb") as outputFile:
+
+        write_pcap_header(outputFile)
+        outputFile.flush()
+
+        print("listening on {}, compact capture".format(interface), file=sys.stderr)
+        sys.stderr.flush()
+
+        try:
+            while True:
+
+                frame_length, ancillary_data, _, _ = capture_socket.recvmsg_into([frame_buffer], ancillary_size)
+                compacted = compact_frame(memoryview(frame_buffer)[:frame_length], src_ip, dst_ip)
+                if compacted is None:
+                    continue
+
+                timestamp_ns = None
+                for level, kind, data in ancillary_data:
+                    if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPNS:
+                        seconds, nanoseconds = struct.unpack("qq", data[:16])
+                        timestamp_ns = seconds * 1000000000 + nanoseconds
+                if timestamp_ns is None:
+                    timestamp_ns = time.time_ns()
+
+                write_pcap_record(outputFile, timestamp_ns, compacted, frame_length)
+
+        except KeyboardInterrupt:
+            pass
+
+
+def read_compact_capture(file_path):
+    """
+    Load a compact .pcap file into NumPy columns: timestamp_ns, src_ip, dst_ip (big-endian integers as in the .npy observer files), src_port, dst_port,
+    first_byte, second_byte (-1 if the datagram has no short header packet) and frame_length (original length of the frame).
+    """
+
+    with open(file_path, "rb") as inputFile:
+        content = inputFile.read()
+
+    magic = PCAP_GLOBAL_HEADER.unpack_from(content)[0]
+    if magic != PCAP_MAGIC:
+        raise Exception("{} is not a little-endian microsecond pcap file".format(file_path))
+
+    columns = {name: [] for name in ["timestamp_ns", "src_ip", "dst_ip", "src_port", "dst_port", "first_byte", "second_byte", "frame_length"]}
+
+    offset = PCAP_GLOBAL_HEADER.size
+    while offset + PCAP_RECORD_HEADER.size <= len(content):
+
+        seconds, microseconds, captured_length, frame_length = PCAP_RECORD_HEADER.unpack_from(content, offset)
+        offset += PCAP_RECORD_HEADER.size
+        frame = content[offset:offset + captured_length]
+        offset += captured_length
+
+        ip_header_length = (frame[ETHERNET_HEADER_LENGTH] & 0x0f) * 4
+        udp_offset = ETHERNET_HEADER_LENGTH + ip_header_length
+        quic = frame[udp_offset + UDP_HEADER_LENGTH:]
+
+        columns["timestamp_ns"].append(seconds * 1000000000 + microseconds * 1000)
+        columns["src_ip"].append(int.from_bytes(frame[ETHERNET_HEADER_LENGTH + 12:ETHERNET_HEADER_LENGTH + 16], "big"))
+        columns["dst_ip"].append(int.from_bytes(frame[ETHERNET_HEADER_LENGTH + 16:ETHERNET_HEADER_LENGTH + 20], "big"))
+        columns["src_port"].append(int.from_bytes(frame[udp_offset:udp_offset + 2], "big"))
+        columns["dst_port"].append(int.from_bytes(frame[udp_offset + 2:udp_offset + 4], "big"))
+        columns["first_byte"].append(quic[0] if len(quic) > 0 else -1)
+        columns["second_byte"].append(quic[1] if len(quic) > 1 and not quic[0] & 0x80 else -1)
+        columns["frame_length"].append(frame_length)
+
+    return {"timestamp_ns": np.array(columns["timestamp_ns"], dtype=np.int64),
+            "src_ip": np.array(columns["src_ip"], dtype=np.uint32),
+            "dst_ip": np.array(columns["dst_ip"], dtype=np.uint32),
+            "src_port": np.array(columns["src_port"], dtype=np.uint16),
+            "dst_port": np.array(columns["dst_port"], dtype=np.uint16),
+            "first_byte": np.array(columns["first_byte"], dtype=np.int16),
+            "second_byte": np.array(columns["second_byte"], dtype=np.int16),
+            "frame_length": np.array(columns["frame_length"], dtype=np.int32)}
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser(description="Compact capture of the QUIC header bytes used by the EFM observers")
+    parser.add_argument('--interface', '-i',
+                        dest="interface",
+                        action="store",
+                        help="Which interface to capture",
+                        required=True)
+    parser.add_argument('--write', '-w',
+                        dest="output_file_path",
+                        action="store",
+                        help="Where to write the compact .pcap file",
+                        required=True)
+    parser.add_argument('--src',
+                        dest="src_ip",
+                        action="store",
+                        help="Only capture UDP datagrams from this address",
+                        required=True)
+    parser.add_argument('--dst',
+                        dest="dst_ip",
+                        action="store",
+                        help="Only capture UDP datagrams to this address",
+                        required=True)
+    args = parser.parse_args()
+
+    record(args.interface, args.output_file_path, args.src_ip, args.dst_ip)
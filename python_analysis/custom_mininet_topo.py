@@ -1,25 +1,57 @@
 """Custom topology example
 Three directly connected switches plus a host for each switch:
    h1 --- s1 --- s2 --- s3 --- h2
+
+Multiple experiment slots can be instantiated side by side (--topo mytopo,<slots>).
+Each slot is an isolated copy of the chain with its own node names and its own subnet 10.0.<slot+1>.0/24.
 """
 
-from mininet.topo import Topo
+### simulator.py --emulator only needs the naming scheme of this file and runs without mininet
+try:
+    from mininet.topo import Topo
+except ImportError:
+    Topo = object
+
+
+SWITCHES = ["s1", "s2", "s3"]
+HOSTS = ["h1", "h2"]
+
+### Host part of the host addresses within the subnet of a slot
+HOST_ADDRESSES = {"h1": 1, "h2": 2}
+
+
+def slot_node_name(node, slot=0):
+    """
+    Name of a node (e.g. s3) in the given slot. Slot 0 keeps the plain names, so a single slot matches the original topology.
+    """
+
+    return node if slot == 0 else "{}_{}".format(node, slot)
+
+
+def slot_ip(host, slot=0):
+
+    return "10.0.{}.{}".format(slot + 1, HOST_ADDRESSES[host])
+
 
 class MyTopo( Topo ):
 
-    def build( self ):
-        # Add hosts and switches
-        leftHost = self.addHost( 'h1', ip='10.0.1.1' )
-        rightHost = self.addHost( 'h2', ip='10.0.1.2' )
+    def build( self, slots=1 ):
+
+        for slot in range(int(slots)):
+
+            # Add hosts and switches
+            leftHost = self.addHost( slot_node_name('h1', slot), ip=slot_ip('h1', slot) + '/24' )
+            rightHost = self.addHost( slot_node_name('h2', slot), ip=slot_ip('h2', slot) + '/24' )
 
-        leftSwitch = self.addSwitch( 's1' )
-        middleSwitch = self.addSwitch( 's2' )
-        rightSwitch = self.addSwitch( 's3' )
+            # Mininet derives the dpid from the first number of the name, which is ambiguous for slot names
+            leftSwitch = self.addSwitch( slot_node_name('s1', slot), dpid='{:016x}'.format(16 * slot + 1) )
+            middleSwitch = self.addSwitch( slot_node_name('s2', slot), dpid='{:016x}'.format(16 * slot + 2) )
+            rightSwitch = self.addSwitch( slot_node_name('s3', slot), dpid='{:016x}'.format(16 * slot + 3) )
 
-        # Add links
-        self.addLink( leftHost, leftSwitch)
-        self.addLink( leftSwitch, middleSwitch)
-        self.addLink( middleSwitch, rightSwitch)
-        self.addLink( rightSwitch, rightHost)
+            # Add links
+            self.addLink( leftHost, leftSwitch)
+            self.addLink( leftSwitch, middleSwitch)
+            self.addLink( middleSwitch, rightSwitch)
+            self.addLink( rightSwitch, rightHost)
 
-topos = { 'mytopo': ( lambda: MyTopo() ) }
\ No newline at end of file
+topos = { 'mytopo': ( lambda slots=1: MyTopo(slots=slots) ) }
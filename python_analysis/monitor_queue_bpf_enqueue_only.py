@@ -49,9 +49,21 @@ parser.add_argument('--type', '-t',
                     action="store",
                     help="Which queue type should be monitored? Possible values: HTB, HFSC, NETEM, FQ, FQ_CODEL, CODEL, PFIFO, BFIFO, PFIFO_HEAD",
                     required=True)
+parser.add_argument('--device', '-d',
+                    dest="device",
+                    action="store",
+                    default="s3-eth1",
+                    help="Only report events of this network device (e.g. the s3-eth1 of an experiment slot)")
+parser.add_argument('--alias', '-a',
+                    dest="alias",
+                    action="store",
+                    default=None,
+                    help="Name under which the device is reported (defaults to the device name), e.g. s3-eth1 for the s3-eth1 of every experiment slot")
 
 args = parser.parse_args()
 
+reported_device = args.device if args.alias is None else args.alias
+
 
 
 # define BPF program
@@ -260,7 +272,6 @@ class Data(ct.Structure):
 
 # header
 format_string = "{:<14}\t{:<21}\t{:<10}\t{:<40}"
-print(format_string.format("TIME(s)", "dev", "drops", "real_time"))
 
 # process event
 start = 0
@@ -275,14 +286,18 @@ def print_event(cpu, data, size):
 
     overall_timestamp = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
 
-    if event.dev_name == "s3-eth1":
+    if event.dev_name == args.device:
 
-        print(format_string.format(time_s, event.dev_name, event.drops, str(overall_timestamp)))
+        print(format_string.format(time_s, reported_device, event.drops, str(overall_timestamp)))
     
     sys.stdout.flush()
 
 b["events"].open_perf_buffer(print_event, page_cnt=32)
 
+# the header is printed once the probes are attached and the buffer is open; simulator.py waits for it
+print(format_string.format("TIME(s)", "dev", "drops", "real_time"))
+sys.stdout.flush()
+
 
 try:
 
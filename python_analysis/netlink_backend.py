@@ -0,0 +1,468 @@
+"""
+    EFM Evaluation Framework
+    Copyright (c) 2021 
+
+	Author: Ike Kunze
+	E-mail: kunze@comsys.rwth-aachen.de
+"""
+
+"""
+This file provides the backends that simulator.py uses to configure links (qdiscs and filters), delete virtual interfaces and manage the helper network namespaces.
+
+NetlinkBackend talks netlink in-process via pyroute2 and keeps one netlink socket per network namespace open until close() is called.
+It requires pyroute2 and root privileges; netem arguments that it cannot express (e.g. loss gemodel) are configured via the shell.
+ShellBackend runs the same operations as sudo commands (tc, ip, add/remove_network_namespace.sh).
+Within "with backend.batch():" the link changes are collected and applied together when the block ends (ShellBackend: one tc -batch per namespace),
+or with one lock acquisition and cached interface indices (NetlinkBackend).
+Both raise LinkConfigurationError with the failed operation, namespace, device and the error reported by the kernel or the command.
+"""
+import contextlib
+import os
+import re
+import socket
+import subprocess
+import threading
+
+try:
+    import pyroute2
+except ImportError:
+    pyroute2 = None
+
+
+NETNS_DIR = "/var/run/netns"
+
+ETH_P_IP = 0x0800
+TC_H_ROOT = 0xFFFFFFFF
+
+### Handles of the prio qdisc of link s3-eth1 (1:) and the class its filter directs traffic to (1:1)
+PRIO_HANDLE = 0x10000
+PRIO_CLASS = 0x10001
+
+_TIME_UNITS = {"s": 1000000, "sec": 1000000, "ms": 1000, "msec": 1000, "us": 1, "usec": 1}
+
+
+class LinkConfigurationError(Exception):
+    """
+    operation: what failed, e.g. "add qdisc"
+    namespace/device: where it failed (None if not applicable)
+    detail: error message of the kernel or the command
+    code: errno or exit code
+    """
+
+    def __init__(self, operation, namespace, device, detail, code=None):
+
+        super().__init__("{} failed (namespace: {}, device: {}): {}".format(operation, namespace, device, detail))
+        self.operation = operation
+        self.namespace = namespace
+        self.device = device
+        self.detail = detail
+        self.code = code
+
+
+class UnsupportedNetemArguments(Exception):
+    pass
+
+
+def parse_netem_arguments(netem_args):
+    """
+    Translate netem arguments as given in the configurations (e.g. "delay 10ms loss 1%") into netem parameters (times in microseconds, probabilities in percent).
+    Supported: delay TIME [JITTER], loss [random] PERCENT, loss gemodel p [r [1-h [1-k]]] (as list "gemodel"), duplicate PERCENT, limit PACKETS.
+    Raises UnsupportedNetemArguments otherwise.
+    """
+
+    def is_number(value):
+        return re.match(r"^[0-9.]+%?$", value) is not None
+
+    def parse_time(value):
+        match = re.match(r"^([0-9.]+)([a-z]*)$", value)
+        if match is None or match.group(2) not in _TIME_UNITS and match.group(2) != "":
+            raise UnsupportedNetemArguments(value)
+        ### tc interprets times without unit as microseconds
+        return int(float(match.group(1)) * _TIME_UNITS.get(match.group(2), 1))
+
+    def parse_percent(value):
+        ### tc reads probabilities as percent, with or without the % sign
+        if not is_number(value):
+            raise UnsupportedNetemArguments(value)
+        return float(value.rstrip("%"))
+
+    tokens = netem_args.split()
+    parameters = {}
+
+    position = 0
+    while position < len(tokens):
+        keyword = tokens[position]
+        values = tokens[position + 1:]
+
+        if keyword == "delay" and values:
+            parameters["delay"] = parse_time(values[0])
+            position += 2
+            if position < len(tokens) and re.match(r"^[0-9.]", tokens[position]):
+                parameters["jitter"] = parse_time(tokens[position])
+                position += 1
+        elif keyword == "loss" and values and values[0] == "gemodel":
+            gemodel = []
+            position += 2
+            while position < len(tokens) and len(gemodel) < 4 and is_number(tokens[position]):
+                gemodel.append(parse_percent(tokens[position]))
+                position += 1
+            if not gemodel:
+                raise UnsupportedNetemArguments(netem_args)
+            parameters["gemodel"] = gemodel
+        elif keyword in ["loss", "duplicate"] and values:
+            ### e.g. loss random 1% is the same as loss 1%, other loss models (state) are not supported
+            if values[0] == "random":
+                position += 1
+                values = values[1:]
+            parameters[keyword] = parse_percent(values[0])
+            position += 2
+        elif keyword == "limit" and values:
+            parameters["limit"] = int(values[0])
+            position += 2
+        else:
+            raise UnsupportedNetemArguments(netem_args)
+
+    return parameters
+
+
+def _pyroute2_netem_parameters(netem_args):
+    """
+    pyroute2's netem does not support loss models, these links are configured via the shell.
+    """
+
+    parameters = parse_netem_arguments(netem_args)
+    if "gemodel" in parameters:
+        raise UnsupportedNetemArguments(netem_args)
+
+    return parameters
+
+
+def mininet_node_pids():
+    """
+    Map mininet node names to the pid of their shell (started as 'bash ... mininet:<node>').
+    """
+
+    pids = {}
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(os.path.join(entry.path, "cmdline"), "rb") as cmdlineFile:
+                arguments = cmdlineFile.read().rstrip(b"\0").split(b"\0")
+        except OSError:
+            continue
+        if arguments[-1].startswith(b"mininet:"):
+            pids[arguments[-1][len(b"mininet:"):].decode()] = int(entry.name)
+
+    return pids
+
+
+class ShellBackend:
+    """
+    Configure everything via sudo commands; every command is checked for its exit code.
+    """
+
+    name = "shell"
+
+    def __init__(self):
+
+        ### The slots of simulator.py share the backend, so every thread has its own batch:
+        ### pending is namespace -> [(operation, device, tc command)] while a batch of the thread is open, None otherwise
+        self._local = threading.local()
+
+    def _pending(self):
+
+        return getattr(self._local, "pending", None)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Collect the tc commands of the block and run them with one tc -batch per namespace when it ends.
+        Nothing is applied if the block raises. Nested batches are part of the outer one.
+        """
+
+        if self._pending() is not None:
+            yield
+            return
+
+        self._local.pending = {}
+        try:
+            yield
+            pending, self._local.pending = self._local.pending, None
+            for namespace, commands in pending.items():
+                self._run_batch(namespace, commands)
+        finally:
+            self._local.pending = None
+
+    def _run_batch(self, namespace, commands):
+
+        command = "tc -batch -"
+        if namespace is not None:
+            command = "sudo ip netns exec {} {}".format(namespace, command)
+        else:
+            command = "sudo {}".format(command)
+        print("{} <<< {}".format(command, "; ".join(tc_command for _, _, tc_command in commands)))
+
+        completed = subprocess.run(command, shell=True, input="".join(tc_command + "\n" for _, _, tc_command in commands).encode(),
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if completed.returncode != 0:
+            detail = completed.stderr.decode().strip()
+            ### tc stops at the first failing command and reports its line as "Command failed -:<line>"
+            match = re.search(r"Command failed -:(\d+)", detail)
+            if match is not None and 0 < int(match.group(1)) <= len(commands):
+                operation, device, _ = commands[int(match.group(1)) - 1]
+            else:
+                operation, device = "tc batch", None
+            raise LinkConfigurationError(operation, namespace, device, detail, completed.returncode)
+
+    def _run(self, operation, namespace, device, command, missing_ok=False):
+
+        pending = self._pending()
+        if pending is not None and command.startswith("tc "):
+            pending.setdefault(namespace, []).append((operation, device, command[len("tc "):]))
+            return
+
+        if namespace is not None:
+            command = "sudo ip netns exec {} {}".format(namespace, command)
+        else:
+            command = "sudo {}".format(command)
+        print(command)
+
+        completed = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        detail = completed.stderr.decode().strip()
+        if completed.returncode != 0:
+            if missing_ok and ("Cannot find device" in detail or "No such file or directory" in detail):
+                return
+            raise LinkConfigurationError(operation, namespace, device, detail, completed.returncode)
+
+    def add_netem(self, namespace, device, netem_args):
+
+        self._run("add qdisc", namespace, device, "tc qdisc add dev {} parent root netem {}".format(device, netem_args))
+
+    def add_prio_netem(self, namespace, device, netem_args, src_ip, sport):
+        """
+        prio qdisc 1: whose class 1:1 gets a netem qdisc; a u32 filter only directs UDP traffic from src_ip:sport to 1:1
+        """
+
+        self._run("add qdisc", namespace, device, "tc qdisc add dev {} root handle 1: prio".format(device))
+        self._run("add filter", namespace, device, "tc filter add dev {} parent 1: protocol ip prio 2 u32 match ip src {}/32 match ip protocol 17 0xff match ip sport {} 0xffff flowid 1:1".format(device, src_ip, sport))
+        self._run("add qdisc", namespace, device, "tc qdisc add dev {} parent 1:1 netem {}".format(device, netem_args))
+
+    def replace_netem(self, namespace, device, netem_args, below_prio=False):
+
+        parent = "parent 1:1" if below_prio else "root"
+        self._run("replace qdisc", namespace, device, "tc qdisc replace dev {} {} netem {}".format(device, parent, netem_args))
+
+    def delete_qdiscs(self, namespace, device):
+
+        self._run("delete qdisc", namespace, device, "tc qdisc del dev {} root".format(device))
+
+    def delete_links(self, devices):
+        """
+        Delete the given links; links that do not exist are skipped.
+        Returns a LinkConfigurationError for every link that could not be deleted (e.g. ovs-system).
+        """
+
+        failures = []
+        for device in devices:
+            try:
+                self._run("delete link", None, device, "ip link delete {}".format(device), missing_ok=True)
+            except LinkConfigurationError as failure:
+                failures.append(failure)
+
+        return failures
+
+    def add_namespaces(self, nodes):
+
+        self._run("add namespaces", None, None, "bash add_network_namespace.sh {}".format(" ".join(nodes)))
+
+    def remove_namespaces(self, nodes):
+
+        self._run("remove namespaces", None, None, "bash remove_network_namespace.sh {}".format(" ".join(nodes)))
+
+    def close(self):
+
+        pass
+
+
+class NetlinkBackend:
+    """
+    Configure everything in-process via netlink (pyroute2). Requires root privileges.
+    The netlink socket of each namespace is opened once and reused until close(), e.g. for all operations of an iteration.
+    """
+
+    name = "netlink"
+
+    def __init__(self):
+
+        self._shell = ShellBackend()
+        self._sockets = {}
+        ### pyroute2 sockets must not be used by several slots at the same time; a batch holds the lock for all of its operations
+        self._lock = threading.RLock()
+        ### (namespace, device) -> interface index while a batch is open, None otherwise
+        self._indices = None
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Apply the operations of the block under one lock acquisition and look up every interface only once.
+        Links that fall back to the shell are configured with one tc -batch per namespace when the block ends.
+        """
+
+        with self._lock:
+            if self._indices is not None:
+                yield
+                return
+
+            self._indices = {}
+            try:
+                with self._shell.batch():
+                    yield
+            finally:
+                self._indices = None
+
+    def _socket(self, namespace):
+
+        if namespace not in self._sockets:
+            self._sockets[namespace] = pyroute2.IPRoute() if namespace is None else pyroute2.NetNS(namespace)
+        return self._sockets[namespace]
+
+    def _index(self, operation, namespace, device):
+
+        if self._indices is not None and (namespace, device) in self._indices:
+            return self._indices[(namespace, device)]
+
+        indices = self._socket(namespace).link_lookup(ifname=device)
+        if not indices:
+            raise LinkConfigurationError(operation, namespace, device, "Cannot find device", code=19)
+
+        if self._indices is not None:
+            self._indices[(namespace, device)] = indices[0]
+        return indices[0]
+
+    def _tc(self, operation, namespace, device, *args, **kwargs):
+
+        try:
+            with self._lock:
+                self._socket(namespace).tc(*args, index=self._index(operation, namespace, device), **kwargs)
+        except pyroute2.NetlinkError as thrown_exception:
+            raise LinkConfigurationError(operation, namespace, device, thrown_exception.args[-1], thrown_exception.code)
+
+    def add_netem(self, namespace, device, netem_args):
+
+        try:
+            parameters = _pyroute2_netem_parameters(netem_args)
+        except UnsupportedNetemArguments:
+            print("Configure {} via the shell: unsupported netem arguments {}".format(device, netem_args))
+            return self._shell.add_netem(namespace, device, netem_args)
+
+        self._tc("add qdisc", namespace, device, "add", "netem", parent=TC_H_ROOT, **parameters)
+
+    def add_prio_netem(self, namespace, device, netem_args, src_ip, sport):
+
+        try:
+            parameters = _pyroute2_netem_parameters(netem_args)
+        except UnsupportedNetemArguments:
+            print("Configure {} via the shell: unsupported netem arguments {}".format(device, netem_args))
+            return self._shell.add_prio_netem(namespace, device, netem_args, src_ip, sport)
+
+        self._tc("add qdisc", namespace, device, "add", "prio", handle=PRIO_HANDLE)
+
+        ### u32 keys value/mask+offset on the IPv4 header: source address, protocol UDP, source port (assuming no IP options, as tc's "match ip sport")
+        keys = ["0x{:08x}/0xffffffff+12".format(int.from_bytes(socket.inet_aton(src_ip), "big")),
+                "0x00110000/0x00ff0000+8",
+                "0x{:04x}0000/0xffff0000+20".format(int(sport))]
+        self._tc("add filter", namespace, device, "add-filter", "u32", parent=PRIO_HANDLE, prio=2, protocol=ETH_P_IP, target=PRIO_CLASS, keys=keys)
+
+        self._tc("add qdisc", namespace, device, "add", "netem", parent=PRIO_CLASS, **parameters)
+
+    def replace_netem(self, namespace, device, netem_args, below_prio=False):
+
+        try:
+            parameters = _pyroute2_netem_parameters(netem_args)
+        except UnsupportedNetemArguments:
+            print("Configure {} via the shell: unsupported netem arguments {}".format(device, netem_args))
+            return self._shell.replace_netem(namespace, device, netem_args, below_prio)
+
+        self._tc("replace qdisc", namespace, device, "replace", "netem", parent=PRIO_CLASS if below_prio else TC_H_ROOT, **parameters)
+
+    def delete_qdiscs(self, namespace, device):
+
+        self._tc("delete qdisc", namespace, device, "del", parent=TC_H_ROOT)
+
+    def delete_links(self, devices):
+        """
+        Delete the given links of the root namespace; links that do not exist are skipped.
+        Returns a LinkConfigurationError for every link that could not be deleted (e.g. ovs-system).
+        """
+
+        failures = []
+        with self._lock:
+            ipr = self._socket(None)
+            for device in devices:
+                for index in ipr.link_lookup(ifname=device):
+                    try:
+                        ipr.link("del", index=index)
+                    except pyroute2.NetlinkError as thrown_exception:
+                        ### The link may vanish together with its peer
+                        if thrown_exception.code != 19:
+                            failures.append(LinkConfigurationError("delete link", None, device, thrown_exception.args[-1], thrown_exception.code))
+
+        return failures
+
+    def add_namespaces(self, nodes):
+        """
+        Make the network namespace of each mininet node accessible as mininet_<node> (see add_network_namespace.sh).
+        """
+
+        os.makedirs(NETNS_DIR, exist_ok=True)
+        pids = mininet_node_pids()
+
+        for node in nodes:
+            if node not in pids:
+                raise LinkConfigurationError("add namespace", "mininet_{}".format(node), None, "no running mininet node {}".format(node))
+
+            path = os.path.join(NETNS_DIR, "mininet_{}".format(node))
+            if os.path.lexists(path):
+                os.unlink(path)
+            os.symlink("/proc/{}/ns/net".format(pids[node]), path)
+
+    def remove_namespaces(self, nodes):
+
+        for node in nodes:
+            namespace = "mininet_{}".format(node)
+            with self._lock:
+                if namespace in self._sockets:
+                    self._sockets.pop(namespace).close()
+            try:
+                os.unlink(os.path.join(NETNS_DIR, namespace))
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """
+        Close all netlink sockets, e.g. before mininet exits and its namespaces disappear.
+        """
+
+        with self._lock:
+            for netlink_socket in self._sockets.values():
+                netlink_socket.close()
+            self._sockets = {}
+
+
+def create_backend(kind="auto"):
+    """
+    kind: netlink, shell or auto (netlink if pyroute2 is installed and we run as root, otherwise shell)
+    """
+
+    netlink_available = pyroute2 is not None and os.geteuid() == 0
+
+    if kind == "netlink" and not netlink_available:
+        raise Exception("The netlink backend requires pyroute2 and root privileges")
+
+    if kind == "netlink" or (kind == "auto" and netlink_available):
+        print("Configure links and namespaces via netlink")
+        return NetlinkBackend()
+
+    print("Configure links and namespaces via the shell")
+    return ShellBackend()
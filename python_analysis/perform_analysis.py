@@ -7,117 +7,209 @@
 """
 
 import analyzer_loss   
+import analysis_cache
+import prefix_index
+import json
 import os
 import subprocess
 from argparse import ArgumentParser
 
-parser = ArgumentParser(description="Analysis Tool")
-parser.add_argument('--path', '-p',
-                    dest="path",
-                    action="store",
-                    help="Where are the measurement results",
-                    required=True)
-parser.add_argument('--force', '-f',
-                    dest="force",
-                    action="store",
-                    help="Force analysis of already analyzed files",
-                    default=False)
-args = parser.parse_args()
 
+### Files written by am-pcap-analyzer and analyse_queueMonitor for every measurement (the extension depends on the output format)
+PCAP_ANALYZER_OUTPUTS = ["lbit", "tbit", "qbit", "rbit"]
+### am-pcap-analyzer only writes these files for the following measurement techniques (see go_analysis/am-pcap-analyzer.go)
+PCAP_ANALYZER_TECHNIQUES = ["42", "43"]
+QUEUE_MONITOR_OUTPUTS = ["groundtruth_loss_clientswitch", "groundtruth_loss_switchclient", "groundtruth_loss_switchserver", "groundtruth_loss_serverswitch",
+                         "groundtruth_overall_packets_and_loss_count"]
 
 
+def slot_addresses(index, prefix):
+    """ Client and server address of the experiment slot a measurement ran in (see simulator.py --slots).
+    Measurements without <prefix>+-+slot.json ran in the only slot of the original topology."""
 
-def trigger_go_analysis(src_file_path, dst_file_path):
-    """ Analyze the .pcap files generated in the experiments as well as the queueMonitor files using analysis logic written in Go."""
+    if not index.has_artifact(prefix, "slot.json"):
+        return "10.0.1.1", "10.0.1.2"
 
-    print("Start go-utility-based analysis")
+    with open(index.path(prefix, "slot.json")) as slotFile:
+        slot_info = json.load(slotFile)
 
-    ### First check which files are there for analysis
-    all_result_files = os.listdir(src_file_path)
-    prefixSet = set()
-    for filename in all_result_files:
+    return slot_info["client_ip"], slot_info["server_ip"]
+
+
+def pcap_analyzer_outputs_of(techniques):
+    """ Outputs am-pcap-analyzer writes for a measurement with the given measurement techniques (none for techniques it does not analyze)."""
+
+    return PCAP_ANALYZER_OUTPUTS if str(techniques) in PCAP_ANALYZER_TECHNIQUES else []
 
-        if filename.count('+-+') == 2:
 
-            prefix = "+-+".join(filename.split('+-+')[:2])
-            prefixSet.add(prefix)
+def finish_stage(manifest, stage, prefix, returncode, input_paths, output_paths):
+    """ Record a Go run in the manifest only if it succeeded.
+    A failed run may leave the outputs of earlier inputs behind; they are removed so that they are neither analyzed nor taken as up to date later."""
+
+    if returncode == 0:
+        manifest.record(stage, prefix, input_paths, output_paths)
+        return
+
+    print("{} failed for {} with exit status {}, discard its outputs.".format(stage, prefix, returncode))
+    for output_path in output_paths:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+
+def trigger_go_analysis(src_file_path, dst_file_path, manifest, output_format="csv"):
+    """ Analyze the .pcap files generated in the experiments as well as the queueMonitor files using analysis logic written in Go.
+    Measurements whose raw files and preprocessed outputs are unchanged according to the manifest are skipped.
+    output_format: csv or npy, passed on to the Go tools."""
+
+    print("Start go-utility-based analysis")
+
+    ### First check which files are there for analysis
+    index = prefix_index.PrefixIndex(src_file_path)
 
 
     ### Analyze the different files in a 'measurement by measurement' manner
-    for prefix in prefixSet:
+    for prefix in index.prefixes():
 
-        measurement_technique = prefix.split("+-+")[1]
+        measurement_technique = index.measurements[prefix].techniques
 
         print("Check if required .pcap files are present.")
         ### EFM Observer
-        pcap1 = os.path.join(src_file_path, prefix + "+-+s2-eth1.pcap")
-        pcap2 = os.path.join(src_file_path, prefix + "+-+s2-eth2.pcap")
+        pcap1 = index.path(prefix, "s2-eth1.pcap")
+        pcap2 = index.path(prefix, "s2-eth2.pcap")
 
         ### Groundtruth
-        pcap3 = os.path.join(src_file_path, prefix + "+-+s3-eth2.pcap")
-        queue_monitor = os.path.join(src_file_path,prefix + "+-+queue_monitor.txt")
+        pcap3 = index.path(prefix, "s3-eth2.pcap")
+        queue_monitor = index.path(prefix, "queue_monitor.txt")
 
+        client_ip, server_ip = slot_addresses(index, prefix)
+        ### The addresses are part of the input of both tools
+        slot_info = [index.path(prefix, "slot.json")] if index.has_artifact(prefix, "slot.json") else []
+
+        measurement_prefix = prefix
         prefix += "+-+"
         
-        if pcap1.split("/")[-1] in all_result_files and pcap2.split("/")[-1] in all_result_files:
-            print("../go_analysis/am-pcap-analyzer --s2_eth1_pcapFile {pcap1} --s2_eth2_pcapFile {pcap2} --outputFileBaseName {result_file} --measurement_techniques {measurement_techniques}".format(pcap1=os.path.abspath(pcap1),
+        pcap_analyzer_outputs = [os.path.join(dst_file_path, prefix + output + "." + output_format) for output in pcap_analyzer_outputs_of(measurement_technique)]
+        queue_monitor_outputs = [os.path.join(dst_file_path, prefix + output + "." + output_format) for output in QUEUE_MONITOR_OUTPUTS]
+
+        if index.has_artifact(measurement_prefix, "s2-eth1.pcap") and index.has_artifact(measurement_prefix, "s2-eth2.pcap") and manifest.is_up_to_date("am-pcap-analyzer", measurement_prefix, [pcap1, pcap2] + slot_info, pcap_analyzer_outputs):
+            print("{} is unchanged, skip am-pcap-analyzer.".format(measurement_prefix))
+
+        elif index.has_artifact(measurement_prefix, "s2-eth1.pcap") and index.has_artifact(measurement_prefix, "s2-eth2.pcap"):
+            print("../go_analysis/am-pcap-analyzer --s2_eth1_pcapFile {pcap1} --s2_eth2_pcapFile {pcap2} --outputFileBaseName {result_file} --measurement_techniques {measurement_techniques} --outputFormat {output_format} --clientIP {client_ip} --serverIP {server_ip}".format(output_format=output_format, client_ip=client_ip, server_ip=server_ip, pcap1=os.path.abspath(pcap1),
                                                                                                                                                                                         pcap2=os.path.abspath(pcap2),
                                                                                                                                                                                         result_file=os.path.join(dst_file_path,prefix),
                                                                                                                                                                                         measurement_techniques=measurement_technique))
-            subprocess.run("../go_analysis/am-pcap-analyzer --s2_eth1_pcapFile {pcap1} --s2_eth2_pcapFile {pcap2} --outputFileBaseName {result_file} --measurement_techniques {measurement_techniques}".format(pcap1=os.path.abspath(pcap1),
+            pcap_analyzer_proc = subprocess.run("../go_analysis/am-pcap-analyzer --s2_eth1_pcapFile {pcap1} --s2_eth2_pcapFile {pcap2} --outputFileBaseName {result_file} --measurement_techniques {measurement_techniques} --outputFormat {output_format} --clientIP {client_ip} --serverIP {server_ip}".format(output_format=output_format, client_ip=client_ip, server_ip=server_ip, pcap1=os.path.abspath(pcap1),
                                                                                                                                                                                         pcap2=os.path.abspath(pcap2),
                                                                                                                                                                                         result_file=os.path.join(dst_file_path,prefix),
                                                                                                                                                                                         measurement_techniques=measurement_technique), shell=True)
+            finish_stage(manifest, "am-pcap-analyzer", measurement_prefix, pcap_analyzer_proc.returncode, [pcap1, pcap2] + slot_info, pcap_analyzer_outputs)
+
+        if index.has_artifact(measurement_prefix, "queue_monitor.txt") and manifest.is_up_to_date("analyse_queueMonitor", measurement_prefix, [queue_monitor, pcap3] + slot_info, queue_monitor_outputs):
+            print("{} is unchanged, skip analyse_queueMonitor.".format(measurement_prefix))
 
-        if queue_monitor.split("/")[-1] in all_result_files:
+        elif index.has_artifact(measurement_prefix, "queue_monitor.txt"):
 
-            command= "../go_analysis/analyse_queueMonitor --queueMonitorFileName {queuemonitorfile} --s3_eth2_pcapFile {s3_eth2_pcap} --outputFileBaseName {result_file}".format(queuemonitorfile=os.path.abspath(queue_monitor), 
+            command= "../go_analysis/analyse_queueMonitor --queueMonitorFileName {queuemonitorfile} --s3_eth2_pcapFile {s3_eth2_pcap} --outputFileBaseName {result_file} --outputFormat {output_format} --clientIP {client_ip} --serverIP {server_ip}".format(output_format=output_format, client_ip=client_ip, server_ip=server_ip, queuemonitorfile=os.path.abspath(queue_monitor), 
                                                                                                                                                                                 s3_eth2_pcap=os.path.abspath(pcap3), 
                                                                                                                                                                                 result_file=os.path.join(dst_file_path,prefix))
-            subprocess.run(command, shell=True)
-        
-
-
-
-#generalpath = "/opt/kunze/in-network-troubleshooting/python_analysis/data/paper_eval_congestion"
-generalpath = args.path
-
-raw_files_path = os.path.join(generalpath, "raw")
-preprocessed_folder = os.path.join(generalpath, "preprocessed")
-try: 
-    os.mkdir(preprocessed_folder)
-except FileExistsError:
-    print("Preprocessed already exists :)")
-plot_preprocessed_folder = os.path.join(generalpath, "plot_preprocessed")
-try: 
-    os.mkdir(plot_preprocessed_folder)
-except FileExistsError:
-    print("Plot_preprocessed already exists :)")
-
-
-
-
-
-print(30 * "---")
-print(30 * "---")
-print("Start Go Analysis for Folder {}".format(raw_files_path))
-print("First, create destination folder in {}".format(preprocessed_folder))
-
-destinationExists = False
-try: 
-    os.mkdir(preprocessed_folder)
-except FileExistsError:
-    print("Destination Folder already exists. Seems that the analysis has already run.")
-    destinationExists = True
-
-print("Trigger Go Analysis!")
-trigger_go_analysis(raw_files_path, preprocessed_folder)
-
-
-
-
-print(30 * "---")
-print(30 * "---")
-print("Do the plotting computations.")
-
-analyzer_loss.analyze_loss_scenarios(preprocessed_folder, plot_preprocessed_folder)
+            queue_monitor_proc = subprocess.run(command, shell=True)
+            finish_stage(manifest, "analyse_queueMonitor", measurement_prefix, queue_monitor_proc.returncode, [queue_monitor, pcap3] + slot_info, queue_monitor_outputs)
+
+    manifest.save()
+
+
+def main():
+    """ Run the Go analysis and the loss analysis of the measurements in --path.
+    Kept out of module level because the worker processes of analyze_loss_scenarios import this module again when they are not forked."""
+
+    parser = ArgumentParser(description="Analysis Tool")
+    parser.add_argument('--path', '-p',
+                        dest="path",
+                        action="store",
+                        help="Where are the measurement results",
+                        required=True)
+    parser.add_argument('--force', '-f',
+                        dest="force",
+                        action="store_true",
+                        help="Force analysis of already analyzed files",
+                        default=False)
+    parser.add_argument('--timeseries', '-t',
+                        dest="timeseries",
+                        action="store_true",
+                        help="Compute the full time series of every observer instead of only streaming the final loss values")
+    parser.add_argument('--jobs', '-j',
+                        dest="jobs",
+                        action="store",
+                        type=int,
+                        help="Number of worker processes used for analyzing the measurements",
+                        default=1)
+    parser.add_argument('--outputFormat', '-o',
+                        dest="output_format",
+                        action="store",
+                        choices=["csv", "npy"],
+                        help="Format of the preprocessed files written by the Go analysis. npy files are memory-mapped by the loss analysis instead of being parsed.",
+                        default="csv")
+    parser.add_argument('--window', '-w',
+                        dest="windows",
+                        action="append",
+                        type=analyzer_loss.parse_window,
+                        help="Additionally write the loss per window of every measurement to plot_preprocessed, e.g. 1s for time windows or 64p for packet windows. Can be given multiple times.",
+                        default=[])
+    args = parser.parse_args()
+
+    #generalpath = "/opt/kunze/in-network-troubleshooting/python_analysis/data/paper_eval_congestion"
+    generalpath = args.path
+
+    raw_files_path = os.path.join(generalpath, "raw")
+    preprocessed_folder = os.path.join(generalpath, "preprocessed")
+    try: 
+        os.mkdir(preprocessed_folder)
+    except FileExistsError:
+        print("Preprocessed already exists :)")
+    plot_preprocessed_folder = os.path.join(generalpath, "plot_preprocessed")
+    try: 
+        os.mkdir(plot_preprocessed_folder)
+    except FileExistsError:
+        print("Plot_preprocessed already exists :)")
+
+
+
+
+
+    print(30 * "---")
+    print(30 * "---")
+    print("Start Go Analysis for Folder {}".format(raw_files_path))
+    print("First, create destination folder in {}".format(preprocessed_folder))
+
+    destinationExists = False
+    try: 
+        os.mkdir(preprocessed_folder)
+    except FileExistsError:
+        print("Destination Folder already exists. Seems that the analysis has already run.")
+        destinationExists = True
+
+    ### Bookkeeping of already analyzed measurements. --force starts from an empty manifest.
+    manifest = analysis_cache.AnalysisManifest(generalpath, force=args.force)
+
+    print("Trigger Go Analysis!")
+    trigger_go_analysis(raw_files_path, preprocessed_folder, manifest, output_format=args.output_format)
+
+
+
+
+    print(30 * "---")
+    print(30 * "---")
+    print("Do the plotting computations.")
+
+    analyzer_loss.analyze_loss_scenarios(preprocessed_folder, plot_preprocessed_folder, summary_only=not args.timeseries, jobs=args.jobs, cache=manifest)
+    manifest.save()
+
+    if args.windows:
+        print("Compute the windowed loss.")
+        analyzer_loss.analyze_windowed_loss(preprocessed_folder, plot_preprocessed_folder, args.windows, jobs=args.jobs, cache=manifest)
+        manifest.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+    EFM Evaluation Framework
+    Copyright (c) 2021 
+
+	Author: Ike Kunze
+	E-mail: kunze@comsys.rwth-aachen.de
+"""
+
+"""
+This file provides an index of the measurement files in a results folder (raw/ or preprocessed/) that is built in a single directory scan.
+
+All files of one measurement share the prefix <description>-<iteration>+-+<measurement techniques> and are named <prefix>+-+<artifact>, e.g. 50k!lossrandom-1-3+-+43+-+tbit.csv.
+The description of a flow_test is <file size!><network error>-<config value>, where the file size is only used for http traffic.
+"""
+import collections
+import os
+import re
+
+
+SEPARATOR = "+-+"
+
+### <file size!><scenario>-<config value>-<iteration>, e.g. 50k!lossrandom-1-3 or lossgemodel-5-1
+_MEASUREMENT_PATTERN = re.compile(r"^(?P<network_error>(?:(?P<file_size>[^!]+)!)?(?P<scenario>[^!-]+))-(?P<config_value>.+)-(?P<iteration>[^-]+)$")
+
+
+Measurement = collections.namedtuple("Measurement", ["prefix", "network_error", "file_size", "scenario", "config_value", "iteration", "techniques"])
+
+
+def format_prefix(description, iteration, techniques):
+    """
+    Prefix of all files of one measurement as written by simulator.py.
+    """
+
+    return "{}-{}{}{}".format(description, iteration, SEPARATOR, techniques)
+
+
+def parse_prefix(prefix):
+    """
+    Split a measurement prefix into its parts. Returns None if the prefix does not follow the naming scheme.
+    """
+
+    parts = prefix.split(SEPARATOR)
+    if len(parts) != 2:
+        return None
+
+    match = _MEASUREMENT_PATTERN.match(parts[0])
+    if match is None:
+        return None
+
+    return Measurement(prefix=prefix,
+                       network_error=match.group("network_error"),
+                       file_size=match.group("file_size"),
+                       scenario=match.group("scenario"),
+                       config_value=match.group("config_value"),
+                       iteration=match.group("iteration"),
+                       techniques=parts[1])
+
+
+def iteration_sort_key(measurement):
+    """
+    Order measurements by their iteration number so that results do not depend on the order of the directory listing.
+    """
+
+    iteration = measurement.iteration
+    return (0, int(iteration), measurement.prefix) if iteration.isdigit() else (1, 0, measurement.prefix)
+
+
+class PrefixIndex:
+    """
+    All measurements of a folder together with the artifacts that are present for each of them.
+
+    folder: the folder to scan (e.g. results/raw or results/preprocessed)
+    """
+
+    def __init__(self, folder):
+
+        self.folder = folder
+        self.measurements = {}
+        self.artifacts = collections.defaultdict(set)
+        ### Files that contain the separator but do not follow the naming scheme
+        self.unparsed = []
+
+        for entry in os.scandir(folder):
+
+            if entry.name.count(SEPARATOR) != 2:
+                continue
+
+            prefix, artifact = entry.name.rsplit(SEPARATOR, 1)
+            if prefix not in self.measurements:
+                measurement = parse_prefix(prefix)
+                if measurement is None:
+                    self.unparsed.append(entry.name)
+                    continue
+                self.measurements[prefix] = measurement
+
+            self.artifacts[prefix].add(artifact)
+
+        if self.unparsed:
+            print("Ignore {} files in {} that do not follow the naming scheme, e.g. {}".format(len(self.unparsed), folder, sorted(self.unparsed)[0]))
+
+    def prefixes(self):
+        """
+        All measurement prefixes ordered by iteration.
+        """
+
+        return [measurement.prefix for measurement in sorted(self.measurements.values(), key=iteration_sort_key)]
+
+    def has_artifact(self, prefix, artifact):
+
+        return artifact in self.artifacts.get(prefix, ())
+
+    def path(self, prefix, artifact):
+
+        return os.path.join(self.folder, prefix + SEPARATOR + artifact)
+
+    def groups(self, scenario_filter=None):
+        """
+        Group the measurements by (network_error, config_value). Groups are sorted by their key and the measurements of a group by iteration.
+        scenario_filter: optional function on the scenario (e.g. lossrandom) that decides which measurements to include
+        """
+
+        groups = collections.defaultdict(list)
+        for measurement in self.measurements.values():
+            if scenario_filter is None or scenario_filter(measurement.scenario):
+                groups[(measurement.network_error, measurement.config_value)].append(measurement)
+
+        return collections.OrderedDict((key, sorted(groups[key], key=iteration_sort_key)) for key in sorted(groups.keys()))
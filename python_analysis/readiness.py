@@ -0,0 +1,165 @@
+"""
+    EFM Evaluation Framework
+    Copyright (c) 2021 
+
+	Author: Ike Kunze
+	E-mail: kunze@comsys.rwth-aachen.de
+"""
+
+"""
+This file provides event-driven readiness checks for the testbed used by simulator.py.
+Instead of sleeping for a fixed time, each check polls for the event it waits for, gives up after a timeout and reports how long it took.
+"""
+import os
+import select
+import subprocess
+import time
+
+
+POLL_INTERVAL = 0.01
+
+### Bytes read from a pipe at once by wait_for_output_line
+READ_SIZE = 65536
+
+
+class ReadinessTimeout(Exception):
+    pass
+
+
+def wait_until(description, check, timeout, poll_interval=POLL_INTERVAL):
+    """
+    Poll check() until it returns True. Returns the elapsed time in seconds and raises ReadinessTimeout after timeout seconds.
+    """
+
+    start = time.perf_counter()
+
+    while not check():
+
+        if time.perf_counter() - start > timeout:
+            raise ReadinessTimeout("{} not ready after {} seconds".format(description, timeout))
+        time.sleep(poll_interval)
+
+    elapsed = time.perf_counter() - start
+    print("{} ready after {:.3f} seconds".format(description, elapsed))
+    return elapsed
+
+
+def wait_for_output_line(description, stream, marker, timeout, echo=False):
+    """
+    Read lines from the pipe stream (e.g. the stderr of a subprocess) until one contains marker (bytes).
+    Returns the elapsed time in seconds and raises ReadinessTimeout after timeout seconds or if the stream ends before.
+    echo: print the lines read before the marker
+    """
+
+    start = time.perf_counter()
+
+    ### Read the file descriptor directly: a buffered readline() may take several lines out of the pipe but return only one,
+    ### after which select() would wait for output that has already been read
+    descriptor = stream.fileno()
+    pending = b""
+
+    while True:
+
+        remaining = timeout - (time.perf_counter() - start)
+        readable, _, _ = select.select([descriptor], [], [], max(remaining, 0))
+        if not readable:
+            raise ReadinessTimeout("{} not ready after {} seconds".format(description, timeout))
+
+        data = os.read(descriptor, READ_SIZE)
+        if not data:
+            raise ReadinessTimeout("{} exited before it was ready".format(description))
+
+        *lines, pending = (pending + data).split(b"\n")
+        ### the marker may also be part of the last, unterminated line
+        if any(marker in line for line in lines + [pending]):
+            break
+        if echo:
+            for line in lines:
+                print(line)
+
+    elapsed = time.perf_counter() - start
+    print("{} ready after {:.3f} seconds".format(description, elapsed))
+    return elapsed
+
+
+def namespaces_present(namespaces):
+    """
+    Check whether all the given network namespaces are accessible via ip netns.
+    """
+
+    return all(os.path.exists(os.path.join("/var/run/netns", namespace)) for namespace in namespaces)
+
+
+def namespaces_absent(namespaces):
+
+    return not any(os.path.lexists(os.path.join("/var/run/netns", namespace)) for namespace in namespaces)
+
+
+def interfaces_absent(interfaces):
+    """
+    Check whether none of the given interfaces exists in the current network namespace.
+    """
+
+    return not any(os.path.exists(os.path.join("/sys/class/net", interface)) for interface in interfaces)
+
+
+def udp_port_bound(namespace, port):
+    """
+    Check whether a socket is bound to the UDP port in the network namespace.
+    """
+
+    output = subprocess.run("sudo ip netns exec {} ss -lnu".format(namespace), shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.decode()
+
+    ### State Recv-Q Send-Q Local-Address:Port Peer-Address:Port
+    for line in output.splitlines()[1:]:
+        columns = line.split()
+        if len(columns) >= 4 and columns[3].endswith(":{}".format(port)):
+            return True
+
+    return False
+
+
+def local_udp_port_bound(port):
+    """
+    Check whether a socket is bound to the UDP port in the current network namespace (without root, used by the userspace emulator).
+    """
+
+    for table in ["/proc/net/udp", "/proc/net/udp6"]:
+        try:
+            with open(table) as inputFile:
+                lines = inputFile.readlines()[1:]
+        except FileNotFoundError:
+            continue
+
+        ### sl local_address:port(hex) rem_address:port(hex) ...
+        for line in lines:
+            columns = line.split()
+            if len(columns) >= 2 and int(columns[1].rsplit(":", 1)[1], 16) == int(port):
+                return True
+
+    return False
+
+
+def file_has_line_starting_with(path, prefix):
+    """
+    Check whether one of the lines already written to the file starts with prefix.
+    """
+
+    try:
+        with open(path) as inputFile:
+            return any(line.startswith(prefix) for line in inputFile)
+    except FileNotFoundError:
+        return False
+
+
+def processes_absent(patterns):
+    """
+    Check whether no running process matches any of the given grep -E patterns.
+    """
+
+    for pattern in patterns:
+        output = subprocess.run("ps aux | grep -E '{}'".format(pattern), shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+        if output.strip():
+            return False
+
+    return True
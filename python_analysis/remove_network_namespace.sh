@@ -2,9 +2,14 @@
 
 # Use this https://unix.stackexchange.com/questions/272851/ip-netns-exec-command-execution-using-nsid-obtained-from-ip-netns-list-id
 # to determine the network namespaces used by mininet
+#
+# Usage: remove_network_namespace.sh [node ...] (defaults to h1 h2 s1 s2 s3)
 
-rm -f /var/run/netns/mininet_h1
-rm -f /var/run/netns/mininet_h2
-rm -f /var/run/netns/mininet_s1
-rm -f /var/run/netns/mininet_s2
-rm -f /var/run/netns/mininet_s3
\ No newline at end of file
+nodes="$*"
+if [ -z "$nodes" ]; then
+    nodes="h1 h2 s1 s2 s3"
+fi
+
+for node in $nodes; do
+    rm -f /var/run/netns/mininet_$node
+done
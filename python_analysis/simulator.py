@@ -6,15 +6,25 @@
 	E-mail: kunze@comsys.rwth-aachen.de
 """
 
+import asyncio
 import subprocess
 import time
 import os
+import queue
+import threading
 
 from argparse import ArgumentParser
 from aioquic.quic.configuration import EFMVariants
 
 import json
 
+import custom_mininet_topo
+import netlink_backend
+import prefix_index
+import readiness
+import traffic_agents
+import userspace_emulator
+
 
 """""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
 Start of the Initial Part of the Program
@@ -37,6 +47,36 @@ parser.add_argument('--config', '-c',
                     help="Which experimental config to run",
                     choices=possibleConfigs,
                     required=True)
+parser.add_argument('--persistentTopology', '-P',
+                    dest="persistent_topology",
+                    action="store_true",
+                    help="Keep mininet running for the whole campaign instead of restarting it for every iteration. Between iterations, only changed link_configs are reapplied.")
+parser.add_argument('--slots', '-s',
+                    dest="slots",
+                    action="store",
+                    type=int,
+                    default=1,
+                    help="Number of isolated experiment slots (copies of the topology with their own names, subnet, ports and files) that run iterations in parallel. More than one slot implies --persistentTopology.")
+parser.add_argument('--linkBackend', '-l',
+                    dest="link_backend",
+                    action="store",
+                    choices=["auto", "netlink", "shell"],
+                    default="auto",
+                    help="How to configure qdiscs, delete interfaces and manage namespaces: in-process via netlink (pyroute2, requires root), via tc/ip commands, or netlink if available (default)")
+parser.add_argument('--captureMode', '-m',
+                    dest="capture_mode",
+                    action="store",
+                    choices=["full", "compact"],
+                    default="full",
+                    help="full: full-size tcpdump captures; compact: only keep the headers and the first two bytes of the first short header QUIC packet of each datagram (see compact_capture.py)")
+parser.add_argument('--emulator', '-e',
+                    dest="emulator",
+                    action="store_true",
+                    help="Run without mininet, root, tc and eBPF: client and server talk on localhost through a userspace relay that applies the netem_args per link and writes the captures and the queue monitor output itself (see userspace_emulator.py)")
+parser.add_argument('--trafficAgents', '-a',
+                    dest="traffic_agents",
+                    action="store_true",
+                    help="Keep one traffic agent per host namespace running with the topology (see traffic_agents.py); servers and clients are started over a Unix socket instead of as new python3 processes per iteration")
 
 
 args = parser.parse_args()
@@ -58,6 +98,12 @@ results_path = f"data/{config_name}/results"
 mininet_proc = None
 server_proc = None
 
+### Namespace -> traffic agent of the running topology (only with --trafficAgents)
+agents = {}
+
+### The userspace emulator does not configure any links
+link_backend = None if args.emulator else netlink_backend.create_backend(args.link_backend)
+
 """
 Set up folders for the measurement results.
 They will be placed in data/{name_of_config_file}/results/.
@@ -146,167 +192,267 @@ def debugSmallOutput(msg):
     print(msg + 5 * " X {}".format(msg))
 
 
-def start_mininet():
+### Upper bounds (in seconds) for the readiness checks that replace fixed sleeps
+MININET_TIMEOUT = 60
+NAMESPACE_TIMEOUT = 10
+SERVER_TIMEOUT = 10
+CAPTURE_TIMEOUT = 10
+MONITOR_TIMEOUT = 60
+
+### Ports of slot k are shifted by k * SLOT_PORT_STRIDE
+SLOT_PORT_STRIDE = 100
+
+### With --emulator, the relay listens on the configured server port and the server itself on the configured port + EMULATOR_SERVER_PORT_OFFSET
+EMULATOR_SERVER_PORT_OFFSET = 10000
+
+### Optional keys of synthetic_traffic that are passed to traffic/client.py (pacing and number of connections)
+CLIENT_OPTION_KEYS = ["rate", "bitrate", "burst", "connections"]
+
+### Optional keys of http_traffic that are passed on to traffic/http3_client.py
+HTTP_OPTION_KEYS = ["parallel_requests", "connections"]
+
+### The HTTP client signals the end of its downloads through this file (see traffic/http3_client.py --completion-file)
+COMPLETION_PATH_FORMAT = "/tmp/efm_http_completion_{namespace}_{port}.json"
+
+### Exit status of timeout(1) if the command ran out of time
+TIMEOUT_EXIT_STATUS = 124
+
+
+class TestbedSlot:
+    """
+    One isolated copy of the h1 --- s1 --- s2 --- s3 --- h2 chain (see custom_mininet_topo.py).
+    Configurations always refer to the plain names (h1, s3-eth1, ...) and ports; the slot maps them to its own nodes, interfaces, namespaces, addresses and ports.
+    Slot 0 uses the plain names, the subnet 10.0.1.0/24 and the configured ports.
+    """
+
+    def __init__(self, index):
+
+        self.index = index
+
+    def node(self, node):
+
+        return custom_mininet_topo.slot_node_name(node, self.index)
+
+    def interface(self, link):
+        """
+        e.g. s3-eth1 -> s3_2-eth1 in slot 2
+        """
+
+        node, port = link.split("-", 1)
+        return "{}-{}".format(self.node(node), port)
+
+    def namespace(self, node):
+
+        return "mininet_{}".format(self.node(node))
+
+    def ip(self, host):
+
+        return custom_mininet_topo.slot_ip(host, self.index)
+
+    def port(self, port):
+
+        return int(port) + SLOT_PORT_STRIDE * self.index
+
+    def nodes(self):
+
+        return [self.node(node) for node in custom_mininet_topo.HOSTS + custom_mininet_topo.SWITCHES]
+
+    def interfaces(self):
+
+        return [self.node(switch) for switch in custom_mininet_topo.SWITCHES] + [self.interface("{}-eth{}".format(switch, port)) for switch in custom_mininet_topo.SWITCHES for port in [1, 2]]
+
+
+def start_mininet(slots=1):
     """
-    Start mininet using the topology defined in custom_mininet_topo.py
+    Start mininet using the topology defined in custom_mininet_topo.py with the given number of experiment slots
+    Mininet is ready once it starts its CLI.
     """
     global mininet_proc
 
     debugOutput("Start MiniNet")
     mininet_proc = subprocess.Popen(
-        f"sudo mn --custom custom_mininet_topo.py --topo mytopo", shell=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE, stdin=subprocess.PIPE)
-    print(f"sudo mn --custom custom_mininet_topo.py --topo mytopo")
+        f"sudo mn --custom custom_mininet_topo.py --topo mytopo,{slots}", shell=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE, stdin=subprocess.PIPE)
+    print(f"sudo mn --custom custom_mininet_topo.py --topo mytopo,{slots}")
 
-    while True:
-        line = mininet_proc.stderr.readline()
-        if not line:
-            break
-        if line == b'*** Starting CLI:\n':
-            break
-        print(line)
+    readiness.wait_for_output_line("Mininet", mininet_proc.stderr, b'*** Starting CLI:', timeout=MININET_TIMEOUT, echo=True)
 
     print("DONE")
 
 
 
-def add_access_to_h1_h2_namespace():
+def add_access_to_h1_h2_namespace(nodes):
     """
     Use the add_network_namespace.sh script to facilitate accessing the different entities within mininet (essentially creating a network namespace for each host)
+    nodes: mininet node names, e.g. h1, s3_2
     """
 
     print("Add access to mininet namespaces of h1 and h2.")
-    subprocess.Popen(f"sudo bash add_network_namespace.sh", shell=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+    link_backend.add_namespaces(nodes)
+
+    namespaces = ["mininet_{}".format(node) for node in nodes]
+    readiness.wait_until("Namespaces", lambda: readiness.namespaces_present(namespaces), timeout=NAMESPACE_TIMEOUT)
 
-def remove_access_to_h1_h2_namespace():
+def remove_access_to_h1_h2_namespace(nodes):
     """
     Remove the facilitated access by deleting the created network namespaces
     """
 
     print("Remove access to mininet namespaces of h1 and h2.")
-    subprocess.Popen(f"sudo bash remove_network_namespace.sh", shell=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+    link_backend.remove_namespaces(nodes)
 
+    namespaces = ["mininet_{}".format(node) for node in nodes]
+    readiness.wait_until("Namespace removal", lambda: readiness.namespaces_absent(namespaces), timeout=NAMESPACE_TIMEOUT)
 
 
-def remove_virtual_interfaces():
+
+def remove_virtual_interfaces(interfaces):
     """
     Cleanup all virtual interfaces so that we have a clean slate
+    interfaces: the switch and link interfaces of all slots
     """
 
     print("Remove all virtual interfaces")
 
-    try:
-        subprocess.run("sudo ip link delete ovs-system")
-    except FileNotFoundError:
-        pass
+    for failure in link_backend.delete_links(["ovs-system"] + interfaces):
+        print(failure)
 
-    try:
-        subprocess.run("sudo ip link delete s1")
-    except FileNotFoundError:
-        pass
 
-    try:
-        subprocess.run("sudo ip link delete s2")
-    except FileNotFoundError:
-        pass
 
-    try:
-        subprocess.run("sudo ip link delete s3")
-    except FileNotFoundError:
-        pass
+"""
+Forcefully kill the ebpf program, the server or tcpdump if they should not respond.
+The patterns only match the processes of one slot (monitored device, server port, captured interfaces).
+"""
 
-    try:
-        subprocess.run("sudo ip link delete s1-eth1")
-    except FileNotFoundError:
-        pass
+def ebpf_process_pattern(slot):
 
-    try:
-        subprocess.run("sudo ip link delete s1-eth2")
-    except FileNotFoundError:
-        pass
+    return "[m]onitor_queue_bpf_enqueue_only.py .*--device {} ".format(slot.interface("s3-eth1"))
 
-    try:
-        subprocess.run("sudo ip link delete s2-eth1")
-    except FileNotFoundError:
-        pass
 
-    try:
-        subprocess.run("sudo ip link delete s2-eth2")
-    except FileNotFoundError:
-        pass
+def server_process_pattern(slot, server_port):
 
-    try:
-        subprocess.run("sudo ip link delete s3-eth1")
-    except FileNotFoundError:
-        pass
+    return "[t]raffic/(http3_)?server.py .*--(server)?port {} ".format(server_port)
 
-    try:
-        subprocess.run("sudo ip link delete s3-eth2")
-    except FileNotFoundError:
-        pass
 
+def tcpdump_process_pattern(slot):
 
+    return "([t]cpdump|[c]ompact_capture.py) -i ({}) ".format("|".join(slot.interface(interface) for interface in ["s2-eth1", "s2-eth2", "s3-eth2"]))
 
-"""
-Forcefully kill the ebpf program or the server if they should not respond
-"""
 
-def hard_kill_ebpf():
-    print("Hard kill ebpf")
-    kill_command = "sudo kill $(ps aux | grep '[m]onitor_queue_bpf_enqueue_only.py' | awk '{print $2}')"
+def hard_kill(description, pattern):
+    print("Hard kill {}".format(description))
+    kill_command = "sudo kill $(ps aux | grep -E '{}' | awk '{{print $2}}')".format(pattern)
     print(kill_command)
     subprocess.run(kill_command, shell=True)
 
 
-def hard_kill_server():
-    print("Hard kill server")
-    kill_command = "sudo kill $(ps aux | grep '[t]raffic/server.py' | awk '{print $2}')"
-    print(kill_command)
-    subprocess.run(kill_command, shell=True)
+def hard_kill_ebpf(slot):
+    hard_kill("ebpf", ebpf_process_pattern(slot))
 
 
+def hard_kill_server(slot, server_port):
+    hard_kill("server", server_process_pattern(slot, server_port))
 
 
+def stop_server(slot, server_namespace, server_port):
+    """
+    Stop the server of the current iteration: agents close it, standalone server processes are killed
+    """
+
+    if server_namespace in agents:
+        counters = agents[server_namespace].request("stop", port=server_port)
+        print("Stopped the server of agent {} on port {} ({})".format(server_namespace, server_port, counters))
+    else:
+        hard_kill_server(slot, server_port)
+
 
-def start_server(efmvariants, server_host, server_port, packets):
+def hard_kill_tcpdump(slot):
+    """
+    Stop the captures of the current iteration. tcpdump flushes and closes the .pcap file on SIGTERM.
+    """
+    hard_kill("tcpdump", tcpdump_process_pattern(slot))
+
+
+
+
+
+def start_server(efmvariants, server_namespace, server_port, packets, batched=False):
     """
     Start an EFM QUIC Server that uses the Datagram mode.
     Note that keying material is hard-coded.
     
     efmvariants: identifier for which EFM variants are to be used
-    server_host: on which host to run the server (leveraging the simplified access via netns)
+    server_namespace: in which network namespace to run the server (leveraging the simplified access via netns)
     server_port: on which port the server listens
     packets: how many packets should be transmitted
+    batched: reply in the batched mode of server.py (one transmit per received datagram, reused payload)
     """
 
     global server_proc
 
     debugSmallOutput("Start Trash Server")
 
-    command_prefix = "sudo ip netns exec mininet_{} ".format(server_host)
+    if server_namespace in agents:
+        agents[server_namespace].request("server", efmvariants=efmvariants, port=server_port, packets=packets, batched=batched)
+        print("Server of agent {} ready on port {}".format(server_namespace, server_port))
+        return
+
+    command_prefix = "sudo ip netns exec {} ".format(server_namespace)
     command = f"python3 ../traffic/server.py --packets {packets} --efmvariants {efmvariants} --serverport {server_port} --keypath ../traffic/ssl_key.pem --certpath ../traffic/ssl_cert.pem"
+    if batched:
+        command += " --batched"
 
     command = command_prefix + command
     print(command)
 
     server_proc = subprocess.Popen(command,  shell=True)
 
+    readiness.wait_until("Server", lambda: readiness.udp_port_bound(server_namespace, server_port), timeout=SERVER_TIMEOUT, poll_interval=0.05)
+
+
+def client_options_of(synthetic_traffic):
+    """
+    Optional client settings (rate, bitrate, burst, connections) of a synthetic_traffic configuration, see traffic/client.py
+    """
+
+    return {key: synthetic_traffic[key] for key in CLIENT_OPTION_KEYS if key in synthetic_traffic}
 
-def run_flow(efmvariants, src_host, src_port, packets, target_ip, dst_port):
+
+def http_options_of(http_traffic):
+    """
+    Optional download settings (parallel_requests, connections) of an http_traffic configuration, see traffic/http3_client.py
+    """
+
+    return {key: http_traffic[key] for key in HTTP_OPTION_KEYS if key in http_traffic}
+
+
+def client_arguments(client_options):
+
+    return [argument for key, value in client_options.items() for argument in ["--" + key.replace("_", "-"), str(value)]]
+
+
+def run_flow(efmvariants, src_namespace, src_port, packets, target_ip, dst_port, client_options={}):
     """
     Start an EFM QUIC Client that uses the Datagram mode and connects to the EFM QUIC Server.
 
     efmvariants: identifier for which EFM variants are to be used
     target_ip: which IP to connect to
     dst_port: which port to connect to
-    src_host: on which host to run the client (leveraging the simplified access via netns)
+    src_namespace: in which network namespace to run the client (leveraging the simplified access via netns)
     src_port: which source port to use
     packets: how many packets should be transmitted
+    client_options: optional rate/bitrate/burst/connections of the client (see client_options_of); with several connections, the source ports are src_port, src_port + 1, ...
     """
 
     debugSmallOutput("Run Trash Flow")
 
-    command_prefix = "sudo ip netns exec mininet_{} ".format(src_host)
-    command = f"python3 ../traffic/client.py --target {target_ip} --packets {packets} --srcport {src_port} --dstport {dst_port} --efmvariants {efmvariants}"
+    if src_namespace in agents:
+        result = agents[src_namespace].request("client", efmvariants=efmvariants, target=target_ip, srcport=src_port, dstport=dst_port, **client_options)
+        print("Client of agent {} sent {} packets in {:.3f} seconds ({:.1f} packets/s, inter-send jitter {:.1f} us)".format(
+            src_namespace, result["packets"], result["elapsed"], result["achieved_rate"], result["jitter_std"] * 1e6))
+        return
+
+    command_prefix = "sudo ip netns exec {} ".format(src_namespace)
+    command = " ".join([f"python3 ../traffic/client.py --target {target_ip} --packets {packets} --srcport {src_port} --dstport {dst_port} --efmvariants {efmvariants}"] + client_arguments(client_options))
 
     command = command_prefix + command
     print(command)
@@ -314,12 +460,12 @@ def run_flow(efmvariants, src_host, src_port, packets, target_ip, dst_port):
     subprocess.run(command,  shell=True)
 
 
-def start_h3_server(efmvariants, server_host, server_port, duration):
+def start_h3_server(efmvariants, server_namespace, server_port, duration):
     """
     Start an EFM QUIC Server that uses regular HTTP3.
 
     efmvariants: identifier for which EFM variants are to be used
-    server_host: on which host to run the server (leveraging the simplified access via netns)
+    server_namespace: in which network namespace to run the server (leveraging the simplified access via netns)
     server_port: on which port the server listens
     duration: additional timeout information to kill the server after a predefined amount of time
     """
@@ -328,39 +474,100 @@ def start_h3_server(efmvariants, server_host, server_port, duration):
 
     debugSmallOutput("Start HTTP Server")
 
-    command_prefix = "sudo ip netns exec mininet_{} ".format(server_host)
+    if server_namespace in agents:
+        agents[server_namespace].request("h3_server", efmvariants=efmvariants, port=server_port, duration=duration)
+        print("HTTP Server of agent {} ready on port {}".format(server_namespace, server_port))
+        return
+
+    command_prefix = "sudo ip netns exec {} ".format(server_namespace)
     command = f"timeout {duration+5} python3 ../traffic/http3_server.py --efmvariants {efmvariants} --host 0.0.0.0 --port {server_port} -k ../traffic/ssl_key.pem -c ../traffic/ssl_cert.pem"
 
     command = command_prefix + command
     print(command)
     server_proc = subprocess.Popen(command,  shell=True)
 
+    readiness.wait_until("HTTP Server", lambda: readiness.udp_port_bound(server_namespace, server_port), timeout=SERVER_TIMEOUT, poll_interval=0.05)
+
 
-def run_http_flow(efmvariants, src_host, src_port, file_size, target_ip, dst_port):
+def run_http_flow(efmvariants, src_namespace, src_port, file_size, target_ip, dst_port, duration, http_options={}):
     """
-    Start an EFM QUIC Client that uses regular HTTP3 and connects to the EFM QUIC Server 
+    Start an EFM QUIC Client that uses regular HTTP3 and connects to the EFM QUIC Server.
+    Returns as soon as the client is done (see http_completion_of); duration only bounds a stalled download.
 
     efmvariants: identifier for which EFM variants are to be used
     target_ip: which IP to connect to
     dst_port: which port to connect to
     file_name: which file to download (in our case, filenames directly represent file sizes)
-    src_host: on which host to run the client (leveraging the simplified access via netns)
+    src_namespace: in which network namespace to run the client (leveraging the simplified access via netns)
     src_port: which source port to use
+    duration: upper bound (in seconds) for the downloads
+    http_options: parallel_requests (GETs of the file per connection) and connections (each from the next source port), see http_options_of
     """
 
     debugSmallOutput("Run HTTP Flow")
     
     file_name = file_size + ".file"
 
-    command_prefix = "sudo ip netns exec mininet_{} ".format(src_host)
-    command = f"python3 ../traffic/http3_client.py -k --efmvariants {efmvariants} --srcport {src_port} https://{target_ip}:{dst_port}/" + file_name
+    if src_namespace in agents:
+        result = agents[src_namespace].request("h3_client", efmvariants=efmvariants, srcport=src_port, url=f"https://{target_ip}:{dst_port}/" + file_name, timeout=duration, **http_options)
+        if result["status"] == "timeout":
+            print("HTTP client of agent {} did not finish within {} seconds".format(src_namespace, duration))
+            return {"complete": False}
+
+        print("HTTP client of agent {} received {} bytes over {} streams in {:.3f} seconds ({:.3f} Mbps, {} goodput samples)".format(src_namespace, result["octets"], len(result["streams"]), result["elapsed"], result["mbps"], len(result["goodput_samples"])))
+        if not result["complete"]:
+            print("HTTP client of agent {} finished with an incomplete response".format(src_namespace))
+        return result
+
+    ### The client runs as root, so its completion file in /tmp (sticky bit) has to be removed with sudo
+    completion_path = COMPLETION_PATH_FORMAT.format(namespace=src_namespace, port=src_port)
+    remove_completion_file(completion_path, privileged=True)
+
+    command_prefix = "sudo ip netns exec {} ".format(src_namespace)
+    command = f"timeout {duration} python3 ../traffic/http3_client.py -k --streaming --efmvariants {efmvariants} --srcport {src_port} --completion-file {completion_path} " + " ".join(client_arguments(http_options)) + f" https://{target_ip}:{dst_port}/" + file_name
 
     command = command_prefix + command
     print(command)
 
-    subprocess.run(command,  shell=True)
+    client_proc = subprocess.run(command,  shell=True)
+
+    return http_completion_of(completion_path, client_proc.returncode, duration, privileged=True)
+
 
-def run_queue_monitor(queue_type, output_file_path, host):
+def remove_completion_file(completion_path, privileged=False):
+    """
+    Remove a completion file of an HTTP client. privileged: the client ran as root (sudo ip netns exec) and owns the file
+    """
+
+    if privileged:
+        subprocess.run("sudo rm -f {}".format(completion_path), shell=True)
+    elif os.path.exists(completion_path):
+        os.remove(completion_path)
+
+
+def http_completion_of(completion_path, returncode, duration, privileged=False):
+    """
+    Completion of an HTTP client process from its exit status and the completion file it wrote (which is removed, see remove_completion_file).
+    Returns the content of the completion file, at least {"complete": False} if there is none.
+    """
+
+    completion = {"complete": False}
+    if os.path.exists(completion_path):
+        with open(completion_path) as completion_file:
+            completion = json.load(completion_file)
+        remove_completion_file(completion_path, privileged)
+
+    if returncode == TIMEOUT_EXIT_STATUS:
+        print("HTTP client did not finish within {} seconds".format(duration))
+    elif returncode != 0 or not completion["complete"]:
+        print("HTTP client finished with an incomplete response (exit status {})".format(returncode))
+    else:
+        aggregate = completion["aggregate"]
+        print("HTTP client received {} bytes over {} streams in {:.3f} seconds ({:.3f} Mbps)".format(aggregate["octets"], aggregate["streams"], aggregate["elapsed_s"], aggregate["mbps"]))
+
+    return completion
+
+def run_queue_monitor(queue_type, output_file_path, host, slot):
     """
     Run the eBPF-based script to monitor the queue status
 
@@ -368,6 +575,7 @@ def run_queue_monitor(queue_type, output_file_path, host):
     -> depending on the queue type, there are different callbacks to be triggered in the ebpf file
     output_file_path: where to write the output file to
     host: on which host to run the ebpf tool
+    slot: the monitor only reports the s3-eth1 of this slot (under the name s3-eth1)
 
     #### NOTE: monitor_queue_bpf_enqueue_only.py has been in use with python2
     """
@@ -376,7 +584,7 @@ def run_queue_monitor(queue_type, output_file_path, host):
 
     if host in ["h1", "h2"]:
 
-        command_prefix = "sudo ip netns exec mininet_{} ".format(host)
+        command_prefix = "sudo ip netns exec {} ".format(slot.namespace(host))
 
     elif host in ["s1", "s2", "s3"]:
 
@@ -389,18 +597,27 @@ def run_queue_monitor(queue_type, output_file_path, host):
     options = "" 
     if queue_type == "NETEM":
         options += "-t NETEM"
+    options += " --device {} --alias s3-eth1".format(slot.interface("s3-eth1"))
 
     command = f" python2 {program_path} {options} > {output_file_path}"
 
     command = command_prefix + command
     print(command)
-    return subprocess.Popen(command, shell=True)
+    queue_monitor_proc = subprocess.Popen(command, shell=True)
+
+    ### The monitor prints its header once the probes are attached
+    readiness.wait_until("Queue monitor", lambda: readiness.file_has_line_starting_with(output_file_path, "TIME"), timeout=MONITOR_TIMEOUT, poll_interval=0.05)
 
+    return queue_monitor_proc
 
-def startPcap(raw_file_path, pcap_name):
+
+def startPcap(raw_file_path, pcap_name, slot, capture_mode="full"):
     """
     Run tcpdump to capture all network traffic.
     Capture full-size packets and DON'T apply snaplen, because there might be short header frames that are combined with other frames in the same packet (e.g., upon startup) and we would in those cases lose the initial values and thus get a measurement error in the first iteration.
+    capture_mode compact: instead of tcpdump, compact_capture.py only writes the headers and the first short header bytes of each datagram (independent of coalescing)
+    The .pcap files are named after the plain interface names, independent of the slot.
+    Returns once all captures report that they are listening.
     """
 
     def runTcpDump(interface, file_path, host, src_ip,dst_ip):
@@ -411,223 +628,513 @@ def startPcap(raw_file_path, pcap_name):
         file_path: where to write the output
         """
 
-        command_prefix = "sudo ip netns exec mininet_{} ".format(host)
-        command = f"sudo tcpdump -i {interface} -w {file_path} \"udp && src {src_ip} && dst {dst_ip}\""
+        command_prefix = "sudo ip netns exec {} ".format(slot.namespace(host))
+        if capture_mode == "compact":
+            command = f"python3 compact_capture.py -i {slot.interface(interface)} -w {file_path} --src {src_ip} --dst {dst_ip}"
+        else:
+            command = f"sudo tcpdump -i {slot.interface(interface)} -w {file_path} \"udp && src {src_ip} && dst {dst_ip}\""
 
         command = command_prefix + command
         print(command)
 
-        tcpdump = subprocess.Popen(command, shell=True)
+        tcpdump = subprocess.Popen(command, shell=True, stderr=subprocess.PIPE)
+
+        return tcpdump
 
 
+    tcpdumps = {}
+
     pcap_file_path = os.path.join(raw_file_path, "{}s2-eth1.pcap".format(pcap_name))
-    runTcpDump(interface="s2-eth1", file_path=pcap_file_path, host="s2", src_ip="10.0.1.1", dst_ip="10.0.1.2")
+    tcpdumps["s2-eth1"] = runTcpDump(interface="s2-eth1", file_path=pcap_file_path, host="s2", src_ip=slot.ip("h1"), dst_ip=slot.ip("h2"))
     
     pcap_file_path = os.path.join(raw_file_path, "{}s2-eth2.pcap".format(pcap_name))
-    runTcpDump(interface="s2-eth2", file_path=pcap_file_path, host="s2", src_ip="10.0.1.2", dst_ip="10.0.1.1")
+    tcpdumps["s2-eth2"] = runTcpDump(interface="s2-eth2", file_path=pcap_file_path, host="s2", src_ip=slot.ip("h2"), dst_ip=slot.ip("h1"))
 
 
     """
     FOR PACKET GROUNDTRUTH
     """
     pcap_file_path = os.path.join(raw_file_path, "{}s3-eth2.pcap".format(pcap_name))
-    runTcpDump(interface="s3-eth2", file_path=pcap_file_path, host="s3", src_ip="10.0.1.2", dst_ip="10.0.1.1")
+    tcpdumps["s3-eth2"] = runTcpDump(interface="s3-eth2", file_path=pcap_file_path, host="s3", src_ip=slot.ip("h2"), dst_ip=slot.ip("h1"))
+
+    for interface, tcpdump in tcpdumps.items():
+        readiness.wait_for_output_line("Capture on {}".format(slot.interface(interface)), tcpdump.stderr, b"listening on", timeout=CAPTURE_TIMEOUT)
+
 
 
+def write_slot_info(raw_file_path, pcap_name, slot):
+    """
+    Store the slot and the addresses of a measurement next to its raw files (<prefix>+-+slot.json) so that the analysis knows the client and server address.
+    """
+
+    with open(os.path.join(raw_file_path, "{}slot.json".format(pcap_name)), "w") as slotFile:
+        json.dump({"slot": slot.index, "client_ip": slot.ip("h1"), "server_ip": slot.ip("h2")}, slotFile)
+
 
-def set_static_link_parameters_mininet(link, arguments, host=""):
+
+def set_static_link_parameters_mininet(link, arguments, host="", slot=None, server_port=1234):
 
     """
-    Configure link parameters using tc.
+    Configure link parameters using tc (via the link backend).
     On link s3-eth1, make sure that the packet loss only affects traffic going from the server to the client by appyling an additional filter for this traffic.
+    link/host: plain names (e.g. s3-eth1/s3) that are mapped to the slot
+    server_port: port of the server in the slot
     """
 
+    if slot is None:
+        slot = TestbedSlot(0)
+
     debugSmallOutput("QDISC")
-    command_prefix = "sudo ip netns exec mininet_{} ".format(host)
 
     if link == "s3-eth1":
 
         print("Configure the nasty link")
 
-        cmd1 = f"tc qdisc add dev {link} root handle 1: prio"
-        cmd = command_prefix + cmd1
+        """
+        Only apply this configuration to traffic coming from the server (e.g. ip 10.0.1.2 with port 1234)
+        """
+        link_backend.add_prio_netem(slot.namespace(host), slot.interface(link), arguments, src_ip=slot.ip("h2"), sport=server_port)
 
-        print(cmd)
+    else:
 
-        subprocess.run(cmd, shell=True)
+        print("Configure a normal link")
+        link_backend.add_netem(slot.namespace(host), slot.interface(link), arguments)
 
-        """
-        Only apply this configuration to traffic coming from ip 10.0.1.2 with port 1234
-        """
-        cmd2 = f"tc filter add dev {link} parent 1: protocol ip prio 2 u32 match ip src 10.0.1.2/32 match ip protocol 17 0xff match ip sport 1234 0xffff flowid 1:1"
-        cmd = command_prefix + cmd2
 
-        print(cmd)
+def remove_link_parameters_mininet(link, host="", slot=None):
+
+    """
+    Remove all qdiscs configured on the link (including the filter of link s3-eth1).
+    """
+
+    if slot is None:
+        slot = TestbedSlot(0)
+
+    link_backend.delete_qdiscs(slot.namespace(host), slot.interface(link))
+
+
+def replace_link_parameters_mininet(link, arguments, host="", slot=None):
+
+    """
+    Change the netem arguments of a link that has already been configured with set_static_link_parameters_mininet.
+    On link s3-eth1, only the netem qdisc below the prio qdisc is replaced so that the filter stays in place.
+    """
+
+    if slot is None:
+        slot = TestbedSlot(0)
+
+    debugSmallOutput("QDISC REPLACE")
+
+    link_backend.replace_netem(slot.namespace(host), slot.interface(link), arguments, below_prio=(link == "s3-eth1"))
+
+
+def apply_link_configs(link_configs, applied_link_configs, slot, server_port):
+
+    """
+    Bring the qdiscs of the slot in line with the link_configs of a flow_test.
+    applied_link_configs: mapping (link, server port) -> netem arguments that are currently configured in the slot; it is updated once the changes are applied.
+    Links whose netem arguments did not change are left untouched; the filter of s3-eth1 depends on the server port, so a new port reconfigures the link.
+    If the changes fail, the qdiscs of the involved links are removed (as far as possible) and applied_link_configs is emptied, so that the next iteration starts from scratch.
+    """
+
+    wanted_link_configs = {(link_config["link"], server_port if link_config["link"] == "s3-eth1" else None): link_config["netem_args"] for link_config in link_configs}
+
+    ### All qdisc, filter and netem changes of the iteration are applied together when the batch ends
+    try:
+        with link_backend.batch():
+            update_link_configs(wanted_link_configs, applied_link_configs, slot, server_port)
+    except netlink_backend.LinkConfigurationError:
+        for link in set(link for link, _ in list(applied_link_configs.keys()) + list(wanted_link_configs.keys())):
+            try:
+                remove_link_parameters_mininet(link, host=link.split("-")[0].strip("["), slot=slot)
+            except netlink_backend.LinkConfigurationError as failure:
+                print("Could not reset {}: {}".format(slot.interface(link), failure))
+        applied_link_configs.clear()
+        raise
+
+    applied_link_configs.clear()
+    applied_link_configs.update(wanted_link_configs)
+
+
+def update_link_configs(wanted_link_configs, applied_link_configs, slot, server_port):
+    """
+    Issue the changes from applied_link_configs to wanted_link_configs (both are left as they are).
+    """
+
+    for link, port in applied_link_configs.keys():
+        if (link, port) not in wanted_link_configs:
+            remove_link_parameters_mininet(link, host=link.split("-")[0].strip("["), slot=slot)
+
+    for (link, port), netem_args in wanted_link_configs.items():
+        print({"link": link, "netem_args": netem_args})
+
+        host = link.split("-")[0].strip("[")
+
+        if (link, port) not in applied_link_configs:
+            set_static_link_parameters_mininet(link, netem_args, host=host, slot=slot, server_port=server_port)
+        elif applied_link_configs[(link, port)] != netem_args:
+            replace_link_parameters_mininet(link, netem_args, host=host, slot=slot)
+        else:
+            print("{} is already configured with {}".format(slot.interface(link), netem_args))
+
+
+def setup_testbed(slots=1):
+    """
+    Basic setup of the testbed with some additional cleaning up of old stuff
+    slots: number of isolated experiment slots to instantiate
+    """
+
+    testbed_slots = [TestbedSlot(index) for index in range(slots)]
+    interfaces = [interface for slot in testbed_slots for interface in slot.interfaces()]
+    nodes = [node for slot in testbed_slots for node in slot.nodes()]
+
+    remove_virtual_interfaces(interfaces)
+    readiness.wait_until("Interface removal", lambda: readiness.interfaces_absent(interfaces), timeout=NAMESPACE_TIMEOUT)
+    
+    start_mininet(slots)
+
+    remove_access_to_h1_h2_namespace(nodes)
+    add_access_to_h1_h2_namespace(nodes)
+
+    if args.traffic_agents:
+        agents.update(traffic_agents.start_agents([slot.namespace(host) for slot in testbed_slots for host in custom_mininet_topo.HOSTS]))
+
+    return testbed_slots
+
+
+def teardown_testbed(slots=1):
+    """
+    Exit mininet and remove everything that setup_testbed created
+    """
+
+    testbed_slots = [TestbedSlot(index) for index in range(slots)]
 
-        subprocess.run(cmd, shell=True)
+    ### The agents run in the host namespaces and the netlink sockets belong to the namespaces, so neither must outlive mininet
+    traffic_agents.stop_agents(agents)
+    link_backend.close()
 
+    if mininet_proc is not None and mininet_proc.poll() is None:
+        print("Exit Mininet")
+        mininet_proc.communicate(input=b'exit')
 
-        cmd3 = f"tc qdisc add dev {link} parent 1:1 netem {arguments}"
-        cmd = command_prefix + cmd3
+    remove_access_to_h1_h2_namespace([node for slot in testbed_slots for node in slot.nodes()])
+    remove_virtual_interfaces([interface for slot in testbed_slots for interface in slot.interfaces()])
 
-        print(cmd)
 
-        subprocess.run(cmd, shell=True)
+def deployed_techniques_of(flow_test):
+    """
+    Based on the parameters set in the configuration file, determine which value to set in the QUIC EFM client/server
+    """
+    deployed_techniques = 0
+    if flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["delay_paper"] and flow_test["measurement_techniques"]["t_rtpl"] and\
+        flow_test["measurement_techniques"]["q_square"] and flow_test["measurement_techniques"]["r_reflection_square"] and\
+        flow_test["measurement_techniques"]["l_loss_event"] and\
+        flow_test["measurement_techniques"]["vec"] and flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["delay_draft"]:
+
+        deployed_techniques = EFMVariants.ALL_MEASUREMENTS
+
+    elif flow_test["measurement_techniques"]["t_rtpl"] and flow_test["measurement_techniques"]["q_square"] and\
+            flow_test["measurement_techniques"]["r_reflection_square"] and flow_test["measurement_techniques"]["l_loss_event"]:
 
+        deployed_techniques = EFMVariants.LOSS_MECHANISMS
+
+
+        """ These options involving the 'SPIN' prefix have not been tested recently."""
     else:
+        if flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["delay_paper"] and flow_test["measurement_techniques"]["t_rtpl"]:
+            deployed_techniques = EFMVariants.SPIN_DELAY_PAPER_T_BIT_RTPL
+        elif flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["q_square"] and flow_test["measurement_techniques"]["r_reflection_square"]:
+            deployed_techniques = EFMVariants.SPIN_Q_BIT_SQUARE_R_BIT_REFLECTION_SQUARE
+        elif flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["q_square"] and flow_test["measurement_techniques"]["l_loss_event"]:
+            deployed_techniques = EFMVariants.SPIN_Q_BIT_SQUARE_L_BIT_LOSS_EVENT
+        elif flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["vec"]:
+            deployed_techniques = EFMVariants.SPIN_VEC
+        elif flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["delay_draft"] and flow_test["measurement_techniques"]["t_rtpl"]:
+            deployed_techniques = EFMVariants.SPIN_DELAY_DRAFT_T_BIT_RTPL
 
-        print("Configure a normal link")
-        cmd = f"tc qdisc add dev {link} parent root netem {arguments}"
-        cmd = command_prefix + cmd
-        print(cmd)
+    return deployed_techniques
 
-        subprocess.run(cmd, shell=True)
 
+def http_duration_of(file_size, http_options={}):
+    """
+    Upper bound (in seconds) for an HTTP download of the given file size, used to kill the HTTP server afterwards.
+    Parallel downloads (http_options, see http_options_of) share the path, so the bound grows with the number of streams.
+    """
+
+    set_duration = -1
+    if file_size in ["50k", "500k"]:
+        set_duration = 120
+    elif file_size in ["2M", "10M"]:
+        set_duration = 120
+    elif file_size in ["200M"]:
+        set_duration = 120
+    else:
+        set_duration = 200
+
+    return set_duration * int(http_options.get("parallel_requests", 1)) * int(http_options.get("connections", 1))
+
+
+def run_iteration(flow_test, iteration, slot, applied_link_configs):
+    """ Perform one iteration of a flow_test in a slot of the running topology.
+    applied_link_configs: netem arguments currently configured in the slot (see apply_link_configs)
+    """
+
+    src_port = slot.port(flow_test["src_port"])
+    dst_port = slot.port(flow_test["dst_port"])
 
-def simulate(flow_tests, iterations, host_info):
+    apply_link_configs(flow_test["link_configs"], applied_link_configs, slot, dst_port)
+
+    print("Run the following flow: " + flow_test["description"])
+
+    deployed_techniques = deployed_techniques_of(flow_test)
+
+    description = prefix_index.format_prefix(flow_test["description"], iteration, deployed_techniques) + prefix_index.SEPARATOR
+    raw_file_path = os.path.join(results_path,"raw")
+
+    write_slot_info(raw_file_path, description, slot)
+
+
+    """
+    Depending on the traffic setting, perform slightly different configurations
+    """
+    queue_mon = None
+    if "synthetic_traffic" in flow_test.keys():
+
+        queue_mon = run_queue_monitor(queue_type="NETEM", output_file_path=os.path.join(raw_file_path, description + "queue_monitor.txt"), host="s2", slot=slot)
+
+        start_server(efmvariants=deployed_techniques, server_namespace=slot.namespace(flow_test["dst_host"]), server_port=dst_port,
+                    packets=flow_test["synthetic_traffic"]["packets"], batched=flow_test["synthetic_traffic"].get("batched_server", False))
+
+
+        startPcap(raw_file_path, description, slot, capture_mode=args.capture_mode)
+        run_flow(efmvariants=deployed_techniques,
+                src_namespace=slot.namespace(flow_test["src_host"]), src_port=src_port,
+                packets=flow_test["synthetic_traffic"]["packets"],
+                target_ip=slot.ip(flow_test["dst_host"]),dst_port=dst_port,
+                client_options=client_options_of(flow_test["synthetic_traffic"]))
+
+
+    if "http_traffic" in flow_test.keys():
+
+        file_size = flow_test["http_traffic"]["file_size"]
+        http_options = http_options_of(flow_test["http_traffic"])
+
+        set_duration = http_duration_of(file_size, http_options)
+
+        print("Start H3 download with a file size of ", file_size, http_options)
+
+        queue_mon = run_queue_monitor(queue_type="NETEM", output_file_path=os.path.join(raw_file_path, description + "queue_monitor.txt"), host="s2", slot=slot)
+
+        start_h3_server(efmvariants=deployed_techniques, server_namespace=slot.namespace(flow_test["dst_host"]), server_port=dst_port, duration=set_duration)
+
+
+        startPcap(raw_file_path, description, slot, capture_mode=args.capture_mode)
+        run_http_flow(efmvariants=deployed_techniques,
+                    src_namespace=slot.namespace(flow_test["src_host"]), src_port=src_port,
+                    file_size=file_size,
+                    target_ip=slot.ip(flow_test["dst_host"]), dst_port=dst_port,
+                    duration=set_duration, http_options=http_options)
+
+
+    if queue_mon == None:
+        raise Exception
+    
+    else:
+        time.sleep(1)
+        queue_mon.terminate()
+        hard_kill_ebpf(slot)
+        stop_server(slot, slot.namespace(flow_test["dst_host"]), dst_port)
+        hard_kill_tcpdump(slot)
+        slot_processes = [ebpf_process_pattern(slot), server_process_pattern(slot, dst_port), tcpdump_process_pattern(slot)]
+        readiness.wait_until("Iteration shutdown", lambda: readiness.processes_absent(slot_processes), timeout=NAMESPACE_TIMEOUT)
+
+
+def simulate(flow_tests, iterations, persistent_topology=False):
     """ Actually perform the measurements.
     flow_tests: measurement configurations
     iterations: how often to repeat the measurement
-    host_info: name-ip mapping of the involved end-hosts
+    persistent_topology: start mininet only once and keep it running for all flow_tests and iterations; it is only torn down at the end or on failure
     """
 
+    slot = TestbedSlot(0)
+
+    ### Netem arguments per link of the running topology (None while no topology is running)
+    applied_link_configs = None
+
     try:
 
         for flow_test in flow_tests:
 
-            ### Additionally store the original flow_test description -> flow_test["description"] will be modified during the process for each iteration
-            orig_flow_test_description = flow_test["description"]
             for iteration in range(1,iterations+1):
                 print("Start iteration {}".format(iteration))
-                flow_test["description"] = orig_flow_test_description
 
-                """
-                Basic setup of the testbed with some additional cleaning up of old stuff
-                """
-                remove_virtual_interfaces()
-                time.sleep(1)
-                
-                start_mininet()
+                if applied_link_configs is None:
+                    setup_testbed()
+                    applied_link_configs = {}
+                else:
+                    print("Reuse the running topology")
 
-                remove_access_to_h1_h2_namespace()
-                add_access_to_h1_h2_namespace()
-                time.sleep(1)
+                run_iteration(flow_test, iteration, slot, applied_link_configs)
 
-                for link_config in flow_test["link_configs"]:
-                    print(link_config)
-                    set_static_link_parameters_mininet(link_config["link"], link_config["netem_args"], host=link_config["link"].split("-")[0].strip("["))
+                if not persistent_topology:
+                    teardown_testbed()
+                    applied_link_configs = None
 
+        print(f"Finished all test runs")
 
-                print("Run the following flow: " + flow_test["description"])
+    finally:
+        teardown_testbed()
 
 
-                """
-                Based on the parameters set in the configuration file, determine which value to set in the QUIC EFM client/server
-                """
-                deployed_techniques = 0
-                if flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["delay_paper"] and flow_test["measurement_techniques"]["t_rtpl"] and\
-                    flow_test["measurement_techniques"]["q_square"] and flow_test["measurement_techniques"]["r_reflection_square"] and\
-                    flow_test["measurement_techniques"]["l_loss_event"] and\
-                    flow_test["measurement_techniques"]["vec"] and flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["delay_draft"]:
+def simulate_slots(flow_tests, iterations, slots):
+    """ Perform the measurements in parallel on isolated experiment slots of one persistent topology.
+    A scheduler hands the (flow_test, iteration) pairs to the next free slot.
+    slots: number of experiment slots (each slot runs one measurement at a time)
+    """
 
-                    deployed_techniques = EFMVariants.ALL_MEASUREMENTS
+    pending = queue.Queue()
+    for flow_test in flow_tests:
+        for iteration in range(1,iterations+1):
+            pending.put((flow_test, iteration))
 
-                elif flow_test["measurement_techniques"]["t_rtpl"] and flow_test["measurement_techniques"]["q_square"] and\
-                        flow_test["measurement_techniques"]["r_reflection_square"] and flow_test["measurement_techniques"]["l_loss_event"]:
+    failures = []
 
-                    deployed_techniques = EFMVariants.LOSS_MECHANISMS
+    def run_slot(slot):
+        """
+        Keep the slot busy until no measurement is left
+        """
 
+        applied_link_configs = {}
 
-                    """ These options involving the 'SPIN' prefix have not been tested recently."""
-                else:
-                    if flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["delay_paper"] and flow_test["measurement_techniques"]["t_rtpl"]:
-                        deployed_techniques = EFMVariants.SPIN_DELAY_PAPER_T_BIT_RTPL
-                    elif flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["q_square"] and flow_test["measurement_techniques"]["r_reflection_square"]:
-                        deployed_techniques = EFMVariants.SPIN_Q_BIT_SQUARE_R_BIT_REFLECTION_SQUARE
-                    elif flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["q_square"] and flow_test["measurement_techniques"]["l_loss_event"]:
-                        deployed_techniques = EFMVariants.SPIN_Q_BIT_SQUARE_L_BIT_LOSS_EVENT
-                    elif flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["vec"]:
-                        deployed_techniques = EFMVariants.SPIN_VEC
-                    elif flow_test["measurement_techniques"]["spin"] and flow_test["measurement_techniques"]["delay_draft"] and flow_test["measurement_techniques"]["t_rtpl"]:
-                        deployed_techniques = EFMVariants.SPIN_DELAY_DRAFT_T_BIT_RTPL
+        while not failures:
+            try:
+                flow_test, iteration = pending.get_nowait()
+            except queue.Empty:
+                return
 
-                flow_test["description"] = flow_test["description"] + "-{}".format(iteration) + "+-+{}+-+".format(deployed_techniques)
+            print("Slot {}: start iteration {} of {}".format(slot.index, iteration, flow_test["description"]))
+            try:
+                run_iteration(flow_test, iteration, slot, applied_link_configs)
+            except Exception as e:
+                print("Slot {}: iteration {} of {} failed".format(slot.index, iteration, flow_test["description"]))
+                failures.append(e)
 
+    try:
 
-                """
-                Depending on the traffic setting, perform slightly different configurations
-                """
-                queue_mon = None
-                if "synthetic_traffic" in flow_test.keys():
+        testbed_slots = setup_testbed(slots)
 
-                    queue_mon = run_queue_monitor(queue_type="NETEM", output_file_path=os.path.join(results_path,"raw",flow_test["description"] + "queue_monitor.txt"), host="s2")
+        workers = [threading.Thread(target=run_slot, args=(slot,)) for slot in testbed_slots]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
 
-                    start_server(efmvariants=deployed_techniques, server_host=flow_test["dst_host"], server_port=flow_test["dst_port"],
-                                packets=flow_test["synthetic_traffic"]["packets"])
+        if failures:
+            raise failures[0]
 
-                    time.sleep(1)
+        print(f"Finished all test runs")
 
-                    startPcap(os.path.join(results_path,"raw"),flow_test["description"])
-                    time.sleep(1)
-                    run_flow(efmvariants=deployed_techniques,
-                            src_host=flow_test["src_host"], src_port=flow_test["src_port"],
-                            packets=flow_test["synthetic_traffic"]["packets"],
-                            target_ip=host_info["h2"]["ip"],dst_port=flow_test["dst_port"])
+    finally:
+        teardown_testbed(slots)
 
 
-                if "http_traffic" in flow_test.keys():
-     
-                    file_size = flow_test["http_traffic"]["file_size"]
 
-                    set_duration = -1
-                    if file_size in ["50k", "500k"]:
-                        set_duration = 120
-                    elif file_size in ["2M", "10M"]:
-                        set_duration = 120
-                    elif file_size in ["200M"]:
-                        set_duration = 120
-                    else:
-                        set_duration = 200
+def run_emulated_iteration(flow_test, iteration):
+    """ Perform one iteration of a flow_test with the userspace emulator instead of the testbed.
+    The server runs on localhost, the client connects to the relay of the emulator which forwards to the server.
+    """
 
-                    print("Start H3 download with a file size of ", file_size)
+    slot = TestbedSlot(0)
 
-                    queue_mon = run_queue_monitor(queue_type="NETEM", output_file_path=os.path.join(results_path,"raw",flow_test["description"] + "queue_monitor.txt"), host="s2")
+    src_port = int(flow_test["src_port"])
+    dst_port = int(flow_test["dst_port"])
+    server_port = dst_port + EMULATOR_SERVER_PORT_OFFSET
 
-                    start_h3_server(efmvariants=deployed_techniques, server_host=flow_test["dst_host"], server_port=flow_test["dst_port"], duration=set_duration)
+    print("Run the following flow: " + flow_test["description"])
 
-                    time.sleep(1)
+    deployed_techniques = deployed_techniques_of(flow_test)
 
-                    startPcap(os.path.join(results_path,"raw"),flow_test["description"])
-                    time.sleep(1)
-                    run_http_flow(efmvariants=deployed_techniques,
-                                src_host=flow_test["src_host"], src_port=flow_test["src_port"],
-                                file_size=file_size,
-                                target_ip=host_info["h2"]["ip"], dst_port=flow_test["dst_port"])
+    description = prefix_index.format_prefix(flow_test["description"], iteration, deployed_techniques) + prefix_index.SEPARATOR
+    raw_file_path = os.path.join(results_path,"raw")
 
+    write_slot_info(raw_file_path, description, slot)
 
-                if queue_mon == None:
-                    raise Exception
-                
-                else:
-                    time.sleep(1)
-                    queue_mon.terminate()
-                    hard_kill_ebpf()
-                    hard_kill_server()
-                    
-                print("Exit Mininet")
-                mininet_proc.communicate(input=b'exit')
+    if "synthetic_traffic" in flow_test.keys():
 
-                remove_access_to_h1_h2_namespace()
-                remove_virtual_interfaces()
+        if int(flow_test["synthetic_traffic"].get("connections", 1)) > 1:
+            raise Exception("The userspace emulator relays a single connection, {} asks for {}".format(flow_test["description"], flow_test["synthetic_traffic"]["connections"]))
 
-        print(f"Finished all test runs")
+        packets = flow_test["synthetic_traffic"]["packets"]
+        server_command = ["python3", "../traffic/server.py", "--packets", str(packets), "--efmvariants", str(deployed_techniques), "--serverport", str(server_port), "--keypath", "../traffic/ssl_key.pem", "--certpath", "../traffic/ssl_cert.pem"]
+        if flow_test["synthetic_traffic"].get("batched_server", False):
+            server_command.append("--batched")
+        client_command = ["python3", "../traffic/client.py", "--target", "127.0.0.1", "--packets", str(packets), "--srcport", str(src_port), "--dstport", str(dst_port), "--efmvariants", str(deployed_techniques)] + client_arguments(client_options_of(flow_test["synthetic_traffic"]))
+
+    elif "http_traffic" in flow_test.keys():
+
+        file_size = flow_test["http_traffic"]["file_size"]
+        http_options = http_options_of(flow_test["http_traffic"])
+
+        if int(http_options.get("connections", 1)) > 1:
+            raise Exception("The userspace emulator relays a single connection, {} asks for {}".format(flow_test["description"], http_options["connections"]))
+
+        duration = http_duration_of(file_size, http_options)
+        completion_path = COMPLETION_PATH_FORMAT.format(namespace="emulator", port=src_port)
+        remove_completion_file(completion_path)
+
+        server_command = ["timeout", str(duration + 5), "python3", "../traffic/http3_server.py", "--efmvariants", str(deployed_techniques), "--host", "127.0.0.1", "--port", str(server_port), "-k", "../traffic/ssl_key.pem", "-c", "../traffic/ssl_cert.pem"]
+        client_command = ["timeout", str(duration), "python3", "../traffic/http3_client.py", "-k", "--streaming", "--efmvariants", str(deployed_techniques), "--srcport", str(src_port), "--completion-file", completion_path] + client_arguments(http_options) + ["https://127.0.0.1:{}/{}.file".format(dst_port, file_size)]
+
+    else:
+        raise Exception("flow_test {} has neither synthetic_traffic nor http_traffic".format(flow_test["description"]))
+
+    emulator = userspace_emulator.UserspaceEmulator(flow_test["link_configs"], raw_file_path, description, client_ip=slot.ip("h1"), server_ip=slot.ip("h2"),
+                                                    client_port=src_port, server_port=dst_port, capture_mode=args.capture_mode)
+
+    print(" ".join(server_command))
+    emulated_server_proc = subprocess.Popen(server_command)
+
+    try:
+        readiness.wait_until("Server", lambda: readiness.local_udp_port_bound(server_port), timeout=SERVER_TIMEOUT, poll_interval=0.05)
+
+        print(" ".join(client_command))
+        returncode = asyncio.run(userspace_emulator.relay_flow(emulator, relay_port=dst_port, server_port=server_port, client_command=client_command))
+
+        if "http_traffic" in flow_test.keys():
+            http_completion_of(completion_path, returncode, duration)
 
     finally:
-        remove_access_to_h1_h2_namespace()
-        remove_virtual_interfaces()
+        emulated_server_proc.terminate()
+        emulated_server_proc.wait()
 
 
+def simulate_emulated(flow_tests, iterations):
+    """ Perform the measurements with the userspace emulator (no mininet, root, tc or eBPF required).
+    """
 
-for f in config["experiment"]["flow_tests"]:
-    
-    simulate([f], config["experiment"]["iterations"], config["hosts"])
\ No newline at end of file
+    for flow_test in flow_tests:
+        for iteration in range(1,iterations+1):
+            print("Start iteration {}".format(iteration))
+            run_emulated_iteration(flow_test, iteration)
+
+    print(f"Finished all test runs")
+
+
+
+if args.emulator:
+
+    simulate_emulated(config["experiment"]["flow_tests"], config["experiment"]["iterations"])
+
+elif args.slots > 1:
+
+    simulate_slots(config["experiment"]["flow_tests"], config["experiment"]["iterations"], args.slots)
+
+elif args.persistent_topology:
+
+    simulate(config["experiment"]["flow_tests"], config["experiment"]["iterations"], persistent_topology=True)
+
+else:
+
+    for f in config["experiment"]["flow_tests"]:
+        
+        simulate([f], config["experiment"]["iterations"])
@@ -0,0 +1,561 @@
+"""
+    EFM Evaluation Framework
+    Copyright (c) 2021 
+
+	Author: Ike Kunze
+	E-mail: kunze@comsys.rwth-aachen.de
+"""
+
+"""
+This file generates synthetic EFM traces for the loss scenarios of a configuration without sending any real traffic.
+
+For every flow_test with synthetic_traffic, the datagram client/server pair is modelled packet by packet with NumPy:
+    - the client sends packets every PACKET_INTERVAL_NS (or as configured by the rate/bitrate/burst of synthetic_traffic), the server echoes every packet it receives
+    - every link applies the netem_args of the link_configs (delay with uniform jitter, random loss, loss gemodel)
+    - both endpoints set the spin bit, the Q-Bit (square period of 64), the R-Bit (reflection of the received Q-Bit blocks), the T-Bit (generation and reflection trains in spin periods) and the L-Bit (one mark per detected loss)
+The observers on s2-eth1 (client-server) and s2-eth2 (server-client) are replayed with the logic of go_analysis/am-pcap-analyzer.go and the groundtruth of s3-eth1 with the logic of go_analysis/analyse_queueMonitor.go.
+The results are written to <path>/preprocessed as the .npy files of the Go tools (--outputFormat npy), so that perform_analysis.py --path <path> --outputFormat npy analyzes them like real measurements.
+
+Everything per packet is vectorized. Only the observers and the spin/T-Bit/R-Bit state machines step through runs of packets (one step per square period or spin period).
+"""
+import concurrent.futures
+import json
+import os
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+
+import analyzer_loss
+import custom_mininet_topo
+import netlink_backend
+import prefix_index
+
+
+### Measurement techniques field of the prefixes (EFMVariants.LOSS_MECHANISMS: T, Q, R and L)
+LOSS_MECHANISMS = 43
+
+### Default sending interval and datagram payload size of traffic/client.py
+PACKET_INTERVAL_NS = 1200000
+PAYLOAD_BYTES = 1227
+
+### Square period and reordering threshold of the Q-Bit and R-Bit (see am-pcap-analyzer.go)
+SQUARE_PERIOD = 64
+SQUARE_THRESHOLD = 8
+
+### Links in the order a packet passes them. The observers capture after the first link of each direction, the groundtruth is taken on the first link of the server-client direction.
+CLIENT_TO_SERVER_LINKS = ["s1-eth2", "s2-eth2", "s3-eth2"]
+SERVER_TO_CLIENT_LINKS = ["s3-eth1", "s2-eth1", "s1-eth1"]
+OBSERVER_POSITION = 1
+
+NEVER = np.iinfo(np.int64).max
+
+### Record layouts of the .npy files written by the Go tools
+FLOW_FIELDS = [("src_ip", "<u4"), ("dst_ip", "<u4"), ("src_port", "<u2"), ("dst_port", "<u2")]
+LBIT_DTYPE = np.dtype(FLOW_FIELDS + [("timestamp_ns", "<i8"), ("loss_event", "u1")])
+TBIT_DTYPE = np.dtype(FLOW_FIELDS + [("start_ns", "<i8"), ("end_ns", "<i8"), ("generation", "<i8"), ("reflection", "<i8")])
+SQUARE_BIT_DTYPE = np.dtype(FLOW_FIELDS + [("start_ns", "<i8"), ("end_ns", "<i8"), ("phase", "<i8"), ("count", "<i8"), ("nominal", "<i8"), ("x_value", "<i8")])
+GROUNDTRUTH_LOSS_DTYPE = np.dtype([("timestamp_ns", "<i8"), ("loss", "<i8")])
+GROUNDTRUTH_OVERALL_DTYPE = np.dtype([("kind", "u1"), ("timestamp_ns", "<i8"), ("value", "<i8")])
+
+
+"""
+Network model
+"""
+
+def gilbert_elliott_loss(rng, count, p, r, bad_loss=1.0, good_loss=0.0):
+    """
+    Loss decisions of netem's Gilbert-Elliott model for count consecutive packets, starting in the good state.
+    The state at arrival decides the loss, then the model transitions, so the good and bad runs are geometrically distributed with p and r.
+    """
+
+    if count == 0 or p == 0:
+        bad = np.zeros(count, dtype=bool)
+    else:
+        run_lengths = []
+        total = 0
+        mean_cycle = 1 / p + (1 / r if r > 0 else count)
+        while total < count:
+            cycles = int((count - total) / mean_cycle) + 16
+            runs = np.empty(2 * cycles, dtype=np.int64)
+            runs[0::2] = rng.geometric(p, cycles)
+            runs[1::2] = rng.geometric(r, cycles) if r > 0 else count
+            run_lengths.append(runs)
+            total += int(runs.sum())
+
+        run_lengths = np.concatenate(run_lengths)
+        bad = np.repeat(np.arange(len(run_lengths)) % 2 == 1, run_lengths)[:count]
+
+    if bad_loss == 1.0 and good_loss == 0.0:
+        return bad
+
+    return rng.random(count) < np.where(bad, bad_loss, good_loss)
+
+
+def netem_loss(rng, parameters, count):
+    """
+    Loss decisions of a netem qdisc with the given parameters (see netlink_backend.parse_netem_arguments) for count consecutive packets.
+    """
+
+    if "gemodel" in parameters:
+        gemodel = [value / 100 for value in parameters["gemodel"]]
+        ### gemodel p [r [1-h [1-k]]], defaults as in tc: r = 1 - p, 1-h = 100%, 1-k = 0%
+        defaults = [None, 1 - gemodel[0], 1.0, 0.0]
+        return gilbert_elliott_loss(rng, count, *(gemodel + defaults[len(gemodel):]))
+
+    loss = parameters.get("loss", 0) / 100
+    if loss == 0:
+        return np.zeros(count, dtype=bool)
+
+    return rng.random(count) < loss
+
+
+def netem_delay_ns(rng, parameters, count):
+    """
+    Delay of a netem qdisc in nanoseconds, drawn uniformly from [delay - jitter, delay + jitter].
+    """
+
+    delay_ns = parameters.get("delay", 0) * 1000
+    jitter_ns = parameters.get("jitter", 0) * 1000
+    if jitter_ns == 0:
+        return np.full(count, delay_ns, dtype=np.int64)
+
+    return np.maximum(rng.integers(delay_ns - jitter_ns, delay_ns + jitter_ns + 1, count), 0)
+
+
+def traverse_links(rng, link_parameters, links, send_ns):
+    """
+    Pass the packets sent at send_ns through the links.
+    Returns for every link and for the receiver the packets that arrive there (mask) and their arrival times.
+    """
+
+    alive = np.ones(len(send_ns), dtype=bool)
+    arrival_ns = send_ns.copy()
+
+    points = []
+    for link in links:
+        points.append((alive.copy(), arrival_ns.copy()))
+
+        parameters = link_parameters.get(link)
+        if parameters is None:
+            continue
+
+        arriving = np.flatnonzero(alive)
+        alive[arriving[netem_loss(rng, parameters, len(arriving))]] = False
+        arrival_ns += netem_delay_ns(rng, parameters, len(send_ns))
+
+    points.append((alive, arrival_ns))
+    return points
+
+
+"""
+Endpoint model
+"""
+
+def spin_period_starts(send_ns, round_trip_ns):
+    """
+    Indices of the client packets that start a new spin period.
+    The server reflects the spin bit, so the client flips it once the first packet of the current period has made the round trip.
+    round_trip_ns: arrival time of the echo of every client packet at the client (NEVER if it was lost)
+    """
+
+    first_echo_ns = np.minimum.accumulate(round_trip_ns[::-1])[::-1]
+
+    starts = [0]
+    while True:
+        flip_ns = first_echo_ns[starts[-1]]
+        if flip_ns == NEVER:
+            break
+        start = int(np.searchsorted(send_ns, flip_ns, side="right"))
+        if start >= len(send_ns):
+            break
+        starts.append(start)
+
+    return np.array(starts, dtype=np.int64)
+
+
+def square_bits(count):
+
+    return ((np.arange(count) // SQUARE_PERIOD) % 2).astype(np.int8)
+
+
+def loss_event_bits(send_ns, detection_ns):
+    """
+    L-Bit of the packets sent at send_ns: every loss detected at detection_ns marks one of the following packets.
+    The number of marks up to packet i is min over j <= i of (detected losses at packet j + i - j), capped at i + 1.
+    """
+
+    detected = np.searchsorted(np.sort(detection_ns), send_ns, side="right")
+    index = np.arange(len(send_ns))
+    marks = index + np.minimum(np.minimum.accumulate(detected - index), 1)
+
+    return np.diff(marks, prepend=0).astype(np.int8)
+
+
+def reflection_square_bits(send_ns, received_ns, received_q):
+    """
+    R-Bit of the packets sent at send_ns by an endpoint that receives the Q-Bits received_q at received_ns (in arrival order).
+    Before the first received Q-Bit block is complete, the R-Bit is 0. Afterwards, every reflection block alternates the value and is as long as the latest complete block received when it starts.
+    """
+
+    r_bits = np.zeros(len(send_ns), dtype=np.int8)
+
+    changes = np.flatnonzero(received_q[1:] != received_q[:-1]) + 1
+    if len(changes) == 0:
+        return r_bits
+
+    ### A block is complete once the first packet of the next block arrives
+    block_counts = np.diff(np.concatenate(([0], changes)))
+    completion_ns = received_ns[changes]
+
+    position = int(np.searchsorted(send_ns, completion_ns[0], side="left"))
+    value = 1
+    while position < len(send_ns):
+        latest_block = int(np.searchsorted(completion_ns, send_ns[position], side="right")) - 1
+        length = int(block_counts[latest_block])
+        r_bits[position:position + length] = value
+        position += length
+        value ^= 1
+
+    return r_bits
+
+
+def round_trip_loss_bits(period_starts, count, round_trip_delivered):
+    """
+    T-Bit of the client packets.
+    The client marks all packets of a spin period (generation), the server reflects every marked packet it receives, the client marks as many packets as marked echoes came back starting two spin periods later (reflection), which the server reflects again.
+    The next generation starts after one spin period without marks.
+    """
+
+    t_bits = np.zeros(count, dtype=np.int8)
+    period_ends = np.append(period_starts[1:], count)
+
+    period = 0
+    while period < len(period_starts):
+
+        generation_start, generation_end = period_starts[period], period_ends[period]
+        t_bits[generation_start:generation_end] = 1
+        reflected = int(np.count_nonzero(round_trip_delivered[generation_start:generation_end]))
+
+        if period + 2 >= len(period_starts):
+            break
+
+        reflection_start = period_starts[period + 2]
+        reflection_end = min(reflection_start + reflected, count)
+        t_bits[reflection_start:reflection_end] = 1
+
+        last_period = period + 2 if reflected == 0 else int(np.searchsorted(period_starts, reflection_end - 1, side="right")) - 1
+        period = last_period + 2
+
+    return t_bits
+
+
+"""
+Observer logic (see am-pcap-analyzer.go), stepping through runs of equal bit values
+"""
+
+def observe_square_bit(timestamps_ns, values, reflection=False):
+    """
+    Q-Bit (reflection=False) or R-Bit (reflection=True) observer. Returns the columns start_ns, end_ns, phase, count.
+    The R-Bit observer does not report the first phase (startup).
+    """
+
+    measurements = {"start_ns": [], "end_ns": [], "phase": [], "count": []}
+    if len(values) == 0:
+        return measurements
+
+    run_starts = np.concatenate(([0], np.flatnonzero(values[1:] != values[:-1]) + 1))
+    run_lengths = np.diff(np.append(run_starts, len(values)))
+    run_values = values[run_starts]
+
+    value = int(values[0])
+    count = int(run_lengths[0])
+    threshold = 0
+    start_ns = int(timestamps_ns[0])
+    startup = reflection
+
+    for run_start, run_length, run_value in zip(run_starts[1:].tolist(), run_lengths[1:].tolist(), run_values[1:].tolist()):
+
+        if run_value == value:
+            count += run_length
+            continue
+
+        needed = SQUARE_THRESHOLD - threshold
+        if run_length < needed:
+            threshold += run_length
+            continue
+
+        switch_ns = int(timestamps_ns[run_start + needed - 1])
+        if not startup:
+            measurements["start_ns"].append(start_ns)
+            measurements["end_ns"].append(switch_ns)
+            measurements["phase"].append(value)
+            measurements["count"].append(count)
+        startup = False
+
+        value = run_value
+        start_ns = switch_ns
+        count = SQUARE_THRESHOLD + run_length - needed
+        threshold = 0
+
+    return measurements
+
+
+def observe_round_trip_loss_bit(timestamps_ns, spin, t_bits):
+    """
+    T-Bit observer. Returns the columns start_ns, end_ns, generation, reflection.
+    A train ends at the first spin flip after a spin period without marks; a reflection train that is not longer than its generation train completes a measurement.
+    """
+
+    measurements = {"start_ns": [], "end_ns": [], "generation": [], "reflection": []}
+    if len(spin) == 0:
+        return measurements
+
+    period_starts = np.concatenate(([0], np.flatnonzero(spin[1:] != spin[:-1]) + 1))
+    period_marks = np.add.reduceat(t_bits.astype(np.int64), period_starts)
+
+    current = int(period_marks[0])
+    cycle_empty = current == 0
+    previous = 0
+    in_reflection = False
+    start_ns = int(timestamps_ns[0])
+
+    for period_start, marks in zip(period_starts[1:].tolist(), period_marks[1:].tolist()):
+
+        if cycle_empty and current > 0:
+            if in_reflection:
+                if current <= previous:
+                    end_ns = int(timestamps_ns[period_start])
+                    measurements["start_ns"].append(start_ns)
+                    measurements["end_ns"].append(end_ns)
+                    measurements["generation"].append(previous)
+                    measurements["reflection"].append(current)
+                    start_ns = end_ns
+                else:
+                    ### Resynchronize: the train becomes the next generation
+                    in_reflection = False
+            previous = current
+            current = 0
+            in_reflection = not in_reflection
+
+        cycle_empty = marks == 0
+        current += marks
+
+    return measurements
+
+
+"""
+Measurement synthesis
+"""
+
+def _records(dtype, flow, columns, rows):
+
+    records = np.zeros(rows, dtype=dtype)
+    for name, value in list(flow.items()) + list(columns.items()):
+        records[name] = value
+
+    return records
+
+
+def client_send_times(start_ns, packets, synthetic_traffic={}):
+    """
+    Send times of the client packets paced like traffic/client.py: bursts of burst datagrams, one burst every burst packet intervals
+    """
+
+    packet_interval_ns = PACKET_INTERVAL_NS
+    if "bitrate" in synthetic_traffic:
+        packet_interval_ns = int(1e9 * PAYLOAD_BYTES * 8 / float(synthetic_traffic["bitrate"]))
+    elif "rate" in synthetic_traffic:
+        packet_interval_ns = int(1e9 / float(synthetic_traffic["rate"]))
+
+    burst = int(synthetic_traffic.get("burst", 1))
+    return start_ns + (np.arange(packets, dtype=np.int64) // burst) * burst * packet_interval_ns
+
+
+def synthesize_measurement(rng, link_configs, packets, start_ns, client_ip, server_ip, client_port, server_port, synthetic_traffic={}):
+    """
+    Synthesize one measurement of the datagram client/server pair.
+    synthetic_traffic: optional pacing of the client (rate, bitrate, burst), see client_send_times
+    Returns a dictionary artifact (e.g. tbit, groundtruth_overall_packets_and_loss_count) -> records in the layout of the Go tools.
+    """
+
+    link_parameters = {link_config["link"]: netlink_backend.parse_netem_arguments(link_config["netem_args"]) for link_config in link_configs}
+    base_round_trip_ns = sum(parameters.get("delay", 0) * 1000 for parameters in link_parameters.values())
+
+    ### Client to server
+    client_send_ns = client_send_times(start_ns, packets, synthetic_traffic)
+    client_points = traverse_links(rng, link_parameters, CLIENT_TO_SERVER_LINKS, client_send_ns)
+    client_delivered, client_arrival_ns = client_points[-1]
+
+    ### The server echoes every packet it receives, in arrival order
+    received = np.flatnonzero(client_delivered)
+    arrival_order = np.argsort(client_arrival_ns[received], kind="stable")
+    echoed_client_packet = received[arrival_order]
+    server_send_ns = client_arrival_ns[echoed_client_packet]
+
+    server_points = traverse_links(rng, link_parameters, SERVER_TO_CLIENT_LINKS, server_send_ns)
+    server_delivered, server_arrival_ns = server_points[-1]
+
+    round_trip_ns = np.full(packets, NEVER, dtype=np.int64)
+    round_trip_ns[echoed_client_packet[server_delivered]] = server_arrival_ns[server_delivered]
+
+    ### Client bits
+    period_starts = spin_period_starts(client_send_ns, round_trip_ns)
+    client_spin = np.repeat((np.arange(len(period_starts)) % 2).astype(np.int8), np.diff(np.append(period_starts, packets)))
+    client_q = square_bits(packets)
+    client_t = round_trip_loss_bits(period_starts, packets, round_trip_ns != NEVER)
+    client_l = loss_event_bits(client_send_ns, client_send_ns[~client_delivered] + base_round_trip_ns)
+
+    server_received_q = client_q[echoed_client_packet]
+    client_received = np.flatnonzero(server_delivered)
+    client_received = client_received[np.argsort(server_arrival_ns[client_received], kind="stable")]
+
+    ### Server bits: spin and T-Bit are reflected, Q-Bit, R-Bit and L-Bit follow the server's own packets
+    server_spin = client_spin[echoed_client_packet]
+    server_q = square_bits(len(server_send_ns))
+    server_t = client_t[echoed_client_packet]
+    server_l = loss_event_bits(server_send_ns, server_send_ns[~server_delivered] + base_round_trip_ns)
+    server_r = reflection_square_bits(server_send_ns, server_send_ns, server_received_q)
+    client_r = reflection_square_bits(client_send_ns, server_arrival_ns[client_received], server_q[client_received])
+
+    client_ip_value = int.from_bytes(bytes(int(part) for part in client_ip.split(".")), "big")
+    server_ip_value = int.from_bytes(bytes(int(part) for part in server_ip.split(".")), "big")
+    flows = [({"src_ip": client_ip_value, "dst_ip": server_ip_value, "src_port": client_port, "dst_port": server_port},
+              client_points[OBSERVER_POSITION], {"spin": client_spin, "q": client_q, "r": client_r, "t": client_t, "l": client_l}),
+             ({"src_ip": server_ip_value, "dst_ip": client_ip_value, "src_port": server_port, "dst_port": client_port},
+              server_points[OBSERVER_POSITION], {"spin": server_spin, "q": server_q, "r": server_r, "t": server_t, "l": server_l})]
+
+    artifacts = {"lbit": [], "tbit": [], "qbit": [], "rbit": []}
+    for flow, (observed, observed_ns), bits in flows:
+
+        rows = np.flatnonzero(observed)
+        rows = rows[np.argsort(observed_ns[rows], kind="stable")]
+        timestamps_ns = observed_ns[rows]
+        observed_bits = {name: values[rows] for name, values in bits.items()}
+
+        artifacts["lbit"].append(_records(LBIT_DTYPE, flow, {"timestamp_ns": timestamps_ns, "loss_event": observed_bits["l"]}, len(rows)))
+
+        tbit = observe_round_trip_loss_bit(timestamps_ns, observed_bits["spin"], observed_bits["t"])
+        artifacts["tbit"].append(_records(TBIT_DTYPE, flow, tbit, len(tbit["end_ns"])))
+
+        for artifact, values, reflection in [("qbit", observed_bits["q"], False), ("rbit", observed_bits["r"], True)]:
+            square_bit = observe_square_bit(timestamps_ns, values, reflection=reflection)
+            square_bit.update({"nominal": SQUARE_PERIOD, "x_value": 0})
+            artifacts[artifact].append(_records(SQUARE_BIT_DTYPE, flow, square_bit, len(square_bit["end_ns"])))
+
+    artifacts = {artifact: np.concatenate(records) for artifact, records in artifacts.items()}
+
+    ### Groundtruth: the queue monitor reports every enqueue on s3-eth1 with the drops so far, the capture on s3-eth2 counts the server packets
+    for segment in ["clientswitch", "switchclient", "serverswitch", "switchserver"]:
+        artifacts["groundtruth_loss_" + segment] = np.zeros(0, dtype=GROUNDTRUTH_LOSS_DTYPE)
+
+    monitored_link = SERVER_TO_CLIENT_LINKS[0]
+    overall = _records(GROUNDTRUTH_OVERALL_DTYPE, {}, {"kind": analyzer_loss.GROUNDTRUTH_KIND_OVERALLCOUNT, "timestamp_ns": server_send_ns,
+                                                       "value": np.arange(1, len(server_send_ns) + 1)}, len(server_send_ns))
+
+    if monitored_link in link_parameters:
+        dropped = server_points[0][0] & ~server_points[1][0]
+        switchserver = _records(GROUNDTRUTH_LOSS_DTYPE, {}, {"timestamp_ns": server_send_ns, "loss": np.cumsum(dropped)}, len(server_send_ns))
+        losscount = _records(GROUNDTRUTH_OVERALL_DTYPE, {}, {"kind": analyzer_loss.GROUNDTRUTH_KIND_LOSSCOUNT, "timestamp_ns": switchserver["timestamp_ns"],
+                                                             "value": switchserver["loss"]}, len(switchserver))
+        artifacts["groundtruth_loss_switchserver"] = switchserver
+        overall = np.concatenate((losscount, overall))
+
+    artifacts["groundtruth_overall_packets_and_loss_count"] = overall
+
+    return artifacts
+
+
+def generate_measurement(preprocessed_folder, flow_test, iteration, entropy):
+    """
+    Synthesize one iteration of a flow_test and write its preprocessed files. Used as the unit of work of the worker processes.
+    entropy: seed of the measurement (the same entropy always yields the same files apart from the timestamps)
+    """
+
+    timer = time.perf_counter()
+
+    prefix = prefix_index.format_prefix(flow_test["description"], iteration, LOSS_MECHANISMS)
+    packets = int(flow_test["synthetic_traffic"]["packets"])
+
+    artifacts = synthesize_measurement(np.random.default_rng(entropy), flow_test["link_configs"], packets, time.time_ns(),
+                                       client_ip=custom_mininet_topo.slot_ip("h1"), server_ip=custom_mininet_topo.slot_ip("h2"),
+                                       client_port=int(flow_test["src_port"]), server_port=int(flow_test["dst_port"]), synthetic_traffic=flow_test["synthetic_traffic"])
+
+    for artifact, records in artifacts.items():
+        np.save(os.path.join(preprocessed_folder, prefix + prefix_index.SEPARATOR + artifact + ".npy"), records)
+
+    return prefix, packets, time.perf_counter() - timer
+
+
+if __name__ == "__main__":
+
+    possibleConfigs = sorted(filename[:-len(".json")] for filename in os.listdir("../configurations/") if filename.endswith(".json"))
+
+    parser = ArgumentParser(description="Synthetic EFM traces for the loss scenarios of a configuration")
+    parser.add_argument('--config', '-c',
+                        dest="config",
+                        action="store",
+                        help="Which experimental config to synthesize (only flow_tests with synthetic_traffic)",
+                        choices=possibleConfigs,
+                        required=True)
+    parser.add_argument('--path', '-p',
+                        dest="path",
+                        action="store",
+                        help="Results folder to write to (raw/ stays empty, the traces are written to preprocessed/). Default: data/{config}/synthetic")
+    parser.add_argument('--iterations', '-i',
+                        dest="iterations",
+                        action="store",
+                        type=int,
+                        help="Number of iterations per flow_test instead of the one of the configuration")
+    parser.add_argument('--seed', '-s',
+                        dest="seed",
+                        action="store",
+                        type=int,
+                        default=0,
+                        help="Seed of the loss and jitter decisions")
+    parser.add_argument('--jobs', '-j',
+                        dest="jobs",
+                        action="store",
+                        type=int,
+                        default=1,
+                        help="Number of worker processes among which the measurements are spread")
+    args = parser.parse_args()
+
+    with open("../configurations/{}.json".format(args.config)) as jsonfile:
+        config = json.load(jsonfile)
+
+    results_path = args.path if args.path is not None else os.path.join("data", args.config, "synthetic")
+    preprocessed_folder = os.path.join(results_path, "preprocessed")
+    for folder in [results_path, os.path.join(results_path, "raw"), preprocessed_folder, os.path.join(results_path, "plot_preprocessed")]:
+        os.makedirs(folder, exist_ok=True)
+
+    iterations = args.iterations if args.iterations is not None else config["experiment"]["iterations"]
+
+    work = []
+    for flow_index, flow_test in enumerate(config["experiment"]["flow_tests"]):
+        if "synthetic_traffic" not in flow_test.keys():
+            print("Skip {}: only synthetic_traffic can be synthesized".format(flow_test["description"]))
+            continue
+        if int(flow_test["synthetic_traffic"].get("connections", 1)) > 1:
+            print("Skip {}: only single-connection flow_tests can be synthesized".format(flow_test["description"]))
+            continue
+        for iteration in range(1, iterations + 1):
+            work.append((flow_test, iteration, [args.seed, flow_index, iteration]))
+
+    timer = time.perf_counter()
+    overall_packets = 0
+
+    if args.jobs > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            results = [executor.submit(generate_measurement, preprocessed_folder, flow_test, iteration, entropy) for flow_test, iteration, entropy in work]
+            results = [result.result() for result in results]
+    else:
+        results = [generate_measurement(preprocessed_folder, flow_test, iteration, entropy) for flow_test, iteration, entropy in work]
+
+    for prefix, packets, elapsed in results:
+        print("Synthesized {} ({} packets) in {:.3f} seconds".format(prefix, packets, elapsed))
+        overall_packets += packets
+
+    elapsed = time.perf_counter() - timer
+    print("Synthesized {} measurements with {} client packets in {:.3f} seconds ({:.1f} M packets per second)".format(len(results), overall_packets, elapsed, overall_packets / elapsed / 1e6))
+    print("Analyze them with: python3 perform_analysis.py --path {} --outputFormat npy".format(results_path))
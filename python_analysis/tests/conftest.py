@@ -0,0 +1,7 @@
+"""
+The scripts of python_analysis import each other as top-level modules, so the tests do the same.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
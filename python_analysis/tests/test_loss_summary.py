@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+
+import analyzer_loss
+import prefix_index
+import synthetic_traces
+
+
+FLOW_TEST = {"description": "lossrandom-5", "src_port": 10000, "dst_port": 1234,
+             "link_configs": [{"link": "s3-eth1", "netem_args": "delay 10ms loss 5%"}, {"link": "s1-eth2", "netem_args": "delay 10ms"}],
+             "synthetic_traffic": {"packets": 5000}}
+
+
+def duplicate_end_timestamps(path):
+    """
+    Give every third row the end timestamp of the row after it (the latter is the one that counts).
+    """
+
+    records = np.load(path)
+    records["end_ns"][0:-1:3] = records["end_ns"][1::3][:len(records["end_ns"][0:-1:3])]
+    np.save(path, records)
+
+
+def test_summary_matches_timeseries_with_duplicate_timestamps(tmp_path):
+
+    prefix, _, _ = synthetic_traces.generate_measurement(str(tmp_path), FLOW_TEST, 1, entropy=7)
+
+    for artifact in ["tbit", "qbit", "rbit"]:
+        duplicate_end_timestamps(os.path.join(str(tmp_path), prefix + prefix_index.SEPARATOR + artifact + ".npy"))
+
+    ### the duplicates matter: summing all rows would give another T-Bit result
+    tbit_path = os.path.join(str(tmp_path), prefix + prefix_index.SEPARATOR + "tbit.npy")
+    columns = analyzer_loss.load_tbit_columns(tbit_path)
+    serverclient = columns["direction"] == analyzer_loss.DIRECTION_SERVER_CLIENT
+    all_rows = analyzer_loss.compute_loss_ref_gen(int(columns["generation"][serverclient].sum()), int(columns["reflection"][serverclient].sum()))
+
+    summary = analyzer_loss.summarize_prefix(str(tmp_path), prefix)
+    timeseries = analyzer_loss.analyze_prefix_timeseries(str(tmp_path), prefix)
+
+    assert summary["tbit"] != all_rows
+    for observer in ["tbit", "qbit", "rbit", "lbit"]:
+        assert summary[observer] == timeseries[observer], observer
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+import netlink_backend
+
+
+class Completed:
+
+    def __init__(self, returncode, stderr=b""):
+
+        self.returncode = returncode
+        self.stdout = b""
+        self.stderr = stderr
+
+
+@pytest.fixture
+def tc_runs(monkeypatch):
+    """
+    Record the shell commands instead of running them; batches containing "fail" fail on their last line.
+    """
+
+    runs = []
+
+    def run(command, shell, input=None, **kwargs):
+        runs.append((threading.current_thread().name, command, input))
+        if input is not None and b"fail" in input:
+            return Completed(2, "Command failed -:{}".format(input.count(b"\n")).encode())
+        return Completed(0)
+
+    monkeypatch.setattr(netlink_backend.subprocess, "run", run)
+    return runs
+
+
+def test_batch_runs_one_tc_batch_per_namespace(tc_runs):
+
+    backend = netlink_backend.ShellBackend()
+    with backend.batch():
+        backend.delete_qdiscs(None, "s3-eth1")
+        backend.add_prio_netem(None, "s3-eth1", "delay 10ms", "10.0.1.2", 1234)
+        backend.add_netem("mininet_h1", "h1-eth0", "loss 1%")
+
+    assert [command for _, command, _ in tc_runs] == ["sudo tc -batch -", "sudo ip netns exec mininet_h1 tc -batch -"]
+    assert tc_runs[0][2].count(b"\n") == 4
+
+
+def test_batch_error_names_the_failing_operation(tc_runs):
+
+    backend = netlink_backend.ShellBackend()
+    with pytest.raises(netlink_backend.LinkConfigurationError) as error:
+        with backend.batch():
+            backend.add_netem(None, "s1-eth1", "delay 1ms")
+            backend.replace_netem(None, "s2-eth1", "fail")
+
+    assert error.value.operation == "replace qdisc"
+    assert error.value.device == "s2-eth1"
+
+
+def test_batches_of_threads_are_separate(tc_runs):
+
+    backend = netlink_backend.ShellBackend()
+    both_open = threading.Barrier(2)
+    errors = {}
+
+    def configure(device, netem_args):
+        try:
+            with backend.batch():
+                backend.add_netem(None, device, netem_args)
+                both_open.wait()
+        except netlink_backend.LinkConfigurationError as error:
+            errors[threading.current_thread().name] = error
+
+    threads = [threading.Thread(target=configure, args=("s1-eth1", "delay 1ms"), name="slot0"),
+               threading.Thread(target=configure, args=("s1-eth1-1", "fail"), name="slot1")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    batches = {name: batch for name, _, batch in tc_runs}
+    assert batches == {"slot0": b"qdisc add dev s1-eth1 parent root netem delay 1ms\n",
+                       "slot1": b"qdisc add dev s1-eth1-1 parent root netem fail\n"}
+    assert list(errors) == ["slot1"]
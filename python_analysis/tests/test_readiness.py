@@ -0,0 +1,51 @@
+import subprocess
+import sys
+
+import pytest
+
+import readiness
+
+
+def spawn(script):
+
+    return subprocess.Popen([sys.executable, "-c", script], stderr=subprocess.PIPE)
+
+
+def test_marker_among_lines_of_one_write():
+
+    ### Mininet prints several lines at once before the marker
+    process = spawn("import os, time; os.write(2, b'*** Creating network\\n*** Adding hosts\\n*** Starting CLI:\\n'); time.sleep(5)")
+    try:
+        assert readiness.wait_for_output_line("Burst", process.stderr, b"*** Starting CLI:", timeout=3) < 3
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_marker_split_across_writes():
+
+    process = spawn("import os, time; os.write(2, b'listen'); time.sleep(0.2); os.write(2, b'ing on eth0\\n'); time.sleep(5)")
+    try:
+        readiness.wait_for_output_line("Split", process.stderr, b"listening on", timeout=3)
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_exit_before_marker():
+
+    process = spawn("import os; os.write(2, b'something else\\n')")
+    with pytest.raises(readiness.ReadinessTimeout, match="exited"):
+        readiness.wait_for_output_line("Exit", process.stderr, b"listening on", timeout=3)
+    process.wait()
+
+
+def test_timeout_without_marker():
+
+    process = spawn("import time; time.sleep(5)")
+    try:
+        with pytest.raises(readiness.ReadinessTimeout, match="not ready"):
+            readiness.wait_for_output_line("Silent", process.stderr, b"listening on", timeout=0.3)
+    finally:
+        process.kill()
+        process.wait()
@@ -0,0 +1,31 @@
+import numpy as np
+
+import analyzer_loss
+
+
+def observer_columns(epoch_ns, **counters):
+
+    columns = {"direction": np.full(len(epoch_ns), analyzer_loss.DIRECTION_SERVER_CLIENT), "epoch_ns": np.array(epoch_ns, dtype=np.int64)}
+    columns.update({name: np.array(values) for name, values in counters.items()})
+    return columns
+
+
+def test_time_windows_of_interleaved_flows():
+
+    ### Two flows written one after the other: the rows are only sorted per flow, the first row is not the earliest
+    second = 1000000000
+    epoch_ns = [5 * second, 6 * second, 1 * second, 2 * second]
+    tbit = observer_columns(epoch_ns, generation=[10, 10, 10, 10], reflection=[9, 10, 10, 8])
+    qbit = observer_columns(epoch_ns, nominal=[64, 64, 64, 64], count=[60, 64, 64, 62])
+    rbit = observer_columns(epoch_ns, nominal=[64, 64, 64, 64], count=[64, 63, 64, 64])
+    lbit = observer_columns(epoch_ns, drop=[1, 0, 0, 2])
+    groundtruth = {"epoch_ns": np.array([3 * second, 6 * second], dtype=np.int64),
+                   "count_overall_packets": np.array([100, 200]), "count_loss": np.array([1, 3])}
+
+    windows = analyzer_loss.compute_windowed_loss(tbit, qbit, rbit, lbit, groundtruth, analyzer_loss.WINDOW_TIME, second)
+
+    assert windows["window_start"][0] == 1 * second
+    assert len(windows["window_start"]) == 6
+    assert windows["tbit_samples"].sum() == 4
+    assert windows["lbit_lost_#"].tolist() == [0, 2, 0, 0, 1, 0]
+    assert windows["groundtruth_packets_#"].sum() == 200
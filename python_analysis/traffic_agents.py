@@ -0,0 +1,114 @@
+"""
+    EFM Evaluation Framework
+    Copyright (c) 2021 
+
+	Author: Ike Kunze
+	E-mail: kunze@comsys.rwth-aachen.de
+"""
+
+"""
+This file controls the long-lived traffic agents (traffic/traffic_agent.py) used by simulator.py --trafficAgents.
+
+One agent runs in the namespace of every host of every slot for as long as the topology. It keeps aioquic, the certificate chain and the TLS setup loaded,
+so starting the server and running the client of an iteration are requests over a Unix socket instead of new python3 processes.
+"""
+import json
+import os
+import socket
+import subprocess
+
+import readiness
+
+
+AGENT_TIMEOUT = 30
+
+### Unix sockets are not bound to a network namespace, so simulator.py reaches the agents from the root namespace
+SOCKET_PATH_FORMAT = "/tmp/efm_traffic_agent_{namespace}.sock"
+
+
+class TrafficAgentError(Exception):
+    pass
+
+
+class TrafficAgent:
+    """
+    Handle of the agent running in one host namespace
+    """
+
+    def __init__(self, namespace):
+
+        self.namespace = namespace
+        self.socket_path = SOCKET_PATH_FORMAT.format(namespace=namespace)
+        self.process = None
+
+    def start(self):
+        """
+        Launch the agent in its namespace and wait until it accepts commands
+        """
+
+        command = "sudo ip netns exec {} python3 ../traffic/traffic_agent.py --socket {} --keypath ../traffic/ssl_key.pem --certpath ../traffic/ssl_cert.pem".format(self.namespace, self.socket_path)
+        print(command)
+
+        if os.path.lexists(self.socket_path):
+            subprocess.run("sudo rm -f {}".format(self.socket_path), shell=True)
+
+        self.process = subprocess.Popen(command, shell=True)
+        readiness.wait_until("Traffic agent {}".format(self.namespace), lambda: os.path.exists(self.socket_path) or self.process.poll() is not None, timeout=AGENT_TIMEOUT)
+
+        if self.process.poll() is not None:
+            raise TrafficAgentError("Traffic agent {} exited with {}".format(self.namespace, self.process.returncode))
+
+    def request(self, command, **arguments):
+        """
+        Send one command to the agent and wait for its answer (a dictionary). Raises TrafficAgentError if the agent reports an error.
+        """
+
+        arguments["command"] = command
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as control_socket:
+            control_socket.connect(self.socket_path)
+            control_socket.sendall((json.dumps(arguments) + "\n").encode())
+            answer = control_socket.makefile("rb").readline()
+
+        if not answer:
+            raise TrafficAgentError("Traffic agent {} closed the connection during {}".format(self.namespace, command))
+
+        response = json.loads(answer)
+        if response["status"] == "error":
+            raise TrafficAgentError("Traffic agent {} failed to run {}: {}".format(self.namespace, command, response["message"]))
+
+        return response
+
+    def stop(self):
+
+        if self.process is None:
+            return
+
+        try:
+            self.request("shutdown")
+            self.process.wait(timeout=AGENT_TIMEOUT)
+        except (OSError, TrafficAgentError, subprocess.TimeoutExpired) as e:
+            print("Traffic agent {} did not shut down cleanly: {}".format(self.namespace, e))
+            self.process.terminate()
+
+        self.process = None
+
+
+def start_agents(namespaces):
+    """
+    Start one agent per namespace. Returns a dictionary namespace -> TrafficAgent.
+    """
+
+    agents = {}
+    for namespace in namespaces:
+        agents[namespace] = TrafficAgent(namespace)
+        agents[namespace].start()
+
+    return agents
+
+
+def stop_agents(agents):
+
+    for agent in agents.values():
+        agent.stop()
+    agents.clear()
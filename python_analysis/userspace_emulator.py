@@ -0,0 +1,340 @@
+"""
+    EFM Evaluation Framework
+    Copyright (c) 2021 
+
+	Author: Ike Kunze
+	E-mail: kunze@comsys.rwth-aachen.de
+"""
+
+"""
+This file provides the userspace network emulator of simulator.py (--emulator), a stand-in for mininet, tc netem and the eBPF queue monitor that runs without root.
+
+An asyncio UDP relay on localhost sits between the client and the server. Every datagram walks the egress qdiscs and observer points of the
+    h1 --- s1 --- s2 --- s3 --- h2
+chain that it would pass in the testbed, and the netem_args of the link_configs are applied per link (delay with uniform jitter, random loss, loss gemodel, limit).
+The relay writes the same raw files as the testbed:
+    - s2-eth1.pcap, s2-eth2.pcap and s3-eth2.pcap (full or compact, see compact_capture.py) with synthesized Ethernet/IPv4/UDP headers that carry the slot 0 addresses and the configured ports
+    - queue_monitor.txt with one line per enqueue on s3-eth1 and the cumulative number of drops, like monitor_queue_bpf_enqueue_only.py
+Timestamps are emulated: the arrival time at the relay plus the delays drawn for the links passed so far. They do not suffer from the scheduling lag of the event loop.
+"""
+import asyncio
+import datetime
+import os
+import random
+import socket
+import struct
+import time
+
+import compact_capture
+import netlink_backend
+
+
+### Egress qdiscs (netem) and observer points (capture) in the order a datagram passes them; s2-eth1 and s2-eth2 capture ingress traffic like tcpdump in the testbed
+CLIENT_TO_SERVER_PATH = [("netem", "s1-eth2"), ("capture", "s2-eth1"), ("netem", "s2-eth2"), ("netem", "s3-eth2")]
+SERVER_TO_CLIENT_PATH = [("capture", "s3-eth2"), ("netem", "s3-eth1"), ("capture", "s2-eth2"), ("netem", "s2-eth1"), ("netem", "s1-eth1")]
+
+### The link whose enqueues are reported in queue_monitor.txt
+MONITORED_LINK = "s3-eth1"
+
+### netem's default queue length in packets
+DEFAULT_LIMIT = 1000
+
+DRAIN_TIMEOUT = 10
+
+ETHERNET_HEADER = bytes.fromhex("000000000002" "000000000001") + struct.pack("!H", compact_capture.ETH_P_IP)
+IP_HEADER = struct.Struct("!BBHHHBBH4s4s")
+UDP_HEADER = struct.Struct("!HHHH")
+
+MONITOR_FORMAT = "{:<14}\t{:<21}\t{:<10}\t{:<40}"
+
+
+class NetemStage:
+    """
+    The netem qdisc of one link.
+    Loss is decided on enqueue (random loss or the Gilbert-Elliott model of netem), the delay is drawn uniformly from [delay - jitter, delay + jitter].
+    Like netem, dropped datagrams (loss and limit) are counted in drops.
+
+    netem_args: e.g. "delay 10ms loss gemodel 0.20202% 20%"
+    rng: random.Random instance shared by all stages of an emulator
+    """
+
+    def __init__(self, netem_args, rng):
+
+        parameters = netlink_backend.parse_netem_arguments(netem_args)
+        if "duplicate" in parameters:
+            raise Exception("The userspace emulator does not support duplicate: {}".format(netem_args))
+
+        self.rng = rng
+        self.delay_ns = parameters.get("delay", 0) * 1000
+        self.jitter_ns = parameters.get("jitter", 0) * 1000
+        self.loss = parameters.get("loss", 0) / 100
+        self.limit = parameters.get("limit", DEFAULT_LIMIT)
+
+        ### gemodel p [r [1-h [1-k]]], defaults as in tc: r = 1 - p, 1-h = 100%, 1-k = 0%
+        self.gemodel = None
+        if "gemodel" in parameters:
+            gemodel = [value / 100 for value in parameters["gemodel"]]
+            defaults = [None, 1 - gemodel[0], 1.0, 0.0]
+            self.gemodel = gemodel + defaults[len(gemodel):]
+        self.bad_state = False
+
+        self.queued = 0
+        self.drops = 0
+
+    def _lost(self):
+
+        if self.gemodel is None:
+            return self.loss > 0 and self.rng.random() < self.loss
+
+        p, r, bad_loss, good_loss = self.gemodel
+
+        ### The state at arrival decides the loss, then the model transitions
+        if self.bad_state:
+            lost = self.rng.random() < bad_loss
+            if self.rng.random() < r:
+                self.bad_state = False
+        else:
+            lost = self.rng.random() < good_loss
+            if self.rng.random() < p:
+                self.bad_state = True
+
+        return lost
+
+    def enqueue(self):
+        """
+        Returns the delay of an arriving datagram in nanoseconds or None if the datagram is dropped.
+        The caller must call dequeue() once the delay has passed.
+        """
+
+        if self.queued >= self.limit or self._lost():
+            self.drops += 1
+            return None
+
+        self.queued += 1
+
+        if self.jitter_ns == 0:
+            return self.delay_ns
+        return max(0, int(self.rng.uniform(self.delay_ns - self.jitter_ns, self.delay_ns + self.jitter_ns)))
+
+    def dequeue(self):
+
+        self.queued -= 1
+
+
+class _RelayEndpoint(asyncio.DatagramProtocol):
+
+    def __init__(self, on_datagram):
+
+        self.on_datagram = on_datagram
+        self.transport = None
+
+    def connection_made(self, transport):
+
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+
+        self.on_datagram(data, addr)
+
+
+class UserspaceEmulator:
+    """
+    Relay between one client and one server on localhost that emulates the links and observers of the testbed and writes the raw files of one measurement.
+
+    link_configs: link_configs of the flow_test
+    raw_file_path/pcap_name: where to write the raw files (pcap_name is the measurement prefix including the separator)
+    client_ip/server_ip, client_port/server_port: addresses and ports written into the captures
+    capture_mode: full or compact (see simulator.py --captureMode)
+    seed: seed of the loss and jitter decisions
+    """
+
+    def __init__(self, link_configs, raw_file_path, pcap_name, client_ip, server_ip, client_port, server_port, capture_mode="full", seed=None):
+
+        rng = random.Random(seed)
+        self.stages = {link_config["link"]: NetemStage(link_config["netem_args"], rng) for link_config in link_configs}
+
+        self.raw_file_path = raw_file_path
+        self.pcap_name = pcap_name
+        self.capture_mode = capture_mode
+
+        self.addresses = {"client": (socket.inet_aton(client_ip), int(client_port)), "server": (socket.inet_aton(server_ip), int(server_port))}
+        self.ip_identification = 0
+
+        self.captures = {}
+        self.queue_monitor = None
+
+        self.client_endpoint = None
+        self.server_endpoint = None
+        self.client_address = None
+        self.server_address = None
+
+        ### Datagrams that are currently delayed by a netem stage
+        self.pending = 0
+        self.idle = None
+
+        self.statistics = {"client_to_server": 0, "server_to_client": 0, "delivered_to_server": 0, "delivered_to_client": 0}
+
+    async def start(self, relay_port, server_port):
+        """
+        Listen for the client on 127.0.0.1:relay_port and forward its datagrams to the server on 127.0.0.1:server_port.
+        """
+
+        loop = asyncio.get_running_loop()
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+        for interface in [point for kind, point in CLIENT_TO_SERVER_PATH + SERVER_TO_CLIENT_PATH if kind == "capture"]:
+            self.captures[interface] = open(os.path.join(self.raw_file_path, "{}{}.pcap".format(self.pcap_name, interface)), "wb")
+            compact_capture.write_pcap_header(self.captures[interface])
+
+        self.queue_monitor = open(os.path.join(self.raw_file_path, "{}queue_monitor.txt".format(self.pcap_name)), "w")
+        self.queue_monitor.write(MONITOR_FORMAT.format("TIME(s)", "dev", "drops", "real_time") + "\n")
+
+        self.server_address = ("127.0.0.1", int(server_port))
+        _, self.client_endpoint = await loop.create_datagram_endpoint(lambda: _RelayEndpoint(self._from_client), local_addr=("127.0.0.1", int(relay_port)))
+        _, self.server_endpoint = await loop.create_datagram_endpoint(lambda: _RelayEndpoint(self._from_server), local_addr=("127.0.0.1", 0))
+
+        print("Userspace emulator relays 127.0.0.1:{} to 127.0.0.1:{}".format(relay_port, server_port))
+
+    def _from_client(self, data, addr):
+
+        self.client_address = addr
+        self.statistics["client_to_server"] += 1
+        self._forward(CLIENT_TO_SERVER_PATH, 0, data, time.time_ns(), "client", self._to_server)
+
+    def _from_server(self, data, addr):
+
+        self.statistics["server_to_client"] += 1
+        self._forward(SERVER_TO_CLIENT_PATH, 0, data, time.time_ns(), "server", self._to_client)
+
+    def _to_server(self, data):
+
+        self.statistics["delivered_to_server"] += 1
+        self.server_endpoint.transport.sendto(data, self.server_address)
+
+    def _to_client(self, data):
+
+        self.statistics["delivered_to_client"] += 1
+        self.client_endpoint.transport.sendto(data, self.client_address)
+
+    def _forward(self, path, position, data, timestamp_ns, sender, deliver):
+        """
+        Pass the datagram through the path starting at position. timestamp_ns: emulated time at which the datagram reaches this position
+        """
+
+        while position < len(path):
+
+            kind, point = path[position]
+            position += 1
+
+            if kind == "capture":
+                self._capture(point, data, timestamp_ns, sender)
+                continue
+
+            stage = self.stages.get(point)
+            if stage is None:
+                continue
+
+            delay_ns = stage.enqueue()
+            if point == MONITORED_LINK:
+                self._monitor(stage, timestamp_ns)
+            if delay_ns is None:
+                return
+
+            self.pending += 1
+            self.idle.clear()
+            asyncio.get_running_loop().call_later(delay_ns / 1000000000, self._dequeued, stage, path, position, data, timestamp_ns + delay_ns, sender, deliver)
+            return
+
+        deliver(data)
+
+    def _dequeued(self, stage, path, position, data, timestamp_ns, sender, deliver):
+
+        stage.dequeue()
+        self._forward(path, position, data, timestamp_ns, sender, deliver)
+
+        self.pending -= 1
+        if self.pending == 0:
+            self.idle.set()
+
+    def _capture(self, interface, data, timestamp_ns, sender):
+        """
+        Write the datagram as Ethernet/IPv4/UDP frame from the sender (client or server) to the capture of the interface.
+        """
+
+        src_ip, src_port = self.addresses[sender]
+        dst_ip, dst_port = self.addresses["server" if sender == "client" else "client"]
+
+        self.ip_identification = (self.ip_identification + 1) & 0xffff
+        udp_length = UDP_HEADER.size + len(data)
+        ip_length = IP_HEADER.size + udp_length
+
+        ip_header = IP_HEADER.pack(0x45, 0, ip_length, self.ip_identification, 0x4000, 64, compact_capture.IPPROTO_UDP, 0, src_ip, dst_ip)
+        ip_header = ip_header[:10] + struct.pack("!H", _ip_checksum(ip_header)) + ip_header[12:]
+
+        frame = ETHERNET_HEADER + ip_header + UDP_HEADER.pack(src_port, dst_port, udp_length, 0) + data
+        frame_length = len(frame)
+
+        if self.capture_mode == "compact":
+            frame = compact_capture.compact_frame(frame, src_ip, dst_ip)
+
+        compact_capture.write_pcap_record(self.captures[interface], timestamp_ns, frame, frame_length)
+
+    def _monitor(self, stage, timestamp_ns):
+        """
+        One line per enqueue with the cumulative drops of the qdisc, as written by monitor_queue_bpf_enqueue_only.py
+        """
+
+        real_time = datetime.datetime.fromtimestamp(timestamp_ns // 1000000000, datetime.timezone.utc).replace(microsecond=(timestamp_ns % 1000000000) // 1000)
+        self.queue_monitor.write(MONITOR_FORMAT.format(time.monotonic(), MONITORED_LINK, stage.drops, real_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')) + "\n")
+
+    async def drain(self, timeout=DRAIN_TIMEOUT):
+        """
+        Wait until all delayed datagrams have been delivered or dropped.
+        """
+
+        try:
+            await asyncio.wait_for(self.idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            print("Userspace emulator: {} datagrams still delayed after {} seconds".format(self.pending, timeout))
+
+    def close(self):
+
+        for endpoint in [self.client_endpoint, self.server_endpoint]:
+            if endpoint is not None and endpoint.transport is not None:
+                endpoint.transport.close()
+
+        for capture in self.captures.values():
+            capture.close()
+        if self.queue_monitor is not None:
+            self.queue_monitor.close()
+
+        drops = {link: stage.drops for link, stage in self.stages.items() if stage.drops}
+        print("Userspace emulator: {}, drops {}".format(self.statistics, drops))
+
+
+def _ip_checksum(header):
+
+    total = sum(struct.unpack("!{}H".format(len(header) // 2), header))
+    while total > 0xffff:
+        total = (total & 0xffff) + (total >> 16)
+
+    return ~total & 0xffff
+
+
+async def relay_flow(emulator, relay_port, server_port, client_command):
+    """
+    Run the client command (argument list) while the emulator relays its traffic, then let the delayed datagrams drain.
+    Returns the exit status of the client.
+    """
+
+    await emulator.start(relay_port, server_port)
+
+    try:
+        client = await asyncio.create_subprocess_exec(*client_command)
+        returncode = await client.wait()
+        await emulator.drain()
+    finally:
+        emulator.close()
+
+    return returncode
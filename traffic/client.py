@@ -2,6 +2,8 @@
 
 import sys
 import asyncio
+import contextlib
+import math
 import ssl
 from typing import Optional, cast
 
@@ -14,45 +16,110 @@ import time
 
 from argparse import ArgumentParser
 
-parser = ArgumentParser(description="QUIC EFM Datagram Client")
-parser.add_argument('--target', '-t',
-                    dest="target",
-                    action="store",
-                    help="Target IP address",
-                    required=True)
 
-parser.add_argument('--srcport', '-s',
-                    dest="srcport",
-                    action="store",
-                    help="QUIC SRC port",
-                    required=True)
+### Preallocated datagram payload (1227 bytes, about 1300 bytes on the wire)
+PAYLOAD = bytes(1227 * "a", 'utf-8')
+
+### Default pacing: one datagram every 1.2 ms
+DEFAULT_PACKET_RATE = 1 / 0.0012
+DEFAULT_BURST = 1
 
-parser.add_argument('--dstport', '-z',
-                    dest="dstport",
-                    action="store",
-                    help="QUIC DST port",
-                    required=True)                    
+### Tokens accumulated while a wakeup is late are kept for up to this many seconds, so timer overshoot does not lower the achieved rate
+CATCH_UP_WINDOW = 0.005
 
-parser.add_argument('--efmvariants',
-                    dest="efmvariants",
-                    action="store",
-                    required=True,
-                    help="Which measurement to perform?")
 
-parser.add_argument('--duration', '-d',
-                    dest="duration",
-                    action="store",
-                    help="How long should traffic be generated?",
-                    required=False)
+class Pacer:
+    """
+    Token bucket driven by the monotonic clock: tokens accumulate at packet_rate per second, the sender wakes up whenever burst tokens are available
+    and sends all available tokens at once (more than burst only if the wakeup was late).
+    Keeps the statistics of the achieved sending rate and of the inter-send jitter (deviation of the send times from the ideal schedule).
+    """
 
-parser.add_argument('--packets', '-p',
-                    dest="packets",
-                    action="store",
-                    help="How many packets should be sent?",
-                    required=True)
+    def __init__(self, packet_rate=DEFAULT_PACKET_RATE, burst=DEFAULT_BURST):
 
-args = parser.parse_args()
+        if packet_rate <= 0 or burst < 1:
+            raise Exception("Invalid pacing: {} packets per second, bursts of {}".format(packet_rate, burst))
 
+        self.interval = 1 / packet_rate
+        self.burst = int(burst)
+        self.depth = max(float(self.burst), CATCH_UP_WINDOW / self.interval)
+        self.tokens = 0.0
+        self.last_refill = None
+
+        self.first_send = None
+        self.last_send = None
+        self.ideal_send = None
+        self.sent = 0
+        self.wakeups = 0
+        ### Running mean/variance (Welford) of the lateness of each datagram relative to its ideal send time (previous ideal send time + interval)
+        self.lateness_mean = 0.0
+        self.lateness_m2 = 0.0
+        self.lateness_max = 0.0
+
+    def set_rate(self, packet_rate, burst):
+
+        self.interval = 1 / packet_rate
+        self.burst = int(burst)
+        self.depth = max(float(self.burst), CATCH_UP_WINDOW / self.interval)
+
+    def take(self):
+        """
+        Refill the bucket and return how many datagrams to send now
+        """
+
+        now = time.monotonic()
+        if self.last_refill is None:
+            self.tokens = float(self.burst)
+        else:
+            self.tokens = min(self.tokens + (now - self.last_refill) / self.interval, self.depth)
+        self.last_refill = now
+
+        count = int(self.tokens)
+        self.tokens -= count
+        return count
+
+    def delay(self):
+        """
+        Time until the bucket holds a full burst again
+        """
+
+        return max((self.burst - self.tokens) * self.interval, 0.0)
+
+    def record(self, count):
+        """
+        Account for count datagrams sent at the current time
+        """
+
+        if count == 0:
+            return
+
+        now = time.monotonic()
+        if self.first_send is None:
+            self.first_send = now
+            self.ideal_send = now
+
+        for _ in range(count):
+            lateness = now - self.ideal_send
+            self.ideal_send += self.interval
+            self.sent += 1
+            delta = lateness - self.lateness_mean
+            self.lateness_mean += delta / self.sent
+            self.lateness_m2 += delta * (lateness - self.lateness_mean)
+            self.lateness_max = max(self.lateness_max, abs(lateness))
+
+        self.last_send = now
+        self.wakeups += 1
+
+    def statistics(self, target_rate):
+
+        duration = (self.last_send - self.first_send) if self.sent > 1 else 0.0
+        return {"target_rate": target_rate,
+                "achieved_rate": (self.sent - 1) / duration if duration > 0 else 0.0,
+                "achieved_bitrate": (self.sent - 1) * len(PAYLOAD) * 8 / duration if duration > 0 else 0.0,
+                "datagrams_per_wakeup": self.sent / self.wakeups if self.wakeups > 0 else 0.0,
+                "jitter_mean": self.lateness_mean,
+                "jitter_std": math.sqrt(self.lateness_m2 / self.sent) if self.sent > 0 else 0.0,
+                "jitter_max": self.lateness_max}
 
 
 class MyConnectionProtocol(QuicConnectionProtocol):
@@ -72,56 +139,203 @@ class MyConnectionProtocol(QuicConnectionProtocol):
             
         return
 
-    async def sendDatagram(self):
-        thirteenhundred_bytes = 1227 * "a"
-        b = bytes(thirteenhundred_bytes, 'utf-8')
-        self._quic.send_datagram_frame(b)
+    def sendDatagrams(self, count):
+        """
+        Queue count datagrams and send them with a single transmit()
+        """
+
+        for _ in range(count):
+            self._quic.send_datagram_frame(PAYLOAD)
         self.transmit()
 
-    async def run_trash_traffic(self):
-
-        while not self.done:
-            await self.sendDatagram()
-            await asyncio.sleep(0.0012)
-            self.packet_count += 1
-            if self.packet_count % 500 == 0:
-                print("Client, Packet Count ", self.packet_count)
-
-            """
-            Check if there has not been a response from the server for quite some time as it just might be the case that the connection close got dropped.            
-            """
-            if time.perf_counter() - self.watchdog > 60:
-                print("No reponse from the server for 60 seconds. Close the client, too.")
-                self.done = True
-
-    async def traffic_timer(self):
-        print("Start timer: {}".format(str(args.duration)))
-        await asyncio.sleep(int(args.duration))
+    def check_watchdog(self):
+        """
+        Check if there has not been a response from the server for quite some time as it just might be the case that the connection close got dropped.            
+        """
+        if time.perf_counter() - self.watchdog > 60:
+            print("No reponse from the server for 60 seconds. Close the client, too.")
+            self.done = True
+
+    async def traffic_timer(self, duration):
+        print("Start timer: {}".format(str(duration)))
+        await asyncio.sleep(int(duration))
         print("Timer finished")
         self.done = True
 
 
 
-async def main():
-
+def create_configuration(efmvariants):
 
     configuration = QuicConfiguration(is_client=True)
     configuration.verify_mode = ssl.CERT_NONE
     configuration.max_datagram_frame_size = 65536
 
-    configuration.efm_variants = args.efmvariants
+    configuration.efm_variants = efmvariants
+
+    return configuration
+
+
+def packet_rate_of(rate=None, bitrate=None):
+    """
+    Packets per second for a target packet rate or a target bitrate (bits per second of datagram payload); defaults to one datagram every 1.2 ms
+    """
+
+    if rate is not None and bitrate is not None:
+        raise Exception("Specify either a packet rate or a bitrate")
+    if bitrate is not None:
+        return float(bitrate) / (len(PAYLOAD) * 8)
+    if rate is not None:
+        return float(rate)
 
-    async with connect(args.target, args.dstport, configuration=configuration, create_protocol=MyConnectionProtocol, local_port=int(args.srcport)) as client:
-        client = cast(MyConnectionProtocol, client)
+    return DEFAULT_PACKET_RATE
 
-        loop = asyncio.get_event_loop()
 
-        trash_traffic = loop.create_task(client.run_trash_traffic())
+async def run_trash_traffic(clients, packet_rate, burst):
+    """
+    Send paced datagrams on all connections until the server closed each of them.
+    One pacer runs at packet_rate per open connection; the datagrams of a wakeup are handed out round-robin and each connection transmits once per wakeup.
+    Returns the pacer.
+    """
 
-        await trash_traffic
+    pacer = Pacer(packet_rate * len(clients), burst * len(clients))
+    next_client = 0
+    packet_count = 0
 
+    active = clients
+    while active:
+        count = pacer.take()
+        if count > 0:
+            shares = [count // len(active)] * len(active)
+            for offset in range(count % len(active)):
+                shares[(next_client + offset) % len(active)] += 1
+            next_client = (next_client + count) % len(active)
 
-loop = asyncio.get_event_loop()
-result = loop.run_until_complete(main())
+            for client, share in zip(active, shares):
+                if share > 0:
+                    client.sendDatagrams(share)
+                    client.packet_count += share
+            pacer.record(count)
 
-print("Done")
+            if (packet_count + count) // 500 > packet_count // 500:
+                print("Client, Packet Count ", (packet_count + count) // 500 * 500)
+            packet_count += count
+
+        await asyncio.sleep(pacer.delay())
+
+        for client in active:
+            client.check_watchdog()
+
+        if any(client.done for client in active):
+            active = [client for client in active if not client.done]
+            if active:
+                pacer.set_rate(packet_rate * len(active), burst * len(active))
+
+    return pacer
+
+
+async def run_client(target, srcport, dstport, configuration, packet_rate=DEFAULT_PACKET_RATE, burst=DEFAULT_BURST, connections=1):
+    """
+    Open connections QUIC connections to the datagram server (from srcport, srcport + 1, ...) and send paced datagrams until the server closed all of them.
+    packet_rate, burst: pacing of each connection
+    Returns the pacing statistics (see Pacer.statistics) with the number of datagrams sent (packets, per_connection) and the duration in seconds (elapsed).
+    """
+
+    start = time.perf_counter()
+
+    async with contextlib.AsyncExitStack() as stack:
+        clients = []
+        for index in range(int(connections)):
+            client = await stack.enter_async_context(connect(target, dstport, configuration=configuration, create_protocol=MyConnectionProtocol, local_port=int(srcport) + index))
+            clients.append(cast(MyConnectionProtocol, client))
+
+        pacer = await run_trash_traffic(clients, packet_rate, burst)
+
+    return dict(pacer.statistics(packet_rate * len(clients)), packets=sum(client.packet_count for client in clients),
+                per_connection=[client.packet_count for client in clients], elapsed=time.perf_counter() - start)
+
+
+def print_statistics(statistics):
+
+    print("Sent {} datagrams in {:.3f} s: {:.1f} packets/s ({:.3f} Mbit/s) of {:.1f} targeted, {:.2f} datagrams per wakeup".format(
+        statistics["packets"], statistics["elapsed"], statistics["achieved_rate"], statistics["achieved_bitrate"] / 1e6, statistics["target_rate"], statistics["datagrams_per_wakeup"]))
+    print("Inter-send jitter: mean {:.1f} us, std {:.1f} us, max {:.1f} us".format(
+        statistics["jitter_mean"] * 1e6, statistics["jitter_std"] * 1e6, statistics["jitter_max"] * 1e6))
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser(description="QUIC EFM Datagram Client")
+    parser.add_argument('--target', '-t',
+                        dest="target",
+                        action="store",
+                        help="Target IP address",
+                        required=True)
+
+    parser.add_argument('--srcport', '-s',
+                        dest="srcport",
+                        action="store",
+                        help="QUIC SRC port",
+                        required=True)
+
+    parser.add_argument('--dstport', '-z',
+                        dest="dstport",
+                        action="store",
+                        help="QUIC DST port",
+                        required=True)                    
+
+    parser.add_argument('--efmvariants',
+                        dest="efmvariants",
+                        action="store",
+                        required=True,
+                        help="Which measurement to perform?")
+
+    parser.add_argument('--duration', '-d',
+                        dest="duration",
+                        action="store",
+                        help="How long should traffic be generated?",
+                        required=False)
+
+    parser.add_argument('--packets', '-p',
+                        dest="packets",
+                        action="store",
+                        help="How many packets should be sent?",
+                        required=True)
+
+    parser.add_argument('--rate', '-r',
+                        dest="rate",
+                        action="store",
+                        type=float,
+                        help="Target sending rate per connection in datagrams per second (default: one datagram every 1.2 ms)",
+                        required=False)
+
+    parser.add_argument('--bitrate', '-b',
+                        dest="bitrate",
+                        action="store",
+                        type=float,
+                        help="Target sending rate per connection in bits per second of datagram payload (instead of --rate)",
+                        required=False)
+
+    parser.add_argument('--burst',
+                        dest="burst",
+                        action="store",
+                        type=int,
+                        default=DEFAULT_BURST,
+                        help="Number of datagrams per connection sent per wakeup with a single transmit",
+                        required=False)
+
+    parser.add_argument('--connections', '-n',
+                        dest="connections",
+                        action="store",
+                        type=int,
+                        default=1,
+                        help="Number of concurrent connections (source ports srcport, srcport + 1, ...), each paced with --rate/--bitrate",
+                        required=False)
+
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    result = loop.run_until_complete(run_client(args.target, args.srcport, args.dstport, create_configuration(args.efmvariants),
+                                                packet_rate=packet_rate_of(args.rate, args.bitrate), burst=args.burst, connections=args.connections))
+
+    print_statistics(result)
+    print("Done")
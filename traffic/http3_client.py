@@ -6,9 +6,11 @@ import argparse
 import asyncio
 import json
 import logging
+import math
 import os
 import pickle
 import ssl
+import sys
 import time
 from collections import deque
 from typing import Callable, Deque, Dict, List, Optional, Union, cast
@@ -44,6 +46,10 @@ HttpConnection = Union[H0Connection, H3Connection]
 
 USER_AGENT = "aioquic/" + aioquic.__version__
 
+# streaming mode: interval of the goodput samples and buffer size of the output file
+GOODPUT_SAMPLE_INTERVAL = 1.0
+WRITE_BUFFER_SIZE = 1024 * 1024
+
 
 class URL:
     def __init__(self, url: str) -> None:
@@ -121,6 +127,63 @@ class WebSocket:
             self.queue.put_nowait(event.data)
 
 
+class StreamingResponse:
+    """
+    Response that is consumed while it arrives: every chunk is counted, optionally
+    written to output_file and released, instead of being kept until the end.
+    """
+
+    def __init__(self, output_file=None, include: bool = False) -> None:
+        self.output_file = output_file
+        self.include = include
+        self.headers: List = []
+        self.octets = 0
+        self.start = time.monotonic()
+        # (end of the interval in seconds since the request, octets received in the interval)
+        self.goodput_samples: List = []
+        self._sample_end = GOODPUT_SAMPLE_INTERVAL
+        self._sample_octets = 0
+
+    def _close_samples(self, elapsed: float) -> None:
+        while elapsed >= self._sample_end:
+            self.goodput_samples.append((self._sample_end, self._sample_octets))
+            self._sample_octets = 0
+            self._sample_end += GOODPUT_SAMPLE_INTERVAL
+
+    def consume(self, event: H3Event) -> None:
+        if isinstance(event, HeadersReceived):
+            self.headers.extend(event.headers)
+            if self.include and self.output_file is not None:
+                headers = b""
+                for k, v in event.headers:
+                    headers += k + b": " + v + b"\r\n"
+                if headers:
+                    self.output_file.write(headers + b"\r\n")
+        elif isinstance(event, DataReceived):
+            self._close_samples(time.monotonic() - self.start)
+            self.octets += len(event.data)
+            self._sample_octets += len(event.data)
+            if self.output_file is not None:
+                self.output_file.write(event.data)
+
+    @property
+    def complete(self) -> bool:
+        # status 200 and, if announced, the whole content-length
+        headers = dict(self.headers)
+        if headers.get(b":status") != b"200":
+            return False
+        length = headers.get(b"content-length")
+        return length is None or int(length) == self.octets
+
+    def finish(self) -> None:
+        # the last, partial interval is kept with its actual end
+        elapsed = time.monotonic() - self.start
+        self._close_samples(elapsed)
+        if self._sample_octets > 0:
+            self.goodput_samples.append((elapsed, self._sample_octets))
+            self._sample_octets = 0
+
+
 class HttpClient(QuicConnectionProtocol):
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
@@ -129,6 +192,7 @@ class HttpClient(QuicConnectionProtocol):
         self._http: Optional[HttpConnection] = None
         self._request_events: Dict[int, Deque[H3Event]] = {}
         self._request_waiter: Dict[int, asyncio.Future[Deque[H3Event]]] = {}
+        self._streaming_responses: Dict[int, StreamingResponse] = {}
         self._websockets: Dict[int, WebSocket] = {}
 
         if self._quic.configuration.alpn_protocols[0].startswith("hq-"):
@@ -144,6 +208,18 @@ class HttpClient(QuicConnectionProtocol):
             HttpRequest(method="GET", url=URL(url), headers=headers)
         )
 
+    async def stream_get(
+        self, url: str, output_file=None, include: bool = False, headers: Dict = {}
+    ) -> StreamingResponse:
+        """
+        Perform a GET request and consume the response while it arrives.
+        """
+        response = StreamingResponse(output_file=output_file, include=include)
+        return await self._request(
+            HttpRequest(method="GET", url=URL(url), headers=headers),
+            streaming_response=response,
+        )
+
     async def post(self, url: str, data: bytes, headers: Dict = {}) -> Deque[H3Event]:
         """
         Perform a POST request.
@@ -187,7 +263,16 @@ class HttpClient(QuicConnectionProtocol):
     def http_event_received(self, event: H3Event) -> None:
         if isinstance(event, (HeadersReceived, DataReceived)):
             stream_id = event.stream_id
-            if stream_id in self._request_events:
+            if stream_id in self._streaming_responses:
+                # streamed http
+                response = self._streaming_responses[stream_id]
+                response.consume(event)
+                if event.stream_ended:
+                    response.finish()
+                    del self._streaming_responses[stream_id]
+                    self._request_waiter.pop(stream_id).set_result(response)
+
+            elif stream_id in self._request_events:
                 # http
                 self._request_events[event.stream_id].append(event)
                 if event.stream_ended:
@@ -214,7 +299,7 @@ class HttpClient(QuicConnectionProtocol):
             for http_event in self._http.handle_event(event):
                 self.http_event_received(http_event)
 
-    async def _request(self, request: HttpRequest):
+    async def _request(self, request: HttpRequest, streaming_response: Optional[StreamingResponse] = None):
         stream_id = self._quic.get_next_available_stream_id()
         self._http.send_headers(
             stream_id=stream_id,
@@ -231,13 +316,41 @@ class HttpClient(QuicConnectionProtocol):
                              data=request.content, end_stream=True)
 
         waiter = self._loop.create_future()
-        self._request_events[stream_id] = deque()
+        if streaming_response is not None:
+            self._streaming_responses[stream_id] = streaming_response
+        else:
+            self._request_events[stream_id] = deque()
         self._request_waiter[stream_id] = waiter
         self.transmit()
 
         return await asyncio.shield(waiter)
 
 
+async def perform_streaming_http_request(
+    client: HttpClient, url: str, include: bool, output_dir: Optional[str],
+) -> StreamingResponse:
+    # perform request, writing the response while it arrives
+    output_file = None
+    if output_dir is not None:
+        output_path = os.path.join(
+            output_dir, os.path.basename(urlparse(url).path) or "index.html"
+        )
+        output_file = open(output_path, "wb", buffering=WRITE_BUFFER_SIZE)
+    try:
+        response = await client.stream_get(url, output_file=output_file, include=include)
+    finally:
+        if output_file is not None:
+            output_file.close()
+
+    # print speed
+    elapsed = time.monotonic() - response.start
+    logger.info(
+        "Received %d bytes in %.1f s (%.3f Mbps)"
+        % (response.octets, elapsed, response.octets * 8 / elapsed / 1000000)
+    )
+    return response
+
+
 async def perform_http_request(
     client: HttpClient, url: str, data: str, include: bool, output_dir: Optional[str],
 ) -> None:
@@ -280,6 +393,93 @@ async def perform_http_request(
                     output_file.write(http_event.data)
 
 
+def _sample_log(goodput_samples: List) -> List[Dict]:
+    samples = []
+    previous_end = 0.0
+    for end, octets in goodput_samples:
+        duration = end - previous_end
+        samples.append({
+            "end_s": end,
+            "octets": octets,
+            "mbps": octets * 8 / duration / 1000000 if duration > 0 else 0.0,
+        })
+        previous_end = end
+    return samples
+
+
+def goodput_log(urls: List[str], responses: List[StreamingResponse]) -> List[Dict]:
+    """
+    Goodput samples of streamed responses, e.g. for a JSON log.
+    """
+    log = []
+    for url, response in zip(urls, responses):
+        log.append({
+            "url": url,
+            "complete": response.complete,
+            "octets": response.octets,
+            "samples": _sample_log(response.goodput_samples),
+        })
+    return log
+
+
+def aggregate_goodput(responses: List[StreamingResponse]) -> Dict:
+    """
+    Goodput of all streamed responses together. The samples of each response are
+    shifted to the start of the first request and summed per sample interval.
+    """
+    if not responses:
+        return {"streams": 0, "octets": 0, "elapsed_s": 0.0, "mbps": 0.0, "samples": []}
+
+    start = min(response.start for response in responses)
+    interval_octets: Dict[int, int] = {}
+    elapsed = 0.0
+    for response in responses:
+        offset = response.start - start
+        for end, octets in response.goodput_samples:
+            index = max(1, math.ceil((offset + end) / GOODPUT_SAMPLE_INTERVAL))
+            interval_octets[index] = interval_octets.get(index, 0) + octets
+            elapsed = max(elapsed, offset + end)
+
+    # the last interval ends with the last response
+    goodput_samples = [
+        (min(index * GOODPUT_SAMPLE_INTERVAL, elapsed), interval_octets.get(index, 0))
+        for index in range(1, max(interval_octets.keys(), default=0) + 1)
+    ]
+    octets = sum(response.octets for response in responses)
+    return {
+        "streams": len(responses),
+        "octets": octets,
+        "elapsed_s": elapsed,
+        "mbps": octets * 8 / elapsed / 1000000 if elapsed > 0 else 0.0,
+        "samples": _sample_log(goodput_samples),
+    }
+
+
+def request_urls(urls: List[str], parallel_requests: int = 1, connections: int = 1) -> List[str]:
+    """
+    URLs of all requests of run(), in the order of the returned responses: every
+    connection requests each URL parallel_requests times.
+    """
+    return [url for _ in range(connections) for url in urls for _ in range(parallel_requests)]
+
+
+def write_completion_file(
+    path: str, urls: List[str], responses: List[StreamingResponse]
+) -> None:
+    """
+    Signal the end of the downloads: the file appears (atomically) once all
+    responses are in and holds their completion and goodput.
+    """
+    completion = {
+        "complete": all(response.complete for response in responses),
+        "aggregate": aggregate_goodput(responses),
+        "streams": goodput_log(urls, responses),
+    }
+    with open(path + ".tmp", "w") as completion_fp:
+        json.dump(completion, completion_fp)
+    os.replace(path + ".tmp", path)
+
+
 def save_session_ticket(ticket: SessionTicket) -> None:
     """
     Callback which is invoked by the TLS engine when a new session ticket
@@ -291,38 +491,29 @@ def save_session_ticket(ticket: SessionTicket) -> None:
             pickle.dump(ticket, fp)
 
 
-async def run(
+async def run_connection(
     configuration: QuicConfiguration,
+    host: str,
+    port: int,
     urls: List[str],
     data: str,
     include: bool,
     output_dir: Optional[str],
     local_port: int,
-) -> None:
-    # parse URL
-    parsed = urlparse(urls[0])
-    assert parsed.scheme in (
-        "https",
-        "wss",
-    ), "Only https:// or wss:// URLs are supported."
-    if ":" in parsed.netloc:
-        host, port_str = parsed.netloc.split(":")
-        port = int(port_str)
-    else:
-        host = parsed.netloc
-        port = 443
-
+    session_ticket_handler: Optional[Callable[[SessionTicket], None]],
+    streaming: bool,
+) -> Optional[List[StreamingResponse]]:
     async with connect(
         host,
         port,
         configuration=configuration,
         create_protocol=HttpClient,
-        session_ticket_handler=save_session_ticket,
+        session_ticket_handler=session_ticket_handler,
         local_port=local_port,
     ) as client:
         client = cast(HttpClient, client)
 
-        if parsed.scheme == "wss":
+        if urlparse(urls[0]).scheme == "wss":
             ws = await client.websocket(urls[0], subprotocols=["chat", "superchat"])
 
             # send some messages and receive reply
@@ -335,6 +526,15 @@ async def run(
                 print("< " + message)
 
             await ws.close()
+        elif streaming and data is None:
+            # perform request, consuming the responses while they arrive
+            coros = [
+                perform_streaming_http_request(
+                    client=client, url=url, include=include, output_dir=output_dir,
+                )
+                for url in urls
+            ]
+            return await asyncio.gather(*coros)
         else:
             # perform request
             coros = [
@@ -350,6 +550,63 @@ async def run(
             await asyncio.gather(*coros)
 
 
+async def run(
+    configuration: QuicConfiguration,
+    urls: List[str],
+    data: str,
+    include: bool,
+    output_dir: Optional[str],
+    local_port: int,
+    session_ticket_handler: Optional[Callable[[SessionTicket], None]] = save_session_ticket,
+    streaming: bool = False,
+    parallel_requests: int = 1,
+    connections: int = 1,
+) -> Optional[List[StreamingResponse]]:
+    # parse URL
+    parsed = urlparse(urls[0])
+    assert parsed.scheme in (
+        "https",
+        "wss",
+    ), "Only https:// or wss:// URLs are supported."
+    if ":" in parsed.netloc:
+        host, port_str = parsed.netloc.split(":")
+        port = int(port_str)
+    else:
+        host = parsed.netloc
+        port = 443
+
+    # every connection issues all requests at once, connection i binds local_port + i
+    local_port = int(local_port)
+    results = await asyncio.gather(
+        *[
+            run_connection(
+                configuration=configuration,
+                host=host,
+                port=port,
+                urls=request_urls(urls, parallel_requests=parallel_requests),
+                data=data,
+                include=include,
+                output_dir=output_dir,
+                local_port=local_port + i if local_port else 0,
+                session_ticket_handler=session_ticket_handler,
+                streaming=streaming,
+            )
+            for i in range(connections)
+        ]
+    )
+    if any(responses is None for responses in results):
+        return None
+
+    responses = [response for responses in results for response in responses]
+    if len(responses) > 1:
+        aggregate = aggregate_goodput(responses)
+        logger.info(
+            "Received %d bytes over %d streams in %.1f s (%.3f Mbps aggregate)"
+            % (aggregate["octets"], aggregate["streams"], aggregate["elapsed_s"], aggregate["mbps"])
+        )
+    return responses
+
+
 if __name__ == "__main__":
     defaults = QuicConfiguration(is_client=True)
 
@@ -424,6 +681,35 @@ if __name__ == "__main__":
                         required=True,
                         help="Which measurement to perform?")
 
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="count (and write) each received chunk right away instead of keeping the whole response in memory",
+    )
+    parser.add_argument(
+        "--goodput-log",
+        type=str,
+        help="write the aggregate and per-stream goodput samples of the streamed responses to this JSON file",
+    )
+    parser.add_argument(
+        "--parallel-requests",
+        type=int,
+        default=1,
+        help="request every URL this many times in parallel on each connection",
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=1,
+        help="open this many connections (from consecutive source ports) that each issue all requests",
+    )
+    parser.add_argument(
+        "--completion-file",
+        type=str,
+        help="write the completion and goodput of the streamed responses to this JSON file once they are in; "
+        "the exit status is 1 if a response is incomplete",
+    )
+
 
     args = parser.parse_args()
 
@@ -434,6 +720,10 @@ if __name__ == "__main__":
 
     if args.output_dir is not None and not os.path.isdir(args.output_dir):
         raise Exception("%s is not a directory" % args.output_dir)
+    if args.output_dir is not None and (args.parallel_requests > 1 or args.connections > 1):
+        raise Exception("parallel downloads of the same URL cannot be written to --output-dir")
+    if args.completion_file is not None and not args.streaming:
+        raise Exception("--completion-file requires --streaming")
 
     # prepare configuration
     configuration = QuicConfiguration(
@@ -463,8 +753,9 @@ if __name__ == "__main__":
     if uvloop is not None:
         uvloop.install()
     loop = asyncio.get_event_loop()
+    complete = True
     try:
-        loop.run_until_complete(
+        responses = loop.run_until_complete(
             run(
                 configuration=configuration,
                 urls=args.url,
@@ -472,10 +763,28 @@ if __name__ == "__main__":
                 include=args.include,
                 output_dir=args.output_dir,
                 local_port=args.srcport,
+                streaming=args.streaming,
+                parallel_requests=args.parallel_requests,
+                connections=args.connections,
             )
         )
+        if responses is not None:
+            urls = request_urls(args.url, args.parallel_requests, args.connections)
+            complete = all(response.complete for response in responses)
+            if args.goodput_log:
+                with open(args.goodput_log, "w") as goodput_fp:
+                    json.dump({
+                        "aggregate": aggregate_goodput(responses),
+                        "streams": goodput_log(urls, responses),
+                    }, goodput_fp, indent=4)
+            if args.completion_file:
+                write_completion_file(args.completion_file, urls, responses)
     finally:
         if configuration.quic_logger is not None:
             with open(args.quic_log, "w") as logger_fp:
                 json.dump(configuration.quic_logger.to_dict(),
                           logger_fp, indent=4)
+
+    if not complete:
+        logger.warning("Incomplete response")
+        sys.exit(1)
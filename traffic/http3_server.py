@@ -27,6 +27,8 @@ from aioquic.quic.events import DatagramFrameReceived, ProtocolNegotiated, QuicE
 from aioquic.quic.logger import QuicLogger, QuicLoggerTrace
 from aioquic.tls import SessionTicket
 
+from qlog_writer import QuicLoggerStreaming
+
 try:
     import uvloop
 except ImportError:
@@ -37,6 +39,11 @@ HttpConnection = Union[H0Connection, H3Connection]
 
 SERVER_NAME = "aioquic/" + aioquic.__version__
 
+# backpressure: a response body waits while more than SEND_BUFFER_HIGH_WATER bytes
+# of its stream are not yet acknowledged
+SEND_BUFFER_HIGH_WATER = 1024 * 1024
+BACKPRESSURE_POLL_INTERVAL = 0.002
+
 
 class HttpRequestHandler:
     def __init__(
@@ -81,6 +88,19 @@ class HttpRequestHandler:
     async def receive(self) -> Dict:
         return await self.queue.get()
 
+    def pending_send_bytes(self) -> int:
+        """
+        Bytes of the response stream that are buffered and not yet acknowledged.
+        """
+        stream = self.protocol._quic._streams.get(self.stream_id)
+        if stream is None:
+            return 0
+        # the send buffer moved from the stream to stream.sender in newer aioquic versions
+        buffer = getattr(stream, "_send_buffer", None)
+        if buffer is None:
+            buffer = getattr(getattr(stream, "sender", None), "_buffer", None)
+        return len(buffer) if buffer is not None else 0
+
     async def send(self, message: Dict) -> None:
         if message["type"] == "http.response.start":
             self.connection.send_headers(
@@ -124,6 +144,10 @@ class HttpRequestHandler:
             )
         self.transmit()
 
+        if message["type"] == "http.response.body" and message.get("more_body", False):
+            while self.pending_send_bytes() > SEND_BUFFER_HIGH_WATER and not self.protocol._closed.is_set():
+                await asyncio.sleep(BACKPRESSURE_POLL_INTERVAL)
+
 
 class WebSocketHandler:
     def __init__(
@@ -393,7 +417,7 @@ if __name__ == "__main__":
         "app",
         type=str,
         nargs="?",
-        default="demo:app",
+        default="static_app:app",
         help="the ASGI application as <module>:<attribute>",
     )
     parser.add_argument(
@@ -434,6 +458,19 @@ if __name__ == "__main__":
         type=str,
         help="log QUIC events to QLOG files in the specified directory",
     )
+    parser.add_argument(
+        "--quic-log-format",
+        choices=["json", "ndjson"],
+        default="json",
+        help="json writes each trace when its connection ends, ndjson streams the events "
+        "while the connection runs (see qlog_writer.py)",
+    )
+    parser.add_argument(
+        "--quic-log-sample",
+        type=int,
+        default=1,
+        help="with ndjson, log only every n-th packet_sent/packet_received event",
+    )
     parser.add_argument(
         "--retry",
         action="store_true",
@@ -461,7 +498,9 @@ if __name__ == "__main__":
     application = getattr(module, attr_str)
 
     # create QUIC logger
-    if args.quic_log:
+    if args.quic_log and args.quic_log_format == "ndjson":
+        quic_logger = QuicLoggerStreaming(args.quic_log, args.quic_log_sample)
+    elif args.quic_log:
         quic_logger = QuicLoggerCustom(args.quic_log)
     else:
         quic_logger = None
@@ -505,3 +544,6 @@ if __name__ == "__main__":
         loop.run_forever()
     except KeyboardInterrupt:
         pass
+    finally:
+        if isinstance(quic_logger, QuicLoggerStreaming):
+            quic_logger.close()
@@ -0,0 +1,163 @@
+"""
+Streaming QLOG output for long connections.
+
+QuicLoggerStreaming writes one NDJSON file per connection (<ODCID>.ndqlog) while the connection runs.
+The first line is the header with the fields of a draft-01 trace (without events), every further line
+is one event [relative_time, category, event_type, data] as in the "events" of a draft-01 trace.
+Events are handed to a background thread in batches through a bounded queue, so the memory of the
+logger does not grow with the length of the connection.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, List
+
+from aioquic.quic.logger import QuicLogger, QuicLoggerTrace
+
+# events per batch handed to the writer thread and batches the writer may lag behind
+# (the event loop waits for the writer beyond that)
+BATCH_EVENTS = 1024
+QUEUE_BATCHES = 64
+
+# buffer size of the qlog files
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+PACKET_EVENTS = ("packet_sent", "packet_received")
+
+
+class StreamingQuicLoggerTrace(QuicLoggerTrace):
+    """
+    Trace that passes its events on to the writer of the logger instead of keeping them.
+    Only every packet_sample_interval-th packet_sent / packet_received event is logged.
+    """
+
+    def __init__(
+        self,
+        *,
+        logger: "QuicLoggerStreaming",
+        is_client: bool,
+        odcid: bytes,
+        packet_sample_interval: int = 1,
+    ) -> None:
+        super().__init__(is_client=is_client, odcid=odcid)
+        self.path = os.path.join(logger.path, odcid.hex() + ".ndqlog")
+        self.reference_time = time.time()
+        self._logger = logger
+        self._batch: List = []
+        self._packet_events = 0
+        self._packet_sample_interval = packet_sample_interval
+
+    def header(self) -> Dict:
+        return {
+            "qlog_version": "draft-01",
+            "qlog_format": "NDJSON",
+            "trace": {
+                "configuration": {"time_units": "us"},
+                "common_fields": {
+                    "ODCID": self._odcid.hex(),
+                    "reference_time": str(int(self.reference_time * 1000000)),
+                },
+                "event_fields": ["relative_time", "category", "event_type", "data"],
+                "vantage_point": self._vantage_point,
+                "packet_sample_interval": self._packet_sample_interval,
+            },
+        }
+
+    def log_event(self, *, category: str, event: str, data: Dict) -> None:
+        if event in PACKET_EVENTS:
+            # aioquic fills the frames of packet_received after logging it, so a
+            # batch is only handed over before a packet event, when the previous
+            # packets are complete
+            if len(self._batch) >= BATCH_EVENTS:
+                self.flush()
+
+            self._packet_events += 1
+            if (self._packet_events - 1) % self._packet_sample_interval:
+                return
+
+        self._batch.append(
+            (
+                str(int((time.time() - self.reference_time) * 1000000)),
+                category,
+                event,
+                data,
+            )
+        )
+
+    def flush(self) -> None:
+        if self._batch:
+            self._logger.submit(("events", self.path, self._batch))
+            self._batch = []
+
+    def to_dict(self) -> Dict:
+        # the events are already on their way to the file
+        return dict(self.header()["trace"], events=[])
+
+
+class QuicLoggerStreaming(QuicLogger):
+    """
+    QUIC logger which streams one NDJSON trace per connection into the directory path.
+    Call close() before exiting to write the traces of connections that are still open.
+    """
+
+    def __init__(self, path: str, packet_sample_interval: int = 1) -> None:
+        if not os.path.isdir(path):
+            raise ValueError(
+                "QUIC log output directory '%s' does not exist" % path)
+        if packet_sample_interval < 1:
+            raise ValueError("packet sample interval must be at least 1")
+        super().__init__()
+        self.path = path
+        self.packet_sample_interval = packet_sample_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=QUEUE_BATCHES)
+        self._writer = threading.Thread(target=self._write, name="qlog-writer", daemon=True)
+        self._writer.start()
+
+    def start_trace(self, is_client: bool, odcid: bytes) -> QuicLoggerTrace:
+        trace = StreamingQuicLoggerTrace(
+            logger=self,
+            is_client=is_client,
+            odcid=odcid,
+            packet_sample_interval=self.packet_sample_interval,
+        )
+        self._traces.append(trace)
+        self.submit(("open", trace.path, trace.header()))
+        return trace
+
+    def end_trace(self, trace: QuicLoggerTrace) -> None:
+        assert trace in self._traces, "QuicLoggerTrace does not belong to QuicLogger"
+        trace.flush()
+        self.submit(("close", trace.path, None))
+        self._traces.remove(trace)
+
+    def submit(self, item) -> None:
+        self._queue.put(item)
+
+    def close(self) -> None:
+        for trace in list(self._traces):
+            self.end_trace(trace)
+        self._queue.put(None)
+        self._writer.join()
+
+    def _write(self) -> None:
+        encode = json.JSONEncoder(check_circular=False).encode
+        files = {}
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            kind, path, payload = item
+            if kind == "open":
+                files[path] = open(path, "w", buffering=WRITE_BUFFER_SIZE)
+                files[path].write(json.dumps(payload) + "\n")
+            elif kind == "events":
+                files[path].write("\n".join(map(encode, payload)) + "\n")
+            else:
+                files.pop(path).close()
+
+        for logger_fp in files.values():
+            logger_fp.close()
@@ -1,12 +1,15 @@
 #!/usr/bin/python3
 
 import asyncio
+import functools
 
 from aioquic.asyncio import serve
 from aioquic.quic.configuration import QuicConfiguration
 from aioquic.asyncio import QuicConnectionProtocol
 from aioquic.quic.events import DatagramFrameReceived, QuicEvent
 
+from qlog_writer import QuicLoggerStreaming
+
 import _thread
 import time
 
@@ -16,101 +19,163 @@ import sys
 from argparse import ArgumentParser
 
 
-parser = ArgumentParser(description="QUIC EFM Datagram Server")
-
-parser.add_argument('--serverport', '-s',
-                    dest="serverport",
-                    action="store",
-                    help="QUIC Server port",
-                    required=True)
-
-parser.add_argument('--efmvariants',
-                    dest="efmvariants",
-                    action="store",
-                    required=True,
-                    help="Which measurement to perform?")
-parser.add_argument('--certpath', '-c',
-                    dest="certpath",
-                    action="store",
-                    required=True,
-                    help="Which ssl_cert?")
-parser.add_argument('--keypath', '-k',
-                    dest="keypath",
-                    action="store",
-                    required=True,
-                    help="Which ssl_key?")
-parser.add_argument('--packets', '-p',
-                    dest="packets",
-                    action="store",
-                    help="How many packets should be sent?",
-                    required=True)
-
-
-
-args = parser.parse_args()
+### Reply payload reused by the batched mode (1227 bytes, about 1300 bytes on the wire)
+PAYLOAD = bytes(1227 * "a", 'utf-8')
 
 
 class MyConnectionProtocol(QuicConnectionProtocol):
-    def __init__(self, *args, **kwargs) -> None:
+    def __init__(self, *args, packets, counters=None, batched=False, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self.packet_count = 0
         self.started = False
+        self.packets = int(packets)
+        self.counters = counters
+        self.batched = batched
+        self.first_packet_time = None
+        self.first_packet_cpu_time = None
 
     def quic_event_received(self, event: QuicEvent) -> None:
 
         if isinstance(event, DatagramFrameReceived):
 
-            thirteenhundred_bytes = 1227 * "a"
-            b = bytes(thirteenhundred_bytes, 'utf-8')
-            self._quic.send_datagram_frame(b)
-            self.transmit()
+            if self.first_packet_time is None:
+                self.first_packet_time = time.perf_counter()
+                self.first_packet_cpu_time = time.process_time()
+
+            if self.batched:
+                ### Only queue the reply: QuicConnectionProtocol transmits once after all events of the received datagram
+                self._quic.send_datagram_frame(PAYLOAD)
+            else:
+                thirteenhundred_bytes = 1227 * "a"
+                b = bytes(thirteenhundred_bytes, 'utf-8')
+                self._quic.send_datagram_frame(b)
+                self.transmit()
             self.packet_count += 1
-            if self.packet_count % 500 == 0:
+            if self.counters is not None:
+                self.counters["packets"] += 1
+            if not self.batched and self.packet_count % 500 == 0:
                 print("Server, Packet Count ", self.packet_count)
 
-            if self.packet_count >= int(args.packets):
+            if self.packet_count >= self.packets:
                 self._quic.send_datagram_frame(b'CLOSECLOSECLOSE')
                 self.transmit()
                 print(42*"###")
                 print(42*"###")
                 print("Server Closes the Connection")
                 self._quic.close(42, 1234)
+                self.report()
 
         return
 
+    def report(self):
+        """
+        Print (and add to the counters) the throughput and the CPU time per packet of the server since the first datagram of this connection
+        """
 
+        elapsed = time.perf_counter() - self.first_packet_time
+        cpu_time = time.process_time() - self.first_packet_cpu_time
 
-if __name__ == "__main__":
+        print("Server echoed {} datagrams in {:.3f} s: {:.1f} packets/s ({:.3f} Mbit/s), CPU time per packet {:.1f} us".format(
+            self.packet_count, elapsed, self.packet_count / elapsed if elapsed > 0 else 0.0, self.packet_count * len(PAYLOAD) * 8 / elapsed / 1e6 if elapsed > 0 else 0.0,
+            cpu_time / self.packet_count * 1e6))
 
+        if self.counters is not None:
+            self.counters["closed_connections"] += 1
+            self.counters["elapsed"] = self.counters.get("elapsed", 0.0) + elapsed
+            self.counters["cpu_time"] = self.counters.get("cpu_time", 0.0) + cpu_time
 
-    configuration = QuicConfiguration(is_client=False)
-    configuration.load_cert_chain(args.certpath,args.keypath)
 
-    configuration.max_datagram_frame_size = 65536
 
+def create_configuration(efmvariants, certpath, keypath):
 
-    configuration.efm_variants = args.efmvariants
+    configuration = QuicConfiguration(is_client=False)
+    configuration.load_cert_chain(certpath, keypath)
 
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(
-        serve(
-            "0.0.0.0",
-            args.serverport,
-            configuration=configuration,
-            create_protocol=MyConnectionProtocol,
-        )
-    )
-    try:
-        loop.run_forever()
-    except KeyboardInterrupt:
-        pass
+    configuration.max_datagram_frame_size = 65536
 
 
+    configuration.efm_variants = efmvariants
 
+    return configuration
 
 
+async def serve_datagrams(host, serverport, configuration, packets, counters=None, batched=False):
+    """
+    Start the datagram server. Every connection is closed by the server after it echoed packets datagrams.
+    counters: optional dictionary with the keys packets and closed_connections, updated by all connections (closed connections add their elapsed and cpu_time)
+    batched: reuse one reply payload and send the replies to all datagram frames of a received datagram with a single transmit
+    Returns the QuicServer (close it to stop serving).
+    """
+
+    return await serve(
+        host,
+        serverport,
+        configuration=configuration,
+        create_protocol=functools.partial(MyConnectionProtocol, packets=packets, counters=counters, batched=batched),
+    )
 
 
+if __name__ == "__main__":
 
+    parser = ArgumentParser(description="QUIC EFM Datagram Server")
+
+    parser.add_argument('--serverport', '-s',
+                        dest="serverport",
+                        action="store",
+                        help="QUIC Server port",
+                        required=True)
+
+    parser.add_argument('--efmvariants',
+                        dest="efmvariants",
+                        action="store",
+                        required=True,
+                        help="Which measurement to perform?")
+    parser.add_argument('--certpath', '-c',
+                        dest="certpath",
+                        action="store",
+                        required=True,
+                        help="Which ssl_cert?")
+    parser.add_argument('--keypath', '-k',
+                        dest="keypath",
+                        action="store",
+                        required=True,
+                        help="Which ssl_key?")
+    parser.add_argument('--packets', '-p',
+                        dest="packets",
+                        action="store",
+                        help="How many packets should be sent?",
+                        required=True)
+    parser.add_argument('--batched', '-b',
+                        dest="batched",
+                        action="store_true",
+                        help="Reuse one reply payload, send the replies of a received datagram with a single transmit and skip the progress output")
+    parser.add_argument('--quic-log', '-q',
+                        dest="quic_log",
+                        action="store",
+                        help="Stream the QUIC events of every connection as NDJSON qlog into this directory")
+    parser.add_argument('--quic-log-sample',
+                        dest="quic_log_sample",
+                        action="store",
+                        type=int,
+                        default=1,
+                        help="Log only every n-th packet_sent/packet_received event")
+
+
+
+    args = parser.parse_args()
+
+    configuration = create_configuration(args.efmvariants, args.certpath, args.keypath)
+    if args.quic_log:
+        configuration.quic_logger = QuicLoggerStreaming(args.quic_log, args.quic_log_sample)
 
-    
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(
+        serve_datagrams("0.0.0.0", args.serverport, configuration, args.packets, batched=args.batched)
+    )
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if configuration.quic_logger is not None:
+            configuration.quic_logger.close()
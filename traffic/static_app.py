@@ -0,0 +1,117 @@
+"""
+Built-in ASGI application of http3_server.py (static_app:app).
+
+GET /<name> serves traffic/htdocs/<name> through mmap in chunks of CHUNK_SIZE bytes.
+If there is no such file and the name has the form <size>[!<anything>].file (e.g. /10M.file or /50k!lossrandom-1.file),
+a deterministic synthetic body of <size> bytes (k/M/G are powers of 1024) is generated on the fly without touching the disk.
+Every chunk is handed to send() on its own, so the backpressure of http3_server.py bounds the memory of large downloads.
+"""
+
+import mmap
+import os
+import re
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+HTDOCS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "htdocs")
+
+CHUNK_SIZE = 64 * 1024
+
+SIZE_PATTERN = re.compile(r"^(\d+)([kMG]?)(?:!.*)?\.file$")
+SIZE_UNITS = {"": 1, "k": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+# one chunk of the synthetic body, the body repeats it
+SYNTHETIC_CHUNK = bytes(range(256)) * (CHUNK_SIZE // 256)
+
+
+def synthetic_size(name: str) -> Optional[int]:
+    """
+    Size of the synthetic body for a file name like 10M.file, None if the name has no size.
+    """
+    match = SIZE_PATTERN.match(name)
+    if match is None:
+        return None
+    return int(match.group(1)) * SIZE_UNITS[match.group(2)]
+
+
+def synthetic_chunks(size: int) -> Iterator[bytes]:
+    for offset in range(0, size, CHUNK_SIZE):
+        yield SYNTHETIC_CHUNK[:min(CHUNK_SIZE, size - offset)]
+
+
+def mapped_chunks(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as fp:
+        size = os.fstat(fp.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, size, CHUNK_SIZE):
+                yield mapped[offset:offset + CHUNK_SIZE]
+
+
+def resolve(path: str) -> Optional[Tuple[int, Iterator[bytes]]]:
+    """
+    Length and chunks of the body for a request path, None if there is nothing to serve.
+    """
+    name = path.lstrip("/")
+    file_path = os.path.realpath(os.path.join(HTDOCS, name))
+
+    if name and os.path.commonpath([file_path, HTDOCS]) == HTDOCS and os.path.isfile(file_path):
+        return os.path.getsize(file_path), mapped_chunks(file_path)
+
+    size = synthetic_size(name)
+    if size is not None:
+        return size, synthetic_chunks(size)
+
+    return None
+
+
+async def send_plain(send: Callable, status: int, text: bytes) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"text/plain"),
+                (b"content-length", str(len(text)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": text, "more_body": False})
+
+
+async def app(scope: Dict, receive: Callable, send: Callable) -> None:
+    if scope["type"] != "http":
+        return
+
+    if scope["method"] not in ("GET", "HEAD"):
+        await send_plain(send, 405, b"method not allowed")
+        return
+
+    body = resolve(scope["path"])
+    if body is None:
+        await send_plain(send, 404, b"not found")
+        return
+
+    length, chunks = body
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/octet-stream"),
+                (b"content-length", str(length).encode()),
+            ],
+        }
+    )
+
+    if scope["method"] == "HEAD":
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+        return
+
+    # hold back one chunk so that the last one ends the stream
+    previous = None
+    for chunk in chunks:
+        if previous is not None:
+            await send({"type": "http.response.body", "body": previous, "more_body": True})
+        previous = chunk
+    await send({"type": "http.response.body", "body": previous or b"", "more_body": False})
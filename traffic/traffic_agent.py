@@ -0,0 +1,249 @@
+#!/usr/bin/python3
+"""
+Long-lived traffic agent for one host namespace of the testbed.
+
+The agent imports aioquic, loads the certificate chain and the ASGI application once and then runs the datagram/HTTP3 servers and clients of
+the iterations on request, so that an iteration does not pay for interpreter startup, imports and TLS setup.
+Commands are JSON objects, one per line, sent over the Unix socket given by --socket; every command gets one JSON line as answer:
+    {"command": "server", "efmvariants": ..., "port": ..., "packets": ..., optional "batched"}  -> {"status": "ready"} once the datagram server is bound
+    {"command": "h3_server", "efmvariants": ..., "port": ..., "duration": ...}     -> {"status": "ready"}; the server stops after duration + 5 seconds
+    {"command": "client", "efmvariants": ..., "target": ..., "srcport": ..., "dstport": ..., optional "rate"/"bitrate"/"burst"/"connections"}
+                                                                                    -> {"status": "done", "packets": ..., "elapsed": ..., pacing statistics}
+    {"command": "h3_client", "efmvariants": ..., "url": ..., "srcport": ..., optional "parallel_requests"/"connections"/"timeout"}
+                                                                                    -> {"status": "done", "complete": ..., "elapsed": ..., "octets": ..., "goodput_samples": ..., "streams": ...}
+                                                                                       (streamed downloads; aggregate goodput and one entry per stream)
+                                                                                       or {"status": "timeout", "elapsed": ...} if the downloads took longer than timeout seconds
+    {"command": "stop", "port": ...}                                                -> {"status": "stopped", "packets": ..., "closed_connections": ..., "elapsed": ..., "cpu_time": ...}
+    {"command": "shutdown"}                                                          -> {"status": "shutdown"}
+Failures are answered with {"status": "error", "message": ...}.
+"""
+
+import asyncio
+import copy
+import importlib
+import json
+import os
+import ssl
+import time
+
+from argparse import ArgumentParser
+
+from aioquic.asyncio import serve
+from aioquic.h0.connection import H0_ALPN
+from aioquic.h3.connection import H3_ALPN
+from aioquic.quic.configuration import QuicConfiguration
+
+import client
+import http3_client
+import http3_server
+import server
+
+
+### Grace period of the HTTP3 server after the expected download duration (as the timeout of simulator.py)
+H3_SERVER_GRACE_PERIOD = 5
+
+
+class TrafficAgent:
+    """
+    Preloaded configurations and the servers currently running in this namespace
+    """
+
+    def __init__(self, certpath, keypath, app):
+
+        self.server_configuration = server.create_configuration(None, certpath, keypath)
+
+        self.h3_server_configuration = QuicConfiguration(
+            alpn_protocols=H3_ALPN + H0_ALPN + ["siduck"],
+            is_client=False,
+            max_datagram_frame_size=65536,
+        )
+        self.h3_server_configuration.load_cert_chain(certpath, keypath)
+
+        ### The HTTP3 handlers use the module-level application of http3_server
+        try:
+            module_str, attr_str = app.split(":", maxsplit=1)
+            http3_server.application = getattr(importlib.import_module(module_str), attr_str)
+            self.application_error = None
+        except (ImportError, AttributeError) as e:
+            self.application_error = "ASGI application {} not available: {}".format(app, e)
+            print(self.application_error)
+
+        ### port -> (QuicServer, counters)
+        self.servers = {}
+        self.stopped = asyncio.Event()
+
+    def configuration_for(self, base, efmvariants):
+
+        configuration = copy.copy(base)
+        configuration.efm_variants = str(efmvariants)
+        return configuration
+
+    async def start_server(self, request):
+
+        port = int(request["port"])
+        self.stop_server(port)
+
+        counters = {"packets": 0, "closed_connections": 0}
+        quic_server = await server.serve_datagrams("0.0.0.0", port, self.configuration_for(self.server_configuration, request["efmvariants"]),
+                                                   request["packets"], counters=counters, batched=bool(request.get("batched", False)))
+        self.servers[port] = (quic_server, counters)
+
+        return {"status": "ready"}
+
+    async def start_h3_server(self, request):
+
+        if self.application_error is not None:
+            raise Exception(self.application_error)
+
+        port = int(request["port"])
+        self.stop_server(port)
+
+        quic_server = await serve(
+            "0.0.0.0",
+            port,
+            configuration=self.configuration_for(self.h3_server_configuration, request["efmvariants"]),
+            create_protocol=http3_server.HttpServerProtocol,
+            session_ticket_fetcher=http3_server.SessionTicketStore().pop,
+        )
+        self.servers[port] = (quic_server, {})
+
+        asyncio.get_event_loop().call_later(float(request["duration"]) + H3_SERVER_GRACE_PERIOD, self.stop_server, port, quic_server)
+
+        return {"status": "ready"}
+
+    def stop_server(self, port, quic_server=None):
+        """
+        Close the server on port (only if it is still quic_server, if given). Returns its counters.
+        """
+
+        if port not in self.servers or (quic_server is not None and self.servers[port][0] is not quic_server):
+            return {}
+
+        quic_server, counters = self.servers.pop(port)
+        quic_server.close()
+        return counters
+
+    async def run_client(self, request):
+
+        statistics = await client.run_client(request["target"], request["srcport"], request["dstport"],
+                                             client.create_configuration(str(request["efmvariants"])),
+                                             packet_rate=client.packet_rate_of(request.get("rate"), request.get("bitrate")),
+                                             burst=request.get("burst", client.DEFAULT_BURST), connections=request.get("connections", 1))
+
+        return dict(statistics, status="done")
+
+    async def run_h3_client(self, request):
+
+        configuration = QuicConfiguration(is_client=True, alpn_protocols=H3_ALPN)
+        configuration.verify_mode = ssl.CERT_NONE
+        configuration.efm_variants = str(request["efmvariants"])
+
+        parallel_requests = int(request.get("parallel_requests", 1))
+        connections = int(request.get("connections", 1))
+
+        start = time.perf_counter()
+        try:
+            responses = await asyncio.wait_for(http3_client.run(configuration=configuration, urls=[request["url"]], data=None, include=False, output_dir=None,
+                                                                local_port=int(request["srcport"]), session_ticket_handler=None, streaming=True,
+                                                                parallel_requests=parallel_requests, connections=connections),
+                                               timeout=request.get("timeout"))
+        except asyncio.TimeoutError:
+            return {"status": "timeout", "elapsed": time.perf_counter() - start}
+
+        aggregate = http3_client.aggregate_goodput(responses)
+        streams = http3_client.goodput_log(http3_client.request_urls([request["url"]], parallel_requests, connections), responses)
+        return {"status": "done", "complete": all(stream["complete"] for stream in streams), "elapsed": time.perf_counter() - start, "octets": aggregate["octets"], "goodput_samples": aggregate["samples"],
+                "mbps": aggregate["mbps"], "streams": streams}
+
+    async def handle(self, request):
+
+        command = request.get("command")
+
+        if command == "server":
+            return await self.start_server(request)
+        if command == "h3_server":
+            return await self.start_h3_server(request)
+        if command == "client":
+            return await self.run_client(request)
+        if command == "h3_client":
+            return await self.run_h3_client(request)
+        if command == "stop":
+            return dict(self.stop_server(int(request["port"])), status="stopped")
+        if command == "shutdown":
+            for port in list(self.servers.keys()):
+                self.stop_server(port)
+            self.stopped.set()
+            return {"status": "shutdown"}
+
+        raise Exception("Unknown command {}".format(command))
+
+    async def serve_connection(self, reader, writer):
+        """
+        Answer the commands of one connection of simulator.py
+        """
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                try:
+                    response = await self.handle(json.loads(line))
+                except Exception as e:
+                    response = {"status": "error", "message": "{}: {}".format(type(e).__name__, e)}
+
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def main(socket_path, certpath, keypath, app):
+
+    agent = TrafficAgent(certpath, keypath, app)
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    control_server = await asyncio.start_unix_server(agent.serve_connection, path=socket_path)
+    ### simulator.py does not necessarily run with the privileges of the agent
+    os.chmod(socket_path, 0o666)
+    print("Traffic agent listening on {}".format(socket_path), flush=True)
+
+    try:
+        await agent.stopped.wait()
+    finally:
+        control_server.close()
+        os.remove(socket_path)
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser(description="Long-lived QUIC EFM traffic agent")
+    parser.add_argument('--socket',
+                        dest="socket_path",
+                        action="store",
+                        help="Unix socket to accept commands on",
+                        required=True)
+    parser.add_argument('--certpath', '-c',
+                        dest="certpath",
+                        action="store",
+                        required=True,
+                        help="Which ssl_cert?")
+    parser.add_argument('--keypath', '-k',
+                        dest="keypath",
+                        action="store",
+                        required=True,
+                        help="Which ssl_key?")
+    parser.add_argument('--app',
+                        dest="app",
+                        action="store",
+                        default="static_app:app",
+                        help="ASGI application of the HTTP3 server as <module>:<attribute>")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args.socket_path, args.certpath, args.keypath, args.app))
+    except KeyboardInterrupt:
+        pass